@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Parser throughput benchmark
+Times the parser on synthetic frames with 0, 10, 100 and 500 points and
+saves the results as a JSON baseline that later runs are compared against
+
+    python3 bench_parser.py --save bench_baseline.json      # record a baseline
+    python3 bench_parser.py --compare bench_baseline.json   # check for regressions
+"""
+
+import argparse
+import gc
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+import numpy as np
+from mmw_frame_generator import make_frame, make_stream, split_chunks
+from parcer_XY_test import parser_helper, parser_frame, TC_PASS
+from radar_frame import Frame
+from stream_parser import StreamParser
+
+POINT_COUNTS = (0, 10, 100, 500)
+
+# Frames per StreamParser run and the UART read sizes they are cut into
+STREAM_FRAMES = 50
+STREAM_CHUNK_BYTES = (64, 2048)
+
+
+def bench_parser_helper(num_points):
+    """Header search and decode only"""
+    data = make_frame(num_points, 1)
+    def run():
+        parser_helper(data, len(data))
+        return 1
+    return run
+
+
+def bench_parser_frame(num_points, vectorized=True):
+    """Full parse of one packet into a reused Frame"""
+    data = make_frame(num_points, 1)
+    frame = Frame()
+    def run():
+        result, _ = parser_frame(data, len(data), frame, vectorized=vectorized)
+        assert result == TC_PASS
+        return 1
+    return run
+
+
+def bench_stream_parser(num_points):
+    """StreamParser over a stream cut into UART sized reads"""
+    chunks = [bytes(chunk) for chunk in split_chunks(make_stream(STREAM_FRAMES, num_points), *STREAM_CHUNK_BYTES)]
+    stream = StreamParser(reuse_frame=True)
+    def run():
+        frames = 0
+        for chunk in chunks:
+            for _ in stream.feed(chunk):
+                frames += 1
+        assert frames == STREAM_FRAMES
+        return frames
+    return run
+
+
+BENCHMARKS = {
+    'parser_helper': bench_parser_helper,
+    'parser_frame': bench_parser_frame,
+    'parser_frame_loop': lambda num_points: bench_parser_frame(num_points, vectorized=False),
+    'stream_parser': bench_stream_parser,
+}
+
+
+def count_allocations(run):
+    """Memory blocks allocated while run() executes, as (blocks, frames)
+
+    sys.getallocatedblocks() is sampled at every function call and return
+    and its increases are added up, so blocks freed again before run()
+    returns are counted too; only blocks that live and die inside a single
+    C function are missed. The cyclic collector is off so it cannot free
+    blocks in between.
+    """
+    allocated = 0
+    last = sys.getallocatedblocks()
+
+    def profile(frame, event, arg):
+        nonlocal allocated, last
+        blocks = sys.getallocatedblocks()
+        if blocks > last:
+            allocated += blocks - last
+        last = blocks
+
+    gc.disable()
+    sys.setprofile(profile)
+    try:
+        frames = run()
+    finally:
+        sys.setprofile(None)
+        gc.enable()
+    return allocated, frames
+
+
+def measure(run, num_points, min_time):
+    """Time run() for at least min_time seconds, then count its allocations and peak memory once"""
+    run()  # warm up
+
+    frames = 0
+    calls = 0
+    start = time.perf_counter()
+    elapsed = 0.0
+    while elapsed < min_time:
+        frames += run()
+        calls += 1
+        elapsed = time.perf_counter() - start
+
+    # The profile hook itself shows up as a few blocks; an empty call measures that
+    overhead = min(count_allocations(lambda: 1)[0] for _ in range(3))
+    blocks, counted_frames = min(count_allocations(run) for _ in range(3))
+    blocks = max(blocks - overhead, 0)
+
+    # tracemalloc sees the Python and numpy allocations of one more call
+    tracemalloc.start()
+    traced_frames = run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    us_per_frame = elapsed / frames * 1e6
+    return {
+        'frames_per_s': frames / elapsed,
+        'us_per_frame': us_per_frame,
+        'us_per_point': us_per_frame / num_points if num_points else None,
+        'peak_bytes_per_frame': peak / traced_frames,
+        'allocated_blocks_per_frame': blocks / counted_frames,
+        'calls': calls,
+    }
+
+
+def run_benchmarks(names, point_counts, min_time):
+    results = {}
+    for name in names:
+        for num_points in point_counts:
+            key = f"{name}/{num_points}"
+            results[key] = measure(BENCHMARKS[name](num_points), num_points, min_time)
+            print_result(key, results[key])
+    return results
+
+
+def print_result(key, result, baseline=None):
+    us_per_point = result['us_per_point']
+    line = (f"{key:<24} {result['frames_per_s']:>12.0f} frames/s {result['us_per_frame']:>10.1f} us/frame "
+            f"{'-' if us_per_point is None else f'{us_per_point:.2f}':>8} us/point "
+            f"{result['peak_bytes_per_frame'] / 1024:>8.1f} KiB peak "
+            f"{result['allocated_blocks_per_frame']:>8.1f} allocs/frame")
+    if baseline is not None:
+        line += f"  {result['frames_per_s'] / baseline['frames_per_s']:>6.2f}x baseline"
+    print(line)
+
+
+def compare(results, baseline, threshold):
+    """Print each result against the baseline; returns the keys that regressed
+
+    A result regresses when it is slower than threshold allows, or when it
+    allocates more blocks per frame than threshold plus one block allows
+    (baselines saved before allocations were counted only check the speed).
+    """
+    regressions = []
+    print(f"\nCompared with baseline from {baseline['meta']['date']} ({baseline['meta']['machine']}):")
+    for key, result in results.items():
+        reference = baseline['results'].get(key)
+        if reference is None:
+            continue
+        print_result(key, result, reference)
+        reference_blocks = reference.get('allocated_blocks_per_frame')
+        if result['frames_per_s'] < reference['frames_per_s'] * (1 - threshold):
+            regressions.append(key)
+        elif (reference_blocks is not None and
+              result['allocated_blocks_per_frame'] > reference_blocks * (1 + threshold) + 1):
+            regressions.append(key)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the mmw demo output parser")
+    parser.add_argument('--bench', action='append', choices=sorted(BENCHMARKS), help="Benchmark to run, default all")
+    parser.add_argument('--points', type=int, action='append', help="Points per frame, default 0 10 100 500")
+    parser.add_argument('--min-time', type=float, default=0.5, help="Seconds per benchmark")
+    parser.add_argument('--save', help="Write the results to this JSON file")
+    parser.add_argument('--compare', help="Compare with a JSON baseline and exit 1 on regressions")
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help="Allowed slowdown and allocation growth against the baseline")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.bench or list(BENCHMARKS), args.points or POINT_COUNTS, args.min_time)
+
+    if args.save:
+        meta = {
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'machine': f"{platform.node()} {platform.machine()}",
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+        }
+        with open(args.save, 'w') as f:
+            json.dump({'meta': meta, 'results': results}, f, indent=2)
+        print(f"Saved results to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\nSlower or allocating more than baseline by more than {args.threshold:.0%}: "
+                  f"{', '.join(regressions)}")
+            sys.exit(1)
+        print("\nNo regressions")
+
+
+if __name__ == "__main__":
+    main()
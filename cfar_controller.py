@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Adaptive CFAR threshold control
+Watches the number of detected points per frame and raises the cfarCfg
+threshold of the profile through the CLI port when frames carry more
+points than the budget, then lowers it back step by step once the scene
+empties. The mmw demo accepts cfarCfg while the sensor is running, so no
+restart is needed
+"""
+
+import collections
+import threading
+from datetime import datetime
+from radar_cli import send_command, forget_config
+
+RANGE = 0
+DOPPLER = 1
+DIRECTION_NAMES = {RANGE: 'range', DOPPLER: 'doppler'}
+
+# Frames after a change before a frame that overflows the UART counts on its own
+SETTLE_FRAMES = 3
+
+
+class CfarAdjustment:
+    """One threshold change sent to the radar"""
+
+    __slots__ = ('time', 'frame_number', 'mean_points', 'old_offset', 'new_offset', 'commands', 'ok')
+
+    def __init__(self, frame_number, mean_points, old_offset, new_offset, commands, ok):
+        self.time = datetime.now().isoformat(timespec='milliseconds')
+        self.frame_number = frame_number
+        self.mean_points = mean_points
+        self.old_offset = old_offset
+        self.new_offset = new_offset
+        self.commands = commands
+        self.ok = ok
+
+    def line(self):
+        return (f"{self.time} frame {self.frame_number}: {self.mean_points:.1f} points/frame, "
+                f"CFAR offset {self.old_offset:+g} -> {self.new_offset:+g} dB "
+                f"({'; '.join(self.commands)}){'' if self.ok else ' FAILED'}")
+
+
+class CfarController:
+    """Keeps the points per frame under a budget by moving the CFAR thresholds
+
+    The budget is target_points, or the points whose frames fit in
+    target_bytes, or by default the points that fit through the UART in one
+    frame period (see RadarProfile.max_points). The mean over window frames
+    is compared with the budget: above it the thresholds go up by step_db,
+    below (1 - hysteresis) of it they come down by step_db, never below the
+    profile's own thresholds nor more than max_offset_db above them. After
+    every change the controller waits another window frames, so it judges
+    the new thresholds and not the old ones. A single frame that does not
+    fit through the UART at all triggers a raise as soon as SETTLE_FRAMES
+    frames were seen with the current thresholds.
+
+    Every adjustment is printed, kept in adjustments and appended to
+    log_file when one is given. While the thresholds differ from the
+    profile, radar_cli's stored hash no longer describes the device, so it
+    is dropped and the next start uploads the whole profile even if the
+    thresholds were never restored.
+
+    With background (the default) update() sends the commands from a
+    worker thread, so the acquisition thread calling it never waits up to
+    a second for a CLI reply while the data port fills up. The new offset
+    applies once the radar acknowledged it, and no further change is
+    decided while one is being sent.
+    """
+
+    def __init__(self, cli_port, profile, target_points=None, target_bytes=None, hysteresis=0.25,
+                 step_db=1.0, max_offset_db=12.0, window=10, directions=(RANGE,), log_file=None, background=True):
+        if target_points is None:
+            target_points = profile.points_for_bytes(target_bytes) if target_bytes else profile.max_points()
+        self.cli_port = cli_port
+        self.profile = profile
+        self.target_points = target_points
+        self.uart_limit = profile.max_points()
+        self.hysteresis = hysteresis
+        self.step_db = step_db
+        self.max_offset_db = max_offset_db
+        self.window = window
+        self.directions = directions
+        self.log_file = log_file
+        self.background = background
+        self.base_thresholds = {direction: profile.cfar_threshold(direction) for direction in directions}
+        self.offset_db = 0.0
+        self.adjustments = []
+        self._points = collections.deque(maxlen=window)
+        self._frames = 0
+        self._sender = None
+
+    def threshold(self, direction):
+        return self.base_thresholds[direction] + self.offset_db
+
+    def command(self, direction, threshold_db):
+        """The profile's cfarCfg line for direction with another threshold"""
+        args = list(self.profile.cfar[direction])
+        args[7] = f"{threshold_db:g}"
+        return 'cfarCfg ' + ' '.join(args)
+
+    @property
+    def sending(self):
+        """True while a background change is waiting for the radar's replies"""
+        return self._sender is not None and self._sender.is_alive()
+
+    def update(self, num_points, frame_number=None):
+        """Account one frame; returns the CfarAdjustment made, or None
+
+        In the background the change is only started here; its
+        CfarAdjustment is added to adjustments once the radar replied.
+        """
+        self._frames += 1
+        self._points.append(num_points)
+        if self.sending:
+            return None
+        # The frames right after a change were detected with the old thresholds
+        overflow = num_points > self.uart_limit and len(self._points) >= SETTLE_FRAMES
+        if len(self._points) < self.window and not overflow:
+            return None
+
+        mean = sum(self._points) / len(self._points)
+        if mean > self.target_points or overflow:
+            offset = min(self.offset_db + self.step_db, self.max_offset_db)
+        elif mean < self.target_points * (1 - self.hysteresis):
+            offset = max(self.offset_db - self.step_db, 0.0)
+        else:
+            return None
+        if offset == self.offset_db:
+            return None
+        frame_number = self._frames if frame_number is None else frame_number
+        if self.background:
+            self._sender = threading.Thread(target=self.set_offset, args=(offset, mean, frame_number),
+                                            name='cfar-sender', daemon=True)
+            self._sender.start()
+            return None
+        return self.set_offset(offset, mean, frame_number)
+
+    def set_offset(self, offset_db, mean_points=0.0, frame_number=None):
+        """Send the thresholds for offset_db above the profile's and start a new window"""
+        commands = []
+        ok = True
+        for direction in self.directions:
+            command = self.command(direction, self.base_thresholds[direction] + offset_db)
+            commands.append(command)
+            ok = send_command(self.cli_port, command).ok and ok
+
+        adjustment = CfarAdjustment(frame_number, mean_points, self.offset_db, offset_db, commands, ok)
+        if offset_db or not ok:
+            forget_config(self.cli_port)
+        if ok:
+            self.offset_db = offset_db
+        self._points.clear()
+        self.adjustments.append(adjustment)
+        print(f"CFAR: {adjustment.line()}")
+        if self.log_file:
+            with open(self.log_file, 'a') as f:
+                f.write(adjustment.line() + '\n')
+        return adjustment
+
+    def restore(self):
+        """Put the profile's thresholds back, e.g. before the acquisition stops
+
+        Waits for a change still being sent, then sends the profile's
+        thresholds on the calling thread.
+        """
+        if self._sender is not None:
+            self._sender.join()
+        if self.offset_db:
+            mean = sum(self._points) / len(self._points) if self._points else 0.0
+            self.set_offset(0.0, mean, self._frames)
+
+    def summary(self):
+        thresholds = ', '.join(f"{DIRECTION_NAMES[d]} {self.threshold(d):g} dB" for d in self.directions)
+        return (f"CFAR: {len(self.adjustments)} adjustments, target {self.target_points} points/frame, "
+                f"now {thresholds}")
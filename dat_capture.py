@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Offline parser for recorded mmWave demo output
+Memory-maps a Visualizer .dat capture (or any raw dump of the UART data
+port), indexes every frame in one pass and decodes the detected points of
+all frames into one columnar array, or chunk by chunk for captures that do
+not fit in memory
+
+Run as a script to summarize a capture:
+    python3 dat_capture.py capture.dat --npy points.npy
+"""
+
+import argparse
+import mmap
+import os
+import time
+import numpy as np
+from parcer_XY_test import (MAGIC_WORD, MMWDEMO_OUTPUT_MSG_DETECTED_POINTS,
+                            MMWDEMO_OUTPUT_MSG_DETECTED_POINTS_SIDE_INFO, decodeDetectedPoints,
+                            detectedPointDtype, iterTlv, packetHeaderStruct, sideInfoDtype)
+from radar_frame import FRAME_POINT_DTYPE
+
+HEADER_NUM_BYTES = 40
+
+# One entry per frame found in the capture. points_offset and side_info_offset
+# are file offsets of the TLV payloads, -1 if the frame has no such TLV.
+FRAME_INDEX_DTYPE = np.dtype([
+    ('offset', '<i8'), ('total_bytes', '<u4'), ('frame_number', '<u4'),
+    ('time_cpu_cycles', '<u4'), ('num_det_obj', '<u4'), ('sub_frame_number', '<u4'),
+    ('num_points', '<u4'), ('points_offset', '<i8'), ('side_info_offset', '<i8'),
+])
+
+# Point columns plus the index of the frame (into the frame index) each point belongs to
+CAPTURE_POINT_DTYPE = np.dtype([('frame', '<u4')] + FRAME_POINT_DTYPE.descr)
+
+# Points decoded per chunk; decoding takes about 200 bytes per point of temporaries
+DEFAULT_CHUNK_POINTS = 1 << 16
+
+
+def index_frames(data, max_frame_bytes=65536):
+    """Find every complete frame in data and return (index, bytes_skipped, frames_invalid)
+
+    data is any buffer with find(), e.g. an mmap or bytes. Bytes between
+    frames are skipped the same way the FrameAssembler skips them. Frames
+    whose TLVs do not match numDetObj are kept in the index with
+    num_points 0 and counted in frames_invalid.
+    """
+    size = len(data)
+    entries = []
+    bytes_skipped = 0
+    frames_invalid = 0
+    pos = 0
+
+    while True:
+        index = data.find(MAGIC_WORD, pos)
+        if index == -1 or size - index < HEADER_NUM_BYTES:
+            bytes_skipped += size - pos
+            break
+
+        (magic, version, total_bytes, platform, frame_number, time_cpu_cycles,
+         num_det_obj, num_tlv, sub_frame_number) = packetHeaderStruct.unpack_from(data, index)
+        if total_bytes < HEADER_NUM_BYTES or total_bytes > max_frame_bytes or sub_frame_number > 3:
+            # Magic word inside payload or noise, look for the next one
+            bytes_skipped += index + 1 - pos
+            pos = index + 1
+            continue
+        if index + total_bytes > size:
+            # Last frame was cut off by the end of the recording
+            bytes_skipped += size - pos
+            break
+
+        points_offset = side_info_offset = -1
+        points_len = side_info_len = 0
+        for (tlv_type, payload_start, tlv_len) in iterTlv(data, index, total_bytes, num_tlv):
+            if tlv_type == MMWDEMO_OUTPUT_MSG_DETECTED_POINTS and points_offset == -1:
+                points_offset, points_len = payload_start, tlv_len
+            elif tlv_type == MMWDEMO_OUTPUT_MSG_DETECTED_POINTS_SIDE_INFO and side_info_offset == -1:
+                side_info_offset, side_info_len = payload_start, tlv_len
+
+        num_points = num_det_obj
+        if num_det_obj > 0 and (points_len < num_det_obj * detectedPointDtype.itemsize or
+                                (side_info_offset != -1 and side_info_len < num_det_obj * sideInfoDtype.itemsize)):
+            num_points = 0
+            frames_invalid += 1
+
+        entries.append((index, total_bytes, frame_number, time_cpu_cycles, num_det_obj,
+                        sub_frame_number, num_points, points_offset, side_info_offset))
+        bytes_skipped += index - pos
+        pos = index + total_bytes
+
+    return np.array(entries, dtype=FRAME_INDEX_DTYPE), bytes_skipped, frames_invalid
+
+
+def _gather(array, offsets, counts, item_bytes):
+    """Copy counts[i] records of item_bytes from each file offset into one contiguous buffer
+
+    Records are copied whole: for every alignment of the frame offsets
+    (modulo item_bytes) the buffer is viewed as rows of item_bytes, so the
+    gather index holds one row number per record rather than one byte
+    offset per byte.
+    """
+    record = np.dtype((np.void, item_bytes))
+    out = np.empty(int(counts.sum()), dtype=record)
+    if len(out) == 0:
+        return out.view(np.uint8)
+    offsets = offsets.astype(np.int64)
+    residues = offsets % item_bytes
+    first = np.cumsum(counts) - counts
+    for residue in np.unique(residues[counts > 0]):
+        frames = np.flatnonzero((residues == residue) & (counts > 0))
+        rows = array[residue:residue + (len(array) - residue) // item_bytes * item_bytes].view(record)
+        frame_counts = counts[frames]
+        # Row of every record: its frame's first row plus its position in the frame
+        frame_first = np.repeat(first[frames], frame_counts)
+        position = np.arange(len(frame_first)) - np.repeat(np.cumsum(frame_counts) - frame_counts, frame_counts)
+        out[frame_first + position] = rows[np.repeat((offsets[frames] - residue) // item_bytes, frame_counts) + position]
+    return out.view(np.uint8)
+
+
+def decode_points(data, index, first_frame=0):
+    """Decode the points of all frames in index into one CAPTURE_POINT_DTYPE array
+
+    data is the buffer the index was built from. The frame column is
+    first_frame plus the position of the frame in index.
+    """
+    array = np.frombuffer(data, dtype=np.uint8)
+    counts = index['num_points'].astype(np.int64)
+    points = np.zeros(int(counts.sum()), dtype=CAPTURE_POINT_DTYPE)
+    if len(points) == 0:
+        return points
+
+    points['frame'] = np.repeat(np.arange(first_frame, first_frame + len(index)), counts)
+
+    raw = _gather(array, index['points_offset'], counts, detectedPointDtype.itemsize)
+    (x, y, z, v, compDetectedRange, detectedAzimuth, detectedElevAngle) = decodeDetectedPoints(raw, 0, len(points))
+    points['x'] = x
+    points['y'] = y
+    points['z'] = z
+    points['v'] = v
+    points['range'] = compDetectedRange
+    points['azimuth'] = detectedAzimuth
+    points['elevation'] = detectedElevAngle
+
+    # snr and noise stay 0 for frames without side info
+    has_side_info = np.repeat(index['side_info_offset'] >= 0, counts)
+    side_counts = np.where(index['side_info_offset'] >= 0, counts, 0)
+    raw = _gather(array, index['side_info_offset'], side_counts, sideInfoDtype.itemsize)
+    side_info = np.frombuffer(raw, dtype=sideInfoDtype)
+    points['snr'][has_side_info] = side_info['snr']
+    points['noise'][has_side_info] = side_info['noise']
+    return points
+
+
+class DatCapture:
+    """A recorded capture file, memory-mapped read-only
+
+    The file is never read into memory as a whole; the OS pages it in as the
+    index pass and the point decoding touch it. On a 32-bit OS the whole
+    file must still fit in the address space (about 2 GB).
+    """
+
+    def __init__(self, path, max_frame_bytes=65536):
+        self.path = path
+        self.max_frame_bytes = max_frame_bytes
+        self._file = open(path, 'rb')
+        if os.fstat(self._file.fileno()).st_size == 0:
+            self._map = b''  # mmap cannot map an empty file
+        else:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            if hasattr(self._map, 'madvise'):
+                self._map.madvise(mmap.MADV_SEQUENTIAL)
+        self._index = None
+        self.bytes_skipped = 0
+        self.frames_invalid = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        self._file.close()
+
+    @property
+    def size(self):
+        return len(self._map)
+
+    @property
+    def index(self):
+        """FRAME_INDEX_DTYPE array of all frames, built on first use"""
+        if self._index is None:
+            self._index, self.bytes_skipped, self.frames_invalid = index_frames(self._map, self.max_frame_bytes)
+        return self._index
+
+    def __len__(self):
+        return len(self.index)
+
+    def frame_bytes(self, i):
+        """Return the raw bytes of frame i, e.g. to feed a StreamParser"""
+        entry = self.index[i]
+        return self._map[int(entry['offset']):int(entry['offset']) + int(entry['total_bytes'])]
+
+    def points(self, start=0, stop=None):
+        """Decode the points of frames start..stop into one CAPTURE_POINT_DTYPE array"""
+        return decode_points(self._map, self.index[start:stop], start)
+
+    def iter_chunks(self, max_points=DEFAULT_CHUNK_POINTS):
+        """Yield CAPTURE_POINT_DTYPE arrays of whole frames with at most max_points points each
+
+        A single frame with more than max_points points is returned as a
+        chunk of its own.
+        """
+        index = self.index
+        ends = np.cumsum(index['num_points'], dtype=np.int64)
+        start = 0
+        done = 0
+        while start < len(index):
+            stop = max(start + 1, int(np.searchsorted(ends, done + max_points, side='right')))
+            yield decode_points(self._map, index[start:stop], start)
+            done = int(ends[stop - 1])
+            start = stop
+
+
+def main():
+    """Index a capture, decode all points and print a summary"""
+    parser = argparse.ArgumentParser(description="Parse a recorded mmWave demo capture")
+    parser.add_argument('path', help="Visualizer .dat file or raw UART dump")
+    parser.add_argument('--chunk-points', type=int, default=DEFAULT_CHUNK_POINTS, help="Points decoded per chunk")
+    parser.add_argument('--npy', help="Save all points to this .npy file")
+    args = parser.parse_args()
+
+    with DatCapture(args.path) as capture:
+        start = time.perf_counter()
+        num_frames = len(capture)
+        index_time = time.perf_counter() - start
+
+        chunks = []
+        num_points = 0
+        for chunk in capture.iter_chunks(args.chunk_points):
+            num_points += len(chunk)
+            if args.npy:
+                chunks.append(chunk)
+        elapsed = time.perf_counter() - start
+
+        megabytes = capture.size / 1e6
+        print(f"{args.path}: {megabytes:.1f} MB, {num_frames} frames, {num_points} points")
+        print(f"Skipped {capture.bytes_skipped} bytes, {capture.frames_invalid} invalid frames")
+        print(f"Indexed in {index_time:.3f} s, parsed in {elapsed:.3f} s "
+              f"({megabytes / max(elapsed, 1e-9):.1f} MB/s)")
+
+        if args.npy:
+            np.save(args.npy, np.concatenate(chunks) if chunks else np.zeros(0, dtype=CAPTURE_POINT_DTYPE))
+            print(f"Saved points to {args.npy}")
+
+
+if __name__ == "__main__":
+    main()
@@ -41,6 +41,8 @@
 #      of the captured files on stdio. User can redirect that output to a log file, if desired
 #   2. This example script also outputs the detected point cloud data in mmw_demo_output.csv 
 #      to showcase how to use the output of parser_one_mmw_demo_output_packet
+#   3. To parse a recorded .dat file offline use dat_capture.py, which memory-maps the
+#      file and decodes all frames at once: python3 dat_capture.py <recorded_dat_file>.dat
 # ****************************************************************************
 
 import os
@@ -51,7 +53,12 @@ import numpy as np
 import socket
 from datetime import datetime
 # import the parser function 
-from parcer_XY_test     import parser_one_mmw_demo_output_packet
+from parcer_XY_test     import sendFrameUdp, UDP_OUTPUT_TEXT, UDP_OUTPUT_BINARY
+from stream_parser      import StreamParser
+from radar_frame        import Frame
+from sensor_pose        import get_pose
+from radar_acquisition  import CLI_PORT, DATA_PORT, CLI_BAUD, DATA_BAUD
+from radar_cfg          import load_profile
 
 
 # GET VALUES FROM SERVER
@@ -110,6 +117,9 @@ serverAddress = ('192.168.30.150',2222)
 #ServerIP = '172.16.18.26'
 #ServerPort = 2222
 bufferSize = 102400  
+# UDP_OUTPUT_TEXT sends one utf-16 datagram per object plus an "end" datagram per loop,
+# UDP_OUTPUT_BINARY one binary datagram per frame (decoder in frame_datagram.py)
+udpOutput = UDP_OUTPUT_TEXT
 UDPClient = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
 
 
@@ -128,9 +138,9 @@ byteBufferLength = 0;
 
     # Open the serial ports for the configuration and the data ports
     
-    # Raspberry pi
-CLIport = serial.Serial('/dev/ttyACM0', 115200)
-Dataport = serial.Serial('/dev/ttyACM1', 921600)
+    # Raspberry pi: /dev/ttyACM0 and /dev/ttyACM1 unless RADAR_CLI_PORT / RADAR_DATA_PORT are set
+CLIport = serial.Serial(CLI_PORT, CLI_BAUD)
+Dataport = serial.Serial(DATA_PORT, DATA_BAUD)
     
     # Windows
 #CLIport = serial.Serial('COM10', 115200)
@@ -146,43 +156,15 @@ for i in config:
 
 # ------------------------------------------------------------------
 
-# Function to parse the data insi de the configuration file
+# Derived figures of the configuration (range resolution, frame period,
+# bytes per frame, ...) and whether its frames fit through the UART
+
+radarProfile = load_profile(configFileName)
+if radarProfile:
+    print(radarProfile.summary())
+    for problem in radarProfile.check():
+        print("Warning: " + problem)
 
-configParameters = {} # Initialize an empty dictionary to store the configuration parameters
-    
-    # Read the configuration file and send it to the board
-config = [line.rstrip('\r\n') for line in open(configFileName)]
-for i in config:
-        
-        # Split the line
-    splitWords = i.split(" ")
-        
-        # Hard code the number of antennas, change if other configuration is used
-    numRxAnt = 4
-    numTxAnt = 2
-        
-        # Get the information about the profile configuration
-    if "profileCfg" in splitWords[0]:
-        startFreq = int(float(splitWords[2]))
-        idleTime = int(splitWords[3])
-        rampEndTime = float(splitWords[5])
-        freqSlopeConst = float(splitWords[8])
-        numAdcSamples = int(splitWords[10])
-        numAdcSamplesRoundTo2 = 1;
-            
-        while numAdcSamples > numAdcSamplesRoundTo2:
-            numAdcSamplesRoundTo2 = numAdcSamplesRoundTo2 * 2;
-                
-        digOutSampleRate = int(splitWords[11]);
-            
-        # Get the information about the frame configuration    
-    elif "frameCfg" in splitWords[0]:
-            
-        chirpStartIdx = int(splitWords[1]);
-        chirpEndIdx = int(splitWords[2]);
-        numLoops = int(splitWords[3]);
-        numFrames = int(splitWords[4]);
-        framePeriodicity = int(splitWords[5]);
 ##################################################################################
 # INPUT CONFIGURATION
 ##################################################################################
@@ -197,6 +179,10 @@ for i in config:
 
 #outfile = open('data.dat','a')
 
+streamParser = StreamParser(**(radarProfile.stream_parser_options() if radarProfile else {}))
+pose = get_pose(X, Y, Z, yaw_psi, pitch_theta, roll_phi)
+numFramesParsed = 0
+
 while True:
 
     
@@ -231,72 +217,35 @@ while True:
 #print("allBinData: ", allBinData[0], allBinData[1], allBinData[2], allBinData[3])
                  #fp.close()
 
-# init local variables
-    totalBytesParsed = 0;
-    numFramesParsed = 0;
+    # streamParser keeps a partly received frame until the rest of it arrives with a later read
+    # and parses every complete frame of this read without slicing the data
+    for frame in streamParser.feed(allBinData):
+        numFramesParsed += 1
+
+        # send the points rotated and translated to world coordinates
+        sendFrameUdp(frame, ID, pose, udpOutput)
+        ##################################################################################
+        #   TODO: use the frame returned by above parser as needed. 
+        # For the point columns, see help(Frame)
+        # help(Frame)
+        ##################################################################################
 
-    # parser_one_mmw_demo_output_packet extracts only one complete frame at a time
-    # so call this in a loop till end of file
-    while (totalBytesParsed < readNumBytes):
         
-        # parser_one_mmw_demo_output_packet function already prints the
-        # parsed data to stdio. So showcasing only saving the data to arrays 
-        # here for further custom processing
-        parser_result, \
-        headerStartIndex,  \
-        totalPacketNumBytes, \
-        numDetObj,  \
-        numTlv,  \
-        subFrameNumber,  \
-        detectedX_array,  \
-        detectedY_array,  \
-        detectedZ_array,  \
-        detectedV_array,  \
-        detectedRange_array,  \
-        detectedAzimuth_array,  \
-        detectedElevation_array,  \
-        detectedSNR_array,  \
-        detectedNoise_array = parser_one_mmw_demo_output_packet(allBinData[totalBytesParsed::1], readNumBytes-totalBytesParsed, ID, X, Y, Z, yaw_psi, pitch_theta, roll_phi)
-
-        # Check the parser result
-        #print ("Parser result: ", parser_result)
-        #parser_result = str(parser_result).encode('utf-8')
-        #UDPClient.sendto(parser_result, serverAddress)
-        if (parser_result == 0): 
-            totalBytesParsed += (headerStartIndex+totalPacketNumBytes)    
-            numFramesParsed+=1
-            #print("totalBytesParsed: ", totalBytesParsed)
-            #totalBytesParsed = str(totalBytesParsed).encode('utf-8')
-            #UDPClient.sendto(totalBytesParsed, serverAddress)
-            #totalBytesParsed = totalBytesParsed.decode('utf-8')
-            #UDPClient.sendto("totalBytesParsed: ", totalBytesParsed, serverAddress)
-            ##################################################################################
-            #   TODO: use the arrays returned by above parser as needed. 
-            # For array dimensions, see help(parser_one_mmw_demo_output_packet)
-            # help(parser_one_mmw_demo_output_packet)
-            ##################################################################################
-
-            
-            # For example, dump all S/W objects to a csv file
-#             import csv
-#             if (numFramesParsed == 1):
-#                 democsvfile = open('mmw_demo_output.csv', 'w', newline='')                
-#                 demoOutputWriter = csv.writer(democsvfile, delimiter=',',
-#                                         quotechar='', quoting=csv.QUOTE_NONE)                                    
-#                 demoOutputWriter.writerow(["frame","DetObj#","x","y","z","v","snr","noise"])            
-#                 
-#             for obj in range(numDetObj):
-#                 demoOutputWriter.writerow([numFramesParsed-1, obj, detectedX_array[obj],\
-#                                             detectedY_array[obj],\
-#                                             detectedZ_array[obj],\
-#                                             detectedV_array[obj],\
-#                                             detectedSNR_array[obj],\
-#                                             detectedNoise_array[obj]])
-
-            
-        else: 
-            # error in parsing; exit the loop
-            break
+        # For example, dump all S/W objects to a csv file
+#         import csv
+#         if (numFramesParsed == 1):
+#             democsvfile = open('mmw_demo_output.csv', 'w', newline='')                
+#             demoOutputWriter = csv.writer(democsvfile, delimiter=',',
+#                                     quotechar='', quoting=csv.QUOTE_NONE)                                    
+#             demoOutputWriter.writerow(["frame","DetObj#","x","y","z","v","snr","noise"])            
+#             
+#         for obj, point in enumerate(frame.points):
+#             demoOutputWriter.writerow([numFramesParsed-1, obj, point['x'],\
+#                                         point['y'],\
+#                                         point['z'],\
+#                                         point['v'],\
+#                                         point['snr'],\
+#                                         point['noise']])
 
 #     dt = datetime.now()
 #     ts = datetime.timestamp(dt)
@@ -306,10 +255,12 @@ while True:
     
     time.sleep(sensor_delay)
     # All processing done; Exit
-    UDPstring = [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0]
-    print(UDPstring)
-    UDPstring = str(UDPstring).encode('utf-16')
-    UDPClient.sendto(UDPstring, serverAddress)
+    # binary datagrams carry the point count, so only the text format needs the "end" datagram
+    if udpOutput == UDP_OUTPUT_TEXT:
+        UDPstring = [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0]
+        print(UDPstring)
+        UDPstring = str(UDPstring).encode('utf-16')
+        UDPClient.sendto(UDPstring, serverAddress)
     
     
     
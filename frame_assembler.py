@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Frame assembler for the mmWave demo UART data port
+Collects UART bytes in one preallocated buffer and hands out complete
+mmw demo output packets as zero-copy memoryviews
+"""
+
+import struct
+import numpy as np
+from parcer_XY_test import MAGIC_WORD
+
+HEADER_NUM_BYTES = 40
+
+# Offset of totalPacketNumBytes inside the packet header
+_TOTAL_PACKET_LEN = struct.Struct('<I')
+_TOTAL_PACKET_LEN_OFFSET = 12
+
+
+class FrameAssembler:
+    """Turns a stream of UART bytes into complete mmw demo output packets
+
+    The receive buffer is allocated once. Complete packets are returned as
+    memoryviews into that buffer, so nothing is copied per frame apart from
+    the UART bytes themselves. Leftover bytes of an in-flight packet are only
+    moved to the front of the buffer when the free space at the end runs out.
+    """
+
+    def __init__(self, capacity=65536, max_frame_bytes=None):
+        if max_frame_bytes is None:
+            max_frame_bytes = capacity // 2
+        if max_frame_bytes > capacity:
+            raise ValueError("max_frame_bytes must not exceed the buffer capacity")
+
+        self.capacity = capacity
+        self.max_frame_bytes = max_frame_bytes
+        self._buffer = bytearray(capacity)
+        self._view = memoryview(self._buffer)
+        self._array = np.frombuffer(self._buffer, dtype=np.uint8)
+        self._start = 0   # first byte not handed out or skipped yet
+        self._end = 0     # one past the last received byte
+        self._search = 0  # no magic word starts between _start and here
+
+        # Counters
+        self.frames_assembled = 0
+        self.bytes_received = 0
+        self.bytes_skipped = 0
+        self.resync_count = 0
+
+    @property
+    def pending(self):
+        """Number of received bytes that are not part of a returned frame yet"""
+        return self._end - self._start
+
+    def reset(self):
+        """Drop all buffered bytes, e.g. after the sensor was restarted"""
+        self.bytes_skipped += self._end - self._start
+        self._start = self._end = self._search = 0
+
+    def feed(self, data):
+        """Add UART bytes and yield every packet they complete
+
+        This is a generator, so it must be iterated for the data to be
+        consumed. Each yielded memoryview covers exactly one packet
+        (totalPacketNumBytes long, starting at its magic word) and is only
+        valid until the next packet is requested; use bytes(frame) to keep it.
+        """
+        data = memoryview(data).cast('B')
+        pos = 0
+        while pos < len(data):
+            free = self.capacity - self._end
+            if free < len(data) - pos and self._start > 0:
+                self._compact()
+                free = self.capacity - self._end
+
+            count = min(free, len(data) - pos)
+            self._buffer[self._end:self._end + count] = data[pos:pos + count]
+            self._end += count
+            self.bytes_received += count
+            pos += count
+
+            frame = self._next_frame()
+            while frame is not None:
+                yield frame
+                frame = self._next_frame()
+
+    def _compact(self):
+        """Move the in-flight bytes to the front of the buffer"""
+        length = self._end - self._start
+        # numpy copies overlapping ranges correctly
+        self._array[:length] = self._array[self._start:self._end]
+        self._search -= self._start
+        self._start = 0
+        self._end = length
+
+    def _next_frame(self):
+        """Return the next complete packet, or None if more bytes are needed"""
+        while True:
+            index = self._buffer.find(MAGIC_WORD, self._search, self._end)
+            if index == -1:
+                # No header: only the last 7 bytes can still start a magic word
+                keep_from = max(self._start, self._end - (len(MAGIC_WORD) - 1))
+                self.bytes_skipped += keep_from - self._start
+                self._start = self._search = keep_from
+                return None
+
+            if index > self._start:
+                self.bytes_skipped += index - self._start
+                self.resync_count += 1
+                self._start = index
+            self._search = index
+
+            if self._end - index < HEADER_NUM_BYTES:
+                return None
+
+            total_bytes = _TOTAL_PACKET_LEN.unpack_from(self._buffer, index + _TOTAL_PACKET_LEN_OFFSET)[0]
+            if total_bytes < HEADER_NUM_BYTES or total_bytes > self.max_frame_bytes:
+                # Magic word inside payload or noise, look for the next one
+                self._search = index + 1
+                continue
+
+            if self._end - index < total_bytes:
+                return None  # Frame still in flight
+
+            self._start = self._search = index + total_bytes
+            self.frames_assembled += 1
+            return self._view[index:index + total_bytes]
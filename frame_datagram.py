@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Binary per-frame UDP output for the mmWave radar
+Packs a whole frame of detected points into one versioned datagram (split
+into fragments for large frames) and decodes it again on the receiver side
+
+Datagram layout, all little-endian:
+    header  (28 bytes) magic 'MMWF', version, header length, sensor ID,
+                       frame number, timestamp (s), point count of the frame,
+                       fragment index, fragment count, index of first point
+    records (36 bytes each) x, y, z, v, range, azimuth, elevation, snr, noise
+                       as float32
+
+Run as a script to print frames received on a UDP port:
+    python3 frame_datagram.py --port 2222
+"""
+
+import argparse
+import socket
+import struct
+import time
+import numpy as np
+
+PROTOCOL_MAGIC = b'MMWF'
+PROTOCOL_VERSION = 1
+
+HEADER = struct.Struct('<4sBBHIdHHHH')
+
+POINT_DTYPE = np.dtype([
+    ('x', '<f4'), ('y', '<f4'), ('z', '<f4'), ('v', '<f4'),
+    ('range', '<f4'), ('azimuth', '<f4'), ('elevation', '<f4'),
+    ('snr', '<f4'), ('noise', '<f4'),
+])
+
+# Largest UDP payload that fits an Ethernet frame without IP fragmentation
+DEFAULT_MAX_DATAGRAM_BYTES = 1472
+
+
+class FrameHeader:
+    """Header fields of one received datagram"""
+
+    __slots__ = ('version', 'sensor_id', 'frame_number', 'timestamp', 'num_points',
+                 'fragment_index', 'fragment_count', 'first_point')
+
+    def __init__(self, version, sensor_id, frame_number, timestamp, num_points,
+                 fragment_index, fragment_count, first_point):
+        self.version = version
+        self.sensor_id = sensor_id
+        self.frame_number = frame_number
+        self.timestamp = timestamp
+        self.num_points = num_points
+        self.fragment_index = fragment_index
+        self.fragment_count = fragment_count
+        self.first_point = first_point
+
+    def __repr__(self):
+        return (f"FrameHeader(sensor_id={self.sensor_id}, frame_number={self.frame_number}, "
+                f"timestamp={self.timestamp}, num_points={self.num_points}, "
+                f"fragment={self.fragment_index + 1}/{self.fragment_count})")
+
+
+def points_per_datagram(max_datagram_bytes=DEFAULT_MAX_DATAGRAM_BYTES):
+    """Number of point records that fit in one datagram"""
+    return (max_datagram_bytes - HEADER.size) // POINT_DTYPE.itemsize
+
+
+def to_point_records(points):
+    """Return points as a POINT_DTYPE array, converting from any array with the same field names"""
+    if points.dtype == POINT_DTYPE:
+        return points
+    records = np.empty(len(points), dtype=POINT_DTYPE)
+    for name in POINT_DTYPE.names:
+        records[name] = points[name]
+    return records
+
+
+def pack_frame(sensor_id, frame_number, timestamp, points, max_datagram_bytes=DEFAULT_MAX_DATAGRAM_BYTES):
+    """Pack one frame into a list of datagrams
+
+    points is a structured array with the POINT_DTYPE field names. A frame
+    without points still produces one datagram so the receiver sees every
+    frame.
+    """
+    records = to_point_records(points)
+    per_datagram = points_per_datagram(max_datagram_bytes)
+    num_points = len(records)
+    fragment_count = max(1, -(-num_points // per_datagram))
+
+    datagrams = []
+    for fragment_index in range(fragment_count):
+        first = fragment_index * per_datagram
+        chunk = records[first:first + per_datagram]
+        header = HEADER.pack(PROTOCOL_MAGIC, PROTOCOL_VERSION, HEADER.size, int(sensor_id),
+                             int(frame_number) & 0xFFFFFFFF, float(timestamp), num_points,
+                             fragment_index, fragment_count, first)
+        datagrams.append(header + chunk.tobytes())
+    return datagrams
+
+
+def unpack_datagram(datagram):
+    """Decode one datagram into (FrameHeader, points); points is a read-only POINT_DTYPE view"""
+    if len(datagram) < HEADER.size:
+        raise ValueError(f"Datagram too short: {len(datagram)} bytes")
+
+    (magic, version, header_size, sensor_id, frame_number, timestamp, num_points,
+     fragment_index, fragment_count, first_point) = HEADER.unpack_from(datagram)
+    if magic != PROTOCOL_MAGIC:
+        raise ValueError(f"Not a frame datagram (magic {magic!r})")
+    if version != PROTOCOL_VERSION:
+        raise ValueError(f"Unsupported frame datagram version {version}")
+    if header_size < HEADER.size or header_size > len(datagram):
+        raise ValueError(f"Invalid header length {header_size}")
+    if fragment_index >= fragment_count:
+        raise ValueError(f"Fragment {fragment_index} of {fragment_count}")
+
+    # header_size lets newer minor versions append header fields
+    count = (len(datagram) - header_size) // POINT_DTYPE.itemsize
+    if first_point + count > num_points or (fragment_count == 1 and count != num_points):
+        raise ValueError(f"Points {first_point}..{first_point + count} do not fit a frame of {num_points} points")
+    points = np.frombuffer(datagram, dtype=POINT_DTYPE, count=count, offset=header_size)
+    header = FrameHeader(version, sensor_id, frame_number, timestamp, num_points,
+                         fragment_index, fragment_count, first_point)
+    return header, points
+
+
+class FrameDecoder:
+    """Reference receiver: joins fragments back into complete frames
+
+    feed() returns (FrameHeader, points) once every fragment of a frame has
+    arrived, otherwise None. Incomplete frames are given up when more than
+    max_pending frames of the same sensor are waiting. Malformed datagrams,
+    and fragments whose point or fragment count disagrees with the first
+    fragment of their frame or whose points do not start where pack_frame()
+    puts that fragment, are counted in datagrams_invalid and ignored. A frame
+    whose fragments do not cover every point exactly once is given up.
+    """
+
+    def __init__(self, max_pending=4):
+        self.max_pending = max_pending
+        self._pending = {}  # (sensor_id, frame_number) -> [header, points, {fragment index: (first, count)}]
+
+        # Counters
+        self.frames_completed = 0
+        self.frames_incomplete = 0
+        self.datagrams_invalid = 0
+
+    def feed(self, datagram):
+        try:
+            header, points = unpack_datagram(datagram)
+        except ValueError:
+            self.datagrams_invalid += 1
+            return None
+
+        if header.fragment_count == 1:
+            self.frames_completed += 1
+            return header, points
+
+        # Every fragment but the last holds the same number of points
+        if header.fragment_index == header.fragment_count - 1:
+            in_place = header.first_point + len(points) == header.num_points
+        else:
+            in_place = header.first_point == header.fragment_index * len(points)
+        if not in_place:
+            self.datagrams_invalid += 1
+            return None
+
+        key = (header.sensor_id, header.frame_number)
+        entry = self._pending.get(key)
+        if entry is None:
+            entry = [header, np.empty(header.num_points, dtype=POINT_DTYPE), {}]
+            self._pending[key] = entry
+            self._expire(header.sensor_id)
+        elif header.num_points != entry[0].num_points or header.fragment_count != entry[0].fragment_count:
+            self.datagrams_invalid += 1
+            return None
+
+        entry[1][header.first_point:header.first_point + len(points)] = points
+        entry[2][header.fragment_index] = (header.first_point, len(points))
+        if len(entry[2]) < header.fragment_count:
+            return None
+
+        del self._pending[key]
+        if not self._covers_frame(entry[2], header.num_points):
+            self.frames_incomplete += 1
+            return None
+        self.frames_completed += 1
+        first_header = entry[0]
+        first_header.fragment_index = 0
+        first_header.first_point = 0
+        return first_header, entry[1]
+
+    @staticmethod
+    def _covers_frame(fragments, num_points):
+        """True if the fragments' point ranges follow each other from 0 to num_points"""
+        end = 0
+        for index in range(len(fragments)):
+            first, count = fragments[index]
+            if first != end:
+                return False
+            end = first + count
+        return end == num_points
+
+    def _expire(self, sensor_id):
+        keys = [key for key in self._pending if key[0] == sensor_id]
+        for key in keys[:-self.max_pending]:
+            del self._pending[key]
+            self.frames_incomplete += 1
+
+
+class UdpFrameSender:
+    """Sends each frame as binary datagrams to one UDP address"""
+
+    def __init__(self, address, sock=None, max_datagram_bytes=DEFAULT_MAX_DATAGRAM_BYTES):
+        self.address = address
+        self.sock = sock if sock is not None else socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.max_datagram_bytes = max_datagram_bytes
+
+        # Counters
+        self.frames_sent = 0
+        self.datagrams_sent = 0
+        self.bytes_sent = 0
+
+    def send(self, sensor_id, frame_number, points, timestamp=None):
+        """Send one frame; returns the number of datagrams used"""
+        if timestamp is None:
+            timestamp = time.time()
+        datagrams = pack_frame(sensor_id, frame_number, timestamp, points, self.max_datagram_bytes)
+        for datagram in datagrams:
+            self.sock.sendto(datagram, self.address)
+            self.bytes_sent += len(datagram)
+        self.datagrams_sent += len(datagrams)
+        self.frames_sent += 1
+        return len(datagrams)
+
+
+def main():
+    """Print frames received on a UDP port"""
+    parser = argparse.ArgumentParser(description="Receive binary radar frame datagrams")
+    parser.add_argument('--host', default='0.0.0.0', help="Address to listen on")
+    parser.add_argument('--port', type=int, default=2222, help="UDP port to listen on")
+    args = parser.parse_args()
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind((args.host, args.port))
+    decoder = FrameDecoder()
+    print(f"Listening for radar frames on {args.host}:{args.port}")
+
+    try:
+        while True:
+            datagram, _ = sock.recvfrom(65535)
+            result = decoder.feed(datagram)
+            if result is None:
+                continue
+            header, points = result
+            print(f"Sensor {header.sensor_id} frame {header.frame_number}: {header.num_points} points")
+            for i, point in enumerate(points):
+                print(f"  {i:<4} x={point['x']:.3f} y={point['y']:.3f} z={point['z']:.3f} v={point['v']:.3f}")
+    except KeyboardInterrupt:
+        print(f"\nReceived {decoder.frames_completed} frames, "
+              f"{decoder.frames_incomplete} incomplete, {decoder.datagrams_invalid} invalid datagrams")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+In-memory history of recent radar frames
+A fixed-capacity ring buffer that one thread appends frames to while any
+number of others read it. Frames can be looked up by frame number and
+queried by time range with a binary search, so a client that reconnects
+can ask for exactly the frames it missed
+"""
+
+import threading
+import numpy as np
+
+
+class HistoryEntry:
+    """One stored frame; records are the POINT_DTYPE points in world coordinates"""
+
+    __slots__ = ('sequence', 'sensor_id', 'frame_number', 'timestamp', 'records')
+
+    def __init__(self, sequence, sensor_id, frame_number, timestamp, records):
+        self.sequence = sequence
+        self.sensor_id = sensor_id
+        self.frame_number = frame_number
+        self.timestamp = timestamp
+        self.records = records
+
+    @property
+    def num_points(self):
+        return len(self.records)
+
+    def __repr__(self):
+        return (f"HistoryEntry(frame_number={self.frame_number}, timestamp={self.timestamp}, "
+                f"num_points={len(self.records)})")
+
+
+class FrameHistory:
+    """The last capacity frames, oldest overwritten first
+
+    The timestamps are kept in a numpy array in ring order, so a time range
+    is found with two binary searches over the two sorted halves of the ring.
+    The index is kept non-decreasing even if the sender's clock steps back.
+    A dict maps frame numbers to entries; after a sensor restart the numbers
+    start over and the newest frame with a number wins.
+
+    Writers and readers only hold the lock to update or copy slot
+    references, never while building a reply.
+    """
+
+    def __init__(self, capacity=600):
+        self.capacity = capacity
+        self._entries = [None] * capacity
+        self._times = np.zeros(capacity, dtype=np.float64)
+        self._by_frame_number = {}
+        self._lock = threading.Lock()
+        self._next = 0  # sequence number of the next entry, also the number of entries ever appended
+
+    def __len__(self):
+        return min(self._next, self.capacity)
+
+    def append(self, frame_number, timestamp, records, sensor_id=1):
+        with self._lock:
+            slot = self._next % self.capacity
+            old = self._entries[slot]
+            if old is not None and self._by_frame_number.get(old.frame_number) is old:
+                del self._by_frame_number[old.frame_number]
+
+            if self._next:
+                timestamp_index = max(timestamp, self._times[(self._next - 1) % self.capacity])
+            else:
+                timestamp_index = timestamp
+            entry = HistoryEntry(self._next, sensor_id, frame_number, timestamp, records)
+            self._entries[slot] = entry
+            self._times[slot] = timestamp_index
+            self._by_frame_number[frame_number] = entry
+            self._next += 1
+            return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries = [None] * self.capacity
+            self._by_frame_number.clear()
+            self._next = 0
+
+    def latest(self, count=1):
+        """The newest count entries, oldest first"""
+        with self._lock:
+            first = max(self._next - min(count, self.capacity), 0)
+            return [self._entries[sequence % self.capacity] for sequence in range(first, self._next)]
+
+    def oldest(self):
+        """The oldest stored entry, or None"""
+        with self._lock:
+            if not self._next:
+                return None
+            return self._entries[max(self._next - self.capacity, 0) % self.capacity]
+
+    def find(self, frame_number):
+        """Entry of frame_number, or None if it is not (or no longer) stored"""
+        with self._lock:
+            return self._by_frame_number.get(frame_number)
+
+    def _first_sequence_after(self, timestamp):
+        """Sequence of the first entry with a timestamp after timestamp"""
+        oldest = max(self._next - self.capacity, 0)
+        start = oldest % self.capacity
+        count = self._next - oldest
+        # Ring order is _times[start:] followed by _times[:start]
+        head = self._times[start:start + count]
+        position = int(np.searchsorted(head, timestamp, 'right'))
+        if position == len(head) and count > len(head):
+            position += int(np.searchsorted(self._times[:count - len(head)], timestamp, 'right'))
+        return oldest + position
+
+    def between(self, since=None, until=None, after_frame=None, limit=None):
+        """Entries with since < timestamp <= until, oldest first
+
+        since and until are optional and compare against the index, where a
+        timestamp that stepped back counts as the one before it. after_frame
+        starts after that frame number; if that frame is no longer stored
+        the reply starts with the oldest entry. limit keeps only the first
+        limit entries; pass the frame number of the last one as after_frame
+        to resume, since frames can share a timestamp.
+        """
+        with self._lock:
+            first = max(self._next - self.capacity, 0)
+            end = self._next
+            if after_frame is not None and after_frame in self._by_frame_number:
+                first = self._by_frame_number[after_frame].sequence + 1
+            if since is not None:
+                first = max(first, self._first_sequence_after(since))
+            if until is not None:
+                end = min(end, self._first_sequence_after(until))
+            if limit is not None:
+                end = min(end, first + limit)
+            return [self._entries[sequence % self.capacity] for sequence in range(first, end)]
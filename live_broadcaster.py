@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Fan-out broadcaster for Server-Sent Events
+Every subscriber (one per open browser tab) gets its own bounded queue, so
+each one sees every message. A message is encoded once when published and
+publishing never waits for a subscriber: a slow one loses its oldest
+messages, and one that stops reading altogether is disconnected
+"""
+
+import collections
+import itertools
+import json
+import threading
+import time
+
+# Sent when nothing was published for this long, so proxies keep the connection open
+KEEPALIVE_INTERVAL = 15.0
+
+
+def format_event(data, event=None):
+    """One Server-Sent Events message; data is JSON encoded unless it is a str"""
+    if not isinstance(data, str):
+        data = json.dumps(data)
+    lines = [f"event: {event}"] if event else []
+    lines.extend(f"data: {line}" for line in data.split('\n'))
+    return '\n'.join(lines) + '\n\n'
+
+
+class Subscriber:
+    """Queue of the messages for one client
+
+    When maxsize messages are waiting, the oldest one is dropped for each
+    new one, which decimates the stream for a client that reads too slowly
+    instead of delaying everybody else.
+    """
+
+    def __init__(self, broadcaster, subscriber_id, name, maxsize):
+        self.broadcaster = broadcaster
+        self.subscriber_id = subscriber_id
+        self.name = name
+        self.maxsize = maxsize
+        self.connected = time.time()
+        self.closed = False
+        self._messages = collections.deque()
+        self._ready = threading.Condition()
+        self._last_read = time.monotonic()
+
+        # Counters
+        self.delivered = 0
+        self.dropped = 0
+
+    def put(self, message):
+        with self._ready:
+            if len(self._messages) >= self.maxsize:
+                self._messages.popleft()
+                self.dropped += 1
+            self._messages.append((time.monotonic(), message))
+            self._ready.notify()
+
+    def get(self, timeout=None):
+        """The oldest waiting message, or None after timeout seconds or once closed"""
+        with self._ready:
+            self._last_read = time.monotonic()
+            if not self._ready.wait_for(lambda: self._messages or self.closed, timeout) or self.closed:
+                return None
+            self.delivered += 1
+            return self._messages.popleft()[1]
+
+    @property
+    def lag(self):
+        """Seconds the oldest waiting message has been queued"""
+        with self._ready:
+            return time.monotonic() - self._messages[0][0] if self._messages else 0.0
+
+    @property
+    def idle(self):
+        """Seconds since the client last asked for a message"""
+        return time.monotonic() - self._last_read
+
+    def close(self):
+        with self._ready:
+            self.closed = True
+            self._ready.notify_all()
+        self.broadcaster.unsubscribe(self)
+
+    def status(self):
+        return {
+            'id': self.subscriber_id,
+            'name': self.name,
+            'queued': len(self._messages),
+            'lag': round(self.lag, 3),
+            'delivered': self.delivered,
+            'dropped': self.dropped,
+            'connected': self.connected,
+        }
+
+
+class LiveBroadcaster:
+    """Publishes messages to every subscriber
+
+    A subscriber that has not asked for a message for stale_timeout seconds
+    while messages wait (a client that stopped reading without closing the
+    connection) is closed, which ends its event stream.
+    """
+
+    def __init__(self, maxsize=64, stale_timeout=30.0):
+        self.maxsize = maxsize
+        self.stale_timeout = stale_timeout
+        self._subscribers = {}
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+        # Counters
+        self.published = 0
+        self.disconnected = 0
+
+    @property
+    def num_subscribers(self):
+        return len(self._subscribers)
+
+    def subscribe(self, name=None, maxsize=None):
+        subscriber_id = next(self._ids)
+        subscriber = Subscriber(self, subscriber_id, name, maxsize or self.maxsize)
+        with self._lock:
+            self._subscribers[subscriber_id] = subscriber
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.pop(subscriber.subscriber_id, None)
+
+    def publish(self, data, event=None):
+        """Encode data as one event and queue it for every subscriber"""
+        message = format_event(data, event)
+        with self._lock:
+            subscribers = list(self._subscribers.values())
+        self.published += 1
+        for subscriber in subscribers:
+            if subscriber.idle > self.stale_timeout and subscriber.lag > self.stale_timeout:
+                self.disconnected += 1
+                subscriber.close()
+            else:
+                subscriber.put(message)
+
+    def event_stream(self, name=None, keepalive=KEEPALIVE_INTERVAL):
+        """Generator of the encoded events for one new client, for a streaming HTTP response"""
+        subscriber = self.subscribe(name)
+        try:
+            # An initial comment gets the headers through buffering proxies at once
+            yield ': connected\n\n'
+            while not subscriber.closed:
+                message = subscriber.get(keepalive)
+                yield message if message is not None else ': keepalive\n\n'
+        finally:
+            subscriber.close()
+
+    def status(self):
+        with self._lock:
+            subscribers = list(self._subscribers.values())
+        return {
+            'subscribers': len(subscribers),
+            'published': self.published,
+            'disconnected': self.disconnected,
+            'clients': [subscriber.status() for subscriber in subscribers],
+        }
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Synthetic mmWave demo output generator
+Builds valid mmw demo output packets (magic word, 40-byte header, TLVs 1, 2,
+6 and 7) with any number of points, plus helpers to corrupt a stream or cut
+it at arbitrary boundaries the way UART reads do
+
+Run as a script to write a capture that dat_capture.py and the replay can read:
+    python3 mmw_frame_generator.py synthetic.dat --frames 1000 --points 20
+"""
+
+import argparse
+import struct
+import numpy as np
+from parcer_XY_test import (MAGIC_WORD, MMWDEMO_OUTPUT_MSG_DETECTED_POINTS, MMWDEMO_OUTPUT_MSG_RANGE_PROFILE,
+                            MMWDEMO_OUTPUT_MSG_STATS, MMWDEMO_OUTPUT_MSG_DETECTED_POINTS_SIDE_INFO,
+                            detectedPointDtype, sideInfoDtype, statsStruct)
+
+DEFAULT_TLV_TYPES = (MMWDEMO_OUTPUT_MSG_DETECTED_POINTS, MMWDEMO_OUTPUT_MSG_RANGE_PROFILE,
+                     MMWDEMO_OUTPUT_MSG_STATS, MMWDEMO_OUTPUT_MSG_DETECTED_POINTS_SIDE_INFO)
+
+# Header values of an IWR1843 running the SDK 3.6 mmw demo
+DEMO_VERSION = 0x03060000
+DEMO_PLATFORM = 0xA1843
+CPU_CLOCK_HZ = 200e6
+
+# The demo pads every packet to a multiple of 32 bytes
+PACKET_ALIGN = 32
+
+_HEADER = struct.Struct('<8I')
+_TLV_HEADER = struct.Struct('<II')
+
+
+def make_points(num_points, rng):
+    """Random detected points in front of the sensor as a detectedPointDtype array"""
+    points = np.empty(num_points, dtype=detectedPointDtype)
+    points['x'] = rng.uniform(-5.0, 5.0, num_points)
+    points['y'] = rng.uniform(0.2, 10.0, num_points)
+    points['z'] = rng.uniform(-1.0, 1.0, num_points)
+    points['v'] = rng.uniform(-2.0, 2.0, num_points)
+    return points
+
+
+def make_frame(num_points, frame_number=0, tlv_types=DEFAULT_TLV_TYPES, rng=None, points=None,
+               num_range_bins=256, frame_period=0.1, sub_frame_number=0, time_cpu_cycles=None):
+    """Return one complete mmw demo output packet as bytes
+
+    points, if given, is a detectedPointDtype array used instead of random
+    points. Unless time_cpu_cycles is given, timeCpuCycles advances by
+    frame_period per frame number.
+    """
+    if rng is None:
+        rng = np.random.default_rng(frame_number)
+    if points is None:
+        points = make_points(num_points, rng)
+    num_points = len(points)
+
+    tlvs = []
+    for tlv_type in tlv_types:
+        if tlv_type == MMWDEMO_OUTPUT_MSG_DETECTED_POINTS:
+            if num_points == 0:
+                continue  # the demo leaves out the point TLVs of an empty frame
+            payload = points.astype(detectedPointDtype, copy=False).tobytes()
+        elif tlv_type == MMWDEMO_OUTPUT_MSG_DETECTED_POINTS_SIDE_INFO:
+            if num_points == 0:
+                continue
+            side_info = np.empty(num_points, dtype=sideInfoDtype)
+            side_info['snr'] = rng.integers(50, 400, num_points)
+            side_info['noise'] = rng.integers(20, 120, num_points)
+            payload = side_info.tobytes()
+        elif tlv_type == MMWDEMO_OUTPUT_MSG_RANGE_PROFILE:
+            payload = rng.integers(0, 2**16, num_range_bins, dtype=np.uint16).astype('<u2').tobytes()
+        elif tlv_type == MMWDEMO_OUTPUT_MSG_STATS:
+            payload = statsStruct.pack(2100, 900, 97900, 40, 12, 8)
+        else:
+            raise ValueError(f"No generator for TLV type {tlv_type}")
+        tlvs.append(_TLV_HEADER.pack(tlv_type, len(payload)) + payload)
+
+    body = b''.join(tlvs)
+    total_bytes = -(-(len(MAGIC_WORD) + _HEADER.size + len(body)) // PACKET_ALIGN) * PACKET_ALIGN
+    if time_cpu_cycles is None:
+        time_cpu_cycles = int(frame_number * frame_period * CPU_CLOCK_HZ) % 2**32
+    header = _HEADER.pack(DEMO_VERSION, total_bytes, DEMO_PLATFORM, frame_number % 2**32, time_cpu_cycles,
+                          num_points, len(tlvs), sub_frame_number)
+    return (MAGIC_WORD + header + body).ljust(total_bytes, b'\0')
+
+
+def make_stream(num_frames, num_points, first_frame=1, garbage_bytes=0, seed=0, **frame_options):
+    """Return num_frames back-to-back packets as bytes
+
+    num_points is a point count or a function of the frame number.
+    garbage_bytes random bytes are put in front of every packet to exercise
+    resynchronisation.
+    """
+    rng = np.random.default_rng(seed)
+    parts = []
+    for frame_number in range(first_frame, first_frame + num_frames):
+        if garbage_bytes:
+            parts.append(rng.integers(0, 256, garbage_bytes, dtype=np.uint8).tobytes())
+        count = num_points(frame_number) if callable(num_points) else num_points
+        parts.append(make_frame(count, frame_number, rng=rng, **frame_options))
+    return b''.join(parts)
+
+
+def flip_bytes(data, count, seed=0):
+    """Return a copy of data with count randomly chosen bytes overwritten"""
+    rng = np.random.default_rng(seed)
+    damaged = bytearray(data)
+    for index in rng.integers(0, len(damaged), count):
+        damaged[index] = int(rng.integers(0, 256))
+    return bytes(damaged)
+
+
+def split_chunks(data, min_size=1, max_size=4096, seed=0):
+    """Yield data in random sized pieces, like the reads of a UART"""
+    rng = np.random.default_rng(seed)
+    view = memoryview(data)
+    pos = 0
+    while pos < len(view):
+        size = int(rng.integers(min_size, max_size + 1))
+        yield view[pos:pos + size]
+        pos += size
+
+
+def main():
+    """Write a synthetic capture file"""
+    parser = argparse.ArgumentParser(description="Write synthetic mmw demo output packets to a file")
+    parser.add_argument('path', help="Output file")
+    parser.add_argument('--frames', type=int, default=1000, help="Number of frames")
+    parser.add_argument('--points', type=int, default=20, help="Detected points per frame")
+    parser.add_argument('--garbage', type=int, default=0, help="Random bytes before every frame")
+    parser.add_argument('--seed', type=int, default=0, help="Random seed")
+    args = parser.parse_args()
+
+    data = make_stream(args.frames, args.points, garbage_bytes=args.garbage, seed=args.seed)
+    with open(args.path, 'wb') as f:
+        f.write(data)
+    print(f"Wrote {args.frames} frames ({len(data)} bytes) to {args.path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -39,17 +39,40 @@ import socket
 import time
 import numpy as np
 from datetime import datetime
+from sensor_pose import get_pose
+from frame_datagram import UdpFrameSender
+from radar_frame import Frame
 
 # definations for parser pass/fail
 TC_PASS   =  0
 TC_FAIL   =  1
 
+# magic word at the start of every mmw demo output packet header
+MAGIC_WORD = bytes([2, 1, 4, 3, 6, 5, 8, 7])
+
+# mmw demo output packet TLV types
+MMWDEMO_OUTPUT_MSG_DETECTED_POINTS                  = 1
+MMWDEMO_OUTPUT_MSG_RANGE_PROFILE                    = 2
+MMWDEMO_OUTPUT_MSG_NOISE_PROFILE                    = 3
+MMWDEMO_OUTPUT_MSG_AZIMUT_STATIC_HEAT_MAP           = 4
+MMWDEMO_OUTPUT_MSG_RANGE_DOPPLER_HEAT_MAP           = 5
+MMWDEMO_OUTPUT_MSG_STATS                            = 6
+MMWDEMO_OUTPUT_MSG_DETECTED_POINTS_SIDE_INFO        = 7
+MMWDEMO_OUTPUT_MSG_AZIMUT_ELEVATION_STATIC_HEAT_MAP = 8
+MMWDEMO_OUTPUT_MSG_TEMPERATURE_STATS                = 9
+
 serverAddress = ('192.168.30.150',2222)
 #serverAddress = ('localhost',2222) 
 #serverAddress = ('MacBook-Pro.local',2222)
 
 UDPClient = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
 
+# UDP output formats of parser_one_mmw_demo_output_packet()
+UDP_OUTPUT_TEXT   = 'text'    # one utf-16 text datagram per detected object
+UDP_OUTPUT_BINARY = 'binary'  # one binary datagram per frame, see frame_datagram.py
+
+frameSender = UdpFrameSender(serverAddress, UDPClient)
+
 def getUint32(data):
     """!
        This function coverts 4 bytes to a 32-bit unsigned integer.
@@ -79,7 +102,7 @@ def getHex(data):
         @param data : 1-demension byte array
         @return     : 32-bit unsigned integer in hex
     """ 
-    return (binascii.hexlify(data[::-1]))
+    return (binascii.hexlify(bytes(data[::-1])))
 
 def checkMagicPattern(data):
     """!
@@ -93,14 +116,269 @@ def checkMagicPattern(data):
     if (data[0] == 2 and data[1] == 1 and data[2] == 4 and data[3] == 3 and data[4] == 6 and data[5] == 5 and data[6] == 8 and data[7] == 7):
         found = 1
     return (found)
-          
-def parser_helper(data, readNumBytes):
+
+def findMagicPattern(data, start, end):
+    """!
+       This function searches data[start:end] for the magic pattern with a native substring search instead of comparing every byte offset in python.
+
+        @param data  : 1-demension byte array
+        @param start : the first index to search from
+        @param end   : the index to stop searching at
+        @return      : index of the first magic pattern in data
+                       -1 if magic pattern is not found
+    """
+    try:
+        return data.find(MAGIC_WORD, start, end)
+    except AttributeError:
+        # memoryview and numpy buffers have no find(), search a copy of the requested range
+        if data[start:start+8] == MAGIC_WORD:
+            return start
+        index = bytes(data[start:end]).find(MAGIC_WORD)
+        if index == -1:
+            return -1
+        return start + index
+
+class MagicWordSync:
+    """!
+       Magic pattern sync state kept between parser_helper() calls on a receive buffer that only grows at the end.
+       Bytes already searched are never searched again, a located header is remembered until the caller consumes it and bytes thrown away in front of a header are counted.
+       The caller reports every removal from the front of its buffer with consume() (parsed packets) or discard() (dropped bytes).
+    """
+
+    def __init__(self):
+        self.reset()
+        self.bytesSkipped = 0   # bytes thrown away in front of a header or dropped by the caller
+        self.resyncCount  = 0   # number of headers that were not at the start of the buffer
+
+    def reset(self):
+        """!
+           Forget the search position and located header, e.g. after the caller cleared its buffer. Counters are kept.
+        """
+        self.searchStart      = 0   # no magic pattern starts before this index
+        self.headerStartIndex = -1  # located header not yet consumed by the caller
+        self.countedUpTo      = 0   # bytes before this index are already in bytesSkipped
+
+    def find(self, data, readNumBytes):
+        """!
+           This function returns the start location of the first header in data, searching only bytes that were not searched before.
+
+            @param data         : 1-demension byte array holds the receive buffer
+            @param readNumBytes : the number of bytes contained in this input byte array
+            @return             : the header start location, -1 if no header is found yet
+        """
+        if self.headerStartIndex >= 0:
+            return self.headerStartIndex
+
+        index = findMagicPattern(data, self.searchStart, readNumBytes)
+        if index == -1:
+            # the last 7 bytes may hold the beginning of a magic pattern
+            self.searchStart = max(self.searchStart, readNumBytes - 7)
+        else:
+            self.headerStartIndex = index
+            if index > self.countedUpTo:
+                self.bytesSkipped += index - self.countedUpTo
+                self.countedUpTo = index
+            if index > 0:
+                self.resyncCount += 1
+        return index
+
+    def consume(self, numBytes):
+        """!
+           The caller removed numBytes of parsed packet data from the front of its buffer.
+        """
+        self.searchStart = max(0, self.searchStart - numBytes)
+        self.countedUpTo = max(0, self.countedUpTo - numBytes)
+        if self.headerStartIndex >= numBytes:
+            self.headerStartIndex -= numBytes
+        else:
+            self.headerStartIndex = -1
+
+    def discard(self, numBytes):
+        """!
+           The caller dropped numBytes of unparsed data from the front of its buffer.
+        """
+        if numBytes > self.countedUpTo:
+            self.bytesSkipped += numBytes - self.countedUpTo
+        self.consume(numBytes)
+
+# numpy view of one MMWDEMO_OUTPUT_MSG_DETECTED_POINTS entry: x, y, z, v as little-endian 32-bit floats
+detectedPointDtype = np.dtype([('x', '<f4'), ('y', '<f4'), ('z', '<f4'), ('v', '<f4')])
+
+def decodeDetectedPoints(data, pointsStart, numDetObj):
+    """!
+       This function decodes the x, y, z, v block of TLV type 1 for all detected objects with one numpy view and computes range, azimuth and elevation angle with array operations.
+
+        @param data        : 1-demension byte array holds the mmw demo output packet
+        @param pointsStart : the location of the first object's x value in data (start of the TLV payload)
+        @param numDetObj   : the number of detected objects contained in this TLV
+
+        @return x, y, z, v           : 1-demension float arrays holds each detected target's x, y, z, v
+        @return compDetectedRange    : 1-demension float array holds each detected target's range
+        @return detectedAzimuth      : 1-demension float array holds each detected target's azimuth in degrees
+        @return detectedElevAngle    : 1-demension float array holds each detected target's elevation angle in degrees
+    """
+    PI = 3.14159265
+
+    points = np.frombuffer(data, dtype=detectedPointDtype, count=int(numDetObj), offset=int(pointsStart))
+
+    # widen to double so results match the per-object struct.unpack path
+    x = points['x'].astype(np.float64)
+    y = points['y'].astype(np.float64)
+    z = points['z'].astype(np.float64)
+    v = points['v'].astype(np.float64)
+
+    xySquared = (x * x) + (y * y)
+    compDetectedRange = np.sqrt(xySquared + (z * z))
+    xyRange = np.sqrt(xySquared)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        detectedAzimuth = np.where(y == 0,
+                                   np.where(x >= 0, 90.0, -90.0),
+                                   np.arctan(x / y) * 180 / PI)
+        detectedElevAngle = np.where((x == 0) & (y == 0),
+                                     np.where(z >= 0, 90.0, -90.0),
+                                     np.arctan(z / xyRange) * 180 / PI)
+
+    return (x, y, z, v, compDetectedRange, detectedAzimuth, detectedElevAngle)
+
+# TLV type -> decoder(data, payloadStart, tlvLen, numDetObj), filled by registerTlvDecoder()
+tlvDecoders = {}
+
+def registerTlvDecoder(tlvType):
+    """!
+       This function returns a decorator that registers the decorated function as the decoder of one TLV type.
+
+        @param tlvType : the TLV type handled by the decorated function
+        @return        : the decorator
+    """
+    def register(decoder):
+        tlvDecoders[tlvType] = decoder
+        return decoder
+    return register
+
+@registerTlvDecoder(MMWDEMO_OUTPUT_MSG_DETECTED_POINTS)
+def decodeDetectedPointsTlv(data, payloadStart, tlvLen, numDetObj):
+    """!
+       TLV type 1 decoder, see decodeDetectedPoints().
+    """
+    return decodeDetectedPoints(data, payloadStart, min(int(numDetObj), int(tlvLen) // detectedPointDtype.itemsize))
+
+# numpy view of one MMWDEMO_OUTPUT_MSG_DETECTED_POINTS_SIDE_INFO entry: snr and noise in 0.1 dB
+sideInfoDtype = np.dtype([('snr', '<u2'), ('noise', '<u2')])
+
+@registerTlvDecoder(MMWDEMO_OUTPUT_MSG_DETECTED_POINTS_SIDE_INFO)
+def decodeSideInfoTlv(data, payloadStart, tlvLen, numDetObj):
+    """!
+       TLV type 7 decoder.
+
+        @return : structured array with fields snr and noise for each detected object, a copy so the cached value does not pin the packet buffer
+    """
+    return np.frombuffer(data, dtype=sideInfoDtype, count=min(int(numDetObj), int(tlvLen) // sideInfoDtype.itemsize), offset=int(payloadStart)).copy()
+
+@registerTlvDecoder(MMWDEMO_OUTPUT_MSG_RANGE_PROFILE)
+@registerTlvDecoder(MMWDEMO_OUTPUT_MSG_NOISE_PROFILE)
+@registerTlvDecoder(MMWDEMO_OUTPUT_MSG_RANGE_DOPPLER_HEAT_MAP)
+def decodeUint16ArrayTlv(data, payloadStart, tlvLen, numDetObj):
+    """!
+       TLV type 2, 3 and 5 decoder. The log magnitude range / noise profile holds one Q9 16-bit value per range bin, the range doppler heat map one 16-bit value per range and doppler bin.
+
+        @return : 1-demension uint16 array, a copy so the cached value does not pin the packet buffer
+    """
+    return np.frombuffer(data, dtype='<u2', count=int(tlvLen) // 2, offset=int(payloadStart)).copy()
+
+# MMWDEMO_OUTPUT_MSG_STATS payload, six 32-bit unsigned integers
+statsStruct = struct.Struct('<6I')
+statsFields = ('interFrameProcessingTime', 'transmitOutputTime', 'interFrameProcessingMargin',
+               'interChirpProcessingMargin', 'activeFrameCPULoad', 'interFrameCPULoad')
+
+@registerTlvDecoder(MMWDEMO_OUTPUT_MSG_STATS)
+def decodeStatsTlv(data, payloadStart, tlvLen, numDetObj):
+    """!
+       TLV type 6 decoder.
+
+        @return : dictionary of the statistics fields, times in usec and CPU loads in percent
+    """
+    return dict(zip(statsFields, statsStruct.unpack_from(data, int(payloadStart))))
+
+def iterTlv(data, headerStartIndex, totalPacketNumBytes, numTlv):
+    """!
+       This function walks all TLVs of one mmw demo output packet by their length fields without decoding them.
+
+        @param data                : 1-demension byte array holds the mmw demo output packet
+        @param headerStartIndex    : the mmw demo output packet header start location
+        @param totalPacketNumBytes : the mmw demo output packet lenght
+        @param numTlv              : the number of TLV contained in this mmw demo output packet
+
+        @return                    : iterator of (tlvType, payloadStart, tlvLen), stops early if a TLV does not fit in the packet
+    """
+    headerNumBytes = 40
+    tlvStart = int(headerStartIndex) + headerNumBytes
+    packetEnd = int(headerStartIndex) + int(totalPacketNumBytes)
+
+    for tlvIndex in range(int(numTlv)):
+        if tlvStart + 8 > packetEnd:
+            break
+        tlvType = getUint32(data[tlvStart+0:tlvStart+4:1])
+        tlvLen  = getUint32(data[tlvStart+4:tlvStart+8:1])
+        if tlvStart + 8 + tlvLen > packetEnd:
+            break
+        yield (tlvType, tlvStart + 8, tlvLen)
+        tlvStart = tlvStart + 8 + tlvLen
+
+class TlvPacket:
+    """!
+       Index of all TLVs of one mmw demo output packet. A TLV is decoded by its registered decoder the first time decode() asks for its type.
+    """
+
+    def __init__(self, data, headerStartIndex, totalPacketNumBytes, numTlv, numDetObj):
+        self.data      = data
+        self.numDetObj = numDetObj
+        self.tlvs      = {}   # tlvType -> (payloadStart, tlvLen)
+        self.decoded   = {}   # tlvType -> decoded value
+        for (tlvType, payloadStart, tlvLen) in iterTlv(data, headerStartIndex, totalPacketNumBytes, numTlv):
+            self.tlvs.setdefault(tlvType, (payloadStart, tlvLen))
+
+    def has(self, tlvType):
+        """!
+           @return : True if the packet contains a TLV of this type
+        """
+        return tlvType in self.tlvs
+
+    def location(self, tlvType):
+        """!
+           @return : (payloadStart, tlvLen) of the TLV of this type
+        """
+        return self.tlvs[tlvType]
+
+    def decode(self, tlvType):
+        """!
+           This function decodes the TLV of this type once and returns the cached value afterwards.
+
+            @param tlvType : the TLV type to decode
+            @return        : the decoded value, the raw payload if no decoder is registered for this type, None if the packet has no such TLV
+        """
+        if tlvType in self.decoded:
+            return self.decoded[tlvType]
+        if tlvType not in self.tlvs:
+            return None
+
+        (payloadStart, tlvLen) = self.tlvs[tlvType]
+        decoder = tlvDecoders.get(tlvType)
+        if decoder is None:
+            value = self.data[payloadStart:payloadStart+tlvLen]
+        else:
+            value = decoder(self.data, payloadStart, tlvLen, self.numDetObj)
+        self.decoded[tlvType] = value
+        return value
+
+def parser_helper(data, readNumBytes, sync=None):
     
     """!
        This function is called by parser_one_mmw_demo_output_packet() function or application to read the input buffer, find the magic number, header location, the length of frame, the number of detected object and the number of TLV contained in this mmw demo output packet.
 
         @param data                   : 1-demension byte array holds the the data read from mmw demo output. It ignorant of the fact that data is coming from UART directly or file read.  
         @param readNumBytes           : the number of bytes contained in this input byte array  
+        @param sync                   : optional MagicWordSync that keeps the search position between calls on the same buffer
             
         @return headerStartIndex      : the mmw demo output packet header start location
         @return totalPacketNumBytes   : the mmw demo output packet lenght           
@@ -109,12 +387,10 @@ def parser_helper(data, readNumBytes):
         @return subFrameNumber        : the sbuframe index (0,1,2 or 3) of the frame contained in this mmw demo output packet
     """ 
 
-    headerStartIndex = -1
-
-    for index in range (readNumBytes):
-        if checkMagicPattern(data[index:index+8:1]) == 1:
-            headerStartIndex = index
-            break
+    if sync is None:
+        headerStartIndex = findMagicPattern(data, 0, readNumBytes)
+    else:
+        headerStartIndex = sync.find(data, readNumBytes)
   
     if headerStartIndex == -1: # does not find the magic number i.e output packet header 
         totalPacketNumBytes = -1
@@ -145,55 +421,41 @@ def parser_helper(data, readNumBytes):
     return (headerStartIndex, totalPacketNumBytes, numDetObj, numTlv, subFrameNumber)
 
 
-def parser_one_mmw_demo_output_packet(data, readNumBytes, ID, X_translation, Y_translation, Z_translation, yaw_psi, pitch_theta, roll_phi):
+# mmw demo output packet header: magic word, version, totalPacketLen, platform, frameNumber, timeCpuCycles, numDetectedObj, numTLVs, subFrameNumber
+packetHeaderStruct = struct.Struct('<8s8I')
+
+def parser_frame(data, readNumBytes, frame=None, sync=None, vectorized=True):
     """!
-       This function is called by application. Firstly it calls parser_helper() function to find the start location of the mmw demo output packet, then extract the contents from the output packet.
+       This function is called by application. Firstly it calls parser_helper() function to find the start location of the mmw demo output packet, then decodes the header and the detected points of the output packet into a Frame.
        Each invocation of this function handles only one frame at a time and user needs to manage looping around to parse data for multiple frames.
+       Passing the Frame returned by the previous call reuses its point storage.
 
         @param data                   : 1-demension byte array holds the the data read from mmw demo output. It ignorant of the fact that data is coming from UART directly or file read.  
         @param readNumBytes           : the number of bytes contained in this input byte array  
+        @param frame                  : Frame to fill, a new Frame is created if None
+        @param sync                   : optional MagicWordSync passed on to parser_helper()
+        @param vectorized             : decode TLV type 1 with one numpy view (True) or one object at a time (False)
             
         @return result                : parser result. 0 pass otherwise fail
-        @return headerStartIndex      : the mmw demo output packet header start location
-        @return totalPacketNumBytes   : the mmw demo output packet lenght           
-        @return numDetObj             : the number of detected objects contained in this mmw demo output packet          
-        @return numTlv                : the number of TLV contained in this mmw demo output packet           
-        @return subFrameNumber        : the sbuframe index (0,1,2 or 3) of the frame contained in this mmw demo output packet
-        @return detectedX_array       : 1-demension array holds each detected target's x of the mmw demo output packet
-        @return detectedY_array       : 1-demension array holds each detected target's y of the mmw demo output packet
-        @return detectedZ_array       : 1-demension array holds each detected target's z of the mmw demo output packet
-        @return detectedV_array       : 1-demension array holds each detected target's v of the mmw demo output packet
-        @return detectedRange_array   : 1-demension array holds each detected target's range profile of the mmw demo output packet
-        @return detectedAzimuth_array : 1-demension array holds each detected target's azimuth of the mmw demo output packet
-        @return detectedElevAngle_array : 1-demension array holds each detected target's elevAngle of the mmw demo output packet
-        @return detectedSNR_array     : 1-demension array holds each detected target's snr of the mmw demo output packet
-        @return detectedNoise_array   : 1-demension array holds each detected target's noise of the mmw demo output packet
+        @return frame                 : Frame holding the header fields and one structured array of the detected points (x, y, z, v, range, azimuth, elevation, snr, noise). points is empty if the parser failed
     """
 
-    headerNumBytes = 40
-    
-    
-
     PI = 3.14159265
 
-    detectedX_array = []
-    detectedY_array = []
-    detectedZ_array = []
-    detectedV_array = []
-    detectedRange_array = []
-    detectedAzimuth_array = []
-    detectedElevAngle_array = []
-    detectedSNR_array = []
-    detectedNoise_array = []
+    if frame is None:
+        frame = Frame()
+    frame.clear()
 
     result = TC_PASS
     
-    #headerStartIndex = int(headerStartIndex).encode('utf-8')
-    #totalPacketNumBytes = int(totalPacketNumBytes).encode('utf-8')
-    #readNumBytes = int(readNumBytes).encode('utf-8')
-    
     # call parser_helper() function to find the output packet header start location and packet size 
-    (headerStartIndex, totalPacketNumBytes, numDetObj, numTlv, subFrameNumber) = parser_helper(data, readNumBytes)
+    (headerStartIndex, totalPacketNumBytes, numDetObj, numTlv, subFrameNumber) = parser_helper(data, readNumBytes, sync)
+
+    frame.header_start       = headerStartIndex
+    frame.total_packet_bytes = totalPacketNumBytes
+    frame.num_det_obj        = numDetObj
+    frame.num_tlv            = numTlv
+    frame.sub_frame_number   = subFrameNumber
                          
     if headerStartIndex == -1:
         result = TC_FAIL
@@ -228,208 +490,212 @@ def parser_one_mmw_demo_output_packet(data, readNumBytes, ID, X_translation, Y_t
             #fail_5 = str("************ Frame Fail, subFrameNumber = %s *****************").encode('utf-8')
             #subFrameNumber = str(subFrameNumber).encode('utf-8')
             #UDPClient.sendto(fail_5 % (subFrameNumber), serverAddress)
+        elif int(numDetObj) > (int(totalPacketNumBytes) - 40) // detectedPointDtype.itemsize:
+            # a damaged header, the points could not fit in the packet; checked before the point storage is sized
+            result = TC_FAIL
+            print("************ Frame Fail, numDetObj = %d does not fit in %d bytes *****************" % (numDetObj, totalPacketNumBytes))
         else: 
-            # process the 1st TLV
-            tlvStart = int(headerStartIndex) + int(headerNumBytes)
-                                                    
-            tlvType    = getUint32(data[tlvStart+0:tlvStart+4:1])
-            tlvLen     = getUint32(data[tlvStart+4:tlvStart+8:1])       
-            offset = 8
-            
-            #print("The 1st TLV") 
-            #print("    type %d" % (tlvType))
-            #print("    len %d bytes" % (tlvLen))
-            
-            #TLV_1 = str("The 1st TLV").encode('utf-8')
-            #UDPClient.sendto(TLV_1, serverAddress)
-            #UDPClient.sendto(str("    type %d").encode('utf-8') % (tlvType), serverAddress)
-            #UDPClient.sendto(str("    len %d bytes").encode('utf-8') % (tlvLen), serverAddress)
-                                                    
-            # the 1st TLV must be type 1
-            if tlvType == 1 and int(tlvLen) < int(totalPacketNumBytes):#MMWDEMO_UART_MSG_DETECTED_POINTS
+            (magic, frame.version, totalPacketNumBytes, frame.platform, frame.frame_number, frame.time_cpu_cycles, numDetObj, numTlv, subFrameNumber) = packetHeaderStruct.unpack_from(data, headerStartIndex)
+            frame.timestamp = time.time()
+
+            # index all numTlv TLVs of this packet by type, a TLV is only decoded when it is asked for
+            tlvs = TlvPacket(data, headerStartIndex, totalPacketNumBytes, numTlv, numDetObj)
+            frame.tlvs = tlvs
+
+            points = frame.resize(int(numDetObj))
+            numPoints = 0
+            numSideInfo = numDetObj
+
+            if tlvs.has(MMWDEMO_OUTPUT_MSG_DETECTED_POINTS):
                          
                 # TLV type 1 contains x, y, z, v values of all detect objects. 
                 # each x, y, z, v are 32-bit float in IEEE 754 single-precision binary floating-point format, so every 16 bytes represent x, y, z, v values of one detect objects.    
                 
-                # for each detect objects, extract/convert float x, y, z, v values and calculate range profile and azimuth                           
-                for obj in range(int(numDetObj)):
-                    # convert byte0 to byte3 to float x value
-                    x = struct.unpack('<f', codecs.decode(binascii.hexlify(data[tlvStart + offset:tlvStart + offset+4:1]),'hex'))[0]
-
-                    # convert byte4 to byte7 to float y value
-                    y = struct.unpack('<f', codecs.decode(binascii.hexlify(data[tlvStart + offset+4:tlvStart + offset+8:1]),'hex'))[0]
-
-                    # convert byte8 to byte11 to float z value
-                    z = struct.unpack('<f', codecs.decode(binascii.hexlify(data[tlvStart + offset+8:tlvStart + offset+12:1]),'hex'))[0]
-
-                    # convert byte12 to byte15 to float v value
-                    v = struct.unpack('<f', codecs.decode(binascii.hexlify(data[tlvStart + offset+12:tlvStart + offset+16:1]),'hex'))[0]
-
-                    # calculate range profile from x, y, z
-                    compDetectedRange = math.sqrt((x * x)+(y * y)+(z * z))
-
-                    # calculate azimuth from x, y           
-                    if y == 0:
-                        if x >= 0:
-                            detectedAzimuth = 90
+                if vectorized:
+                    # decode the whole x, y, z, v block at once and calculate range profile, azimuth and elevation with array operations
+                    (x, y, z, v, compDetectedRange, detectedAzimuth, detectedElevAngle) = tlvs.decode(MMWDEMO_OUTPUT_MSG_DETECTED_POINTS)
+
+                    numPoints = len(x)
+                    if numPoints == numDetObj:
+                        points['x'] = x
+                        points['y'] = y
+                        points['z'] = z
+                        points['v'] = v
+                        points['range'] = compDetectedRange
+                        points['azimuth'] = detectedAzimuth
+                        points['elevation'] = detectedElevAngle
+                else:
+                    (tlvStart, tlvLen) = tlvs.location(MMWDEMO_OUTPUT_MSG_DETECTED_POINTS)
+                    tlvStart = tlvStart - 8
+                    offset = 8
+                    numPoints = numDetObj
+
+                    # for each detect objects, extract/convert float x, y, z, v values and calculate range profile and azimuth                           
+                    for obj in range(int(numDetObj)):
+                        # convert byte0 to byte3 to float x value
+                        x = struct.unpack('<f', codecs.decode(binascii.hexlify(data[tlvStart + offset:tlvStart + offset+4:1]),'hex'))[0]
+
+                        # convert byte4 to byte7 to float y value
+                        y = struct.unpack('<f', codecs.decode(binascii.hexlify(data[tlvStart + offset+4:tlvStart + offset+8:1]),'hex'))[0]
+
+                        # convert byte8 to byte11 to float z value
+                        z = struct.unpack('<f', codecs.decode(binascii.hexlify(data[tlvStart + offset+8:tlvStart + offset+12:1]),'hex'))[0]
+
+                        # convert byte12 to byte15 to float v value
+                        v = struct.unpack('<f', codecs.decode(binascii.hexlify(data[tlvStart + offset+12:tlvStart + offset+16:1]),'hex'))[0]
+
+                        # calculate range profile from x, y, z
+                        compDetectedRange = math.sqrt((x * x)+(y * y)+(z * z))
+
+                        # calculate azimuth from x, y           
+                        if y == 0:
+                            if x >= 0:
+                                detectedAzimuth = 90
+                            else:
+                                detectedAzimuth = -90 
                         else:
-                            detectedAzimuth = -90 
-                    else:
-                        detectedAzimuth = math.atan(x/y) * 180 / PI
-
-                    # calculate elevation angle from x, y, z
-                    if x == 0 and y == 0:
-                        if z >= 0:
-                            detectedElevAngle = 90
-                        else: 
-                            detectedElevAngle = -90
-                    else:
-                        detectedElevAngle = math.atan(z/math.sqrt((x * x)+(y * y))) * 180 / PI
+                            detectedAzimuth = math.atan(x/y) * 180 / PI
+
+                        # calculate elevation angle from x, y, z
+                        if x == 0 and y == 0:
+                            if z >= 0:
+                                detectedElevAngle = 90
+                            else: 
+                                detectedElevAngle = -90
+                        else:
+                            detectedElevAngle = math.atan(z/math.sqrt((x * x)+(y * y))) * 180 / PI
                             
-                    detectedX_array.append(x)
-                    detectedY_array.append(y)
-                    detectedZ_array.append(z)
-                    detectedV_array.append(v)
-                    detectedRange_array.append(compDetectedRange)
-                    detectedAzimuth_array.append(detectedAzimuth)
-                    detectedElevAngle_array.append(detectedElevAngle)
+                        points[obj] = (x, y, z, v, compDetectedRange, detectedAzimuth, detectedElevAngle, 0, 0)
                                                                 
-                    offset = offset + 16
-                # end of for obj in range(numDetObj) for 1st TLV
-                                                            
-            # Process the 2nd TLV
-            tlvStart = tlvStart + 8 + tlvLen
-                                                    
-            tlvType    = getUint32(data[tlvStart+0:tlvStart+4:1])
-            tlvLen     = getUint32(data[tlvStart+4:tlvStart+8:1])      
-            offset = 8
-            
-            #print("The 2nd TLV") 
-            #print("    type %d" % (tlvType))
-            #print("    len %d bytes" % (tlvLen))
-            
-            #UDPClient.sendto(str("The 2nd TLV").encode('utf-8'), serverAddress) 
-            #UDPClient.sendto(str("    type %d").encode('utf-8') % (tlvType), serverAddress)
-            #UDPClient.sendto(str("    len %d bytes").encode('utf-8') % (tlvLen), serverAddress)
+                        offset = offset + 16
+                    # end of for obj in range(numDetObj) for 1st TLV
                                                             
-            if tlvType == 7: 
+            if tlvs.has(MMWDEMO_OUTPUT_MSG_DETECTED_POINTS_SIDE_INFO): 
                 
                 # TLV type 7 contains snr and noise of all detect objects.
                 # each snr and noise are 16-bit integer represented by 2 bytes, so every 4 bytes represent snr and noise of one detect objects.    
             
-                # for each detect objects, extract snr and noise                                            
-                for obj in range(int(numDetObj)):
-                    # byte0 and byte1 represent snr. convert 2 bytes to 16-bit integer
-                    snr   = getUint16(data[tlvStart + offset + 0:tlvStart + offset + 2:1])
-                    # byte2 and byte3 represent noise. convert 2 bytes to 16-bit integer 
-                    noise = getUint16(data[tlvStart + offset + 2:tlvStart + offset + 4:1])
-
-                    detectedSNR_array.append(snr)
-                    detectedNoise_array.append(noise)
+                if vectorized:
+                    sideInfo = tlvs.decode(MMWDEMO_OUTPUT_MSG_DETECTED_POINTS_SIDE_INFO)
+
+                    numSideInfo = len(sideInfo)
+                    if numSideInfo == numDetObj:
+                        points['snr'] = sideInfo['snr']
+                        points['noise'] = sideInfo['noise']
+                else:
+                    (tlvStart, tlvLen) = tlvs.location(MMWDEMO_OUTPUT_MSG_DETECTED_POINTS_SIDE_INFO)
+                    tlvStart = tlvStart - 8
+                    offset = 8
+
+                    # for each detect objects, extract snr and noise                                            
+                    for obj in range(int(numDetObj)):
+                        # byte0 and byte1 represent snr. convert 2 bytes to 16-bit integer
+                        snr   = getUint16(data[tlvStart + offset + 0:tlvStart + offset + 2:1])
+                        # byte2 and byte3 represent noise. convert 2 bytes to 16-bit integer 
+                        noise = getUint16(data[tlvStart + offset + 2:tlvStart + offset + 4:1])
+
+                        points['snr'][obj] = snr
+                        points['noise'][obj] = noise
                                                                     
-                    offset = offset + 4
+                        offset = offset + 4
             else:
-                for obj in range(numDetObj):
-                    detectedSNR_array.append(0)
-                    detectedNoise_array.append(0)
+                points['snr'] = 0
+                points['noise'] = 0
             # end of if tlvType == 7
-            
-            #obj = str(obj).encode('utf-8')
-            ##data1 = "Data from Raspberry 1"
-            ##data1 = data1.encode('utf-16')
-            ##UDPClient.sendto(data1, serverAddress)
-            
-            ###print("                  x(m)         y(m)         z(m)        v(m/s)    Com0range(m)  azimuth(deg)  elevAngle(deg)  snr(0.1dB)    noise(0.1dB)")
-            #UDPClient.sendto(str("                  x(m)         y(m)         z(m)        v(m/s)    Com0range(m)  azimuth(deg)  elevAngle(deg)  snr(0.1dB)    noise(0.1dB)").encode('utf-8'), serverAddress)
-            for obj in range(numDetObj):
-                #UDPClient.sendto(str("    obj%3d: %12f %12f %12f %12f %12f %12f %12d %12d %12d").encode('utf-8') % (obj, detectedX_array[obj], detectedY_array[obj], detectedZ_array[obj], detectedV_array[obj], detectedRange_array[obj], detectedAzimuth_array[obj], detectedElevAngle_array[obj], detectedSNR_array[obj], detectedNoise_array[obj]), serverAddress)
-                #print(detectedRange_array[obj])
-                #detectedRange_array =  detectedRange_array[obj]
-                #detectedRange_array = [x.encode('utf-8') for [x] in detectedRange_array]
-
-                #UDPClient.sendto(hello, serverAddress)
-                ###print("    obj%3d: %12f %12f %12f %12f %12f %12f %12d %12d %12d" % (obj, detectedX_array[obj], detectedY_array[obj], detectedZ_array[obj], detectedV_array[obj], detectedRange_array[obj], detectedAzimuth_array[obj], detectedElevAngle_array[obj], detectedSNR_array[obj], detectedNoise_array[obj]))
-                #detectedRange_array = detectedRange_array[obj]
-#                 print(detectedRange_array[obj])
-                #print(numDetObj)
-                detectedRange = detectedRange_array[obj]
-                detectedRange = str(detectedRange).encode('utf-16')
-                #numDetObj1 = numDetObj
-                #numDetObj1 = str(numDetObj1).encode('utf-16')
-#                 UDPClient.sendto(detectedRange, serverAddress)
-                #UDPClient.sendto(numDetObj1, serverAddress)
-                dt = datetime.now()
-                ts = datetime.timestamp(dt)
-                #print(dt)
-                #print(ts)
-                
-                #string = ('@', 2, ts, numDetObj, obj, detectedX_array[obj], detectedY_array[obj], detectedZ_array[obj], detectedV_array[obj], detectedRange_array[obj], detectedAzimuth_array[obj], detectedElevAngle_array[obj], detectedSNR_array[obj], detectedNoise_array[obj])
-                
-                X_Anchor = X_translation
-                Y_Anchor = Y_translation
-                Z_Anchor = Z_translation
-                
-                X = detectedX_array[obj]
-                Y = detectedY_array[obj]
-                Z = detectedZ_array[obj]
-                
-                #P_ = np.array([X_Anchor, Y_Anchor, Z_Anchor]).reshape(-1,1)
-                P_ = np.array([Y, -X, Z]).reshape(-1,1)
-                
-                
-                #phi=roll;theta=pitch;psi=yaw;
-                phi = roll_phi/180*math.pi
-                theta = pitch_theta/180*math.pi
-                psi = yaw_psi/180*math.pi
 
-                Rx = np.array([[1, 0, 0],
-                               [0, np.cos(phi), -np.sin(phi)],
-                               [0, np.sin(phi), np.cos(phi)]])
-
-                Ry = np.array([[np.cos(theta), 0, np.sin(theta)],
-                               [0, 1, 0],
-                               [-np.sin(theta), 0, np.cos(theta)]])
-                Rz = np.array([[np.cos(psi), -np.sin(psi), 0],
-                               [np.sin(psi), np.cos(psi), 0],
-                               [0, 0, 1]])
-
-                RotationMatrix = np.dot(np.matmul(Rz, Ry), Rx)
+            if numPoints != numDetObj or numSideInfo != numDetObj:
+                result = TC_FAIL
+                frame.resize(0)
+                print("************ Frame Fail, TLV length does not match numDetObj = %d *****************" % (numDetObj))
+                
+    return (result, frame)
 
-                P = np.matmul(RotationMatrix, P_)
 
-                P = P.flatten().tolist()
-                
-                X_New = P[0]+X_Anchor
-                Y_New = P[1]+Y_Anchor
-                Z_New = P[2]+Z_Anchor
-                
-                #X = -0.72
-                #Y = 3.12
-#                 X1 = X*math.cos(orientation/180*math.pi)+Y*math.sin(orientation/180*math.pi)
-#                 Y1 = -X*math.sin(orientation/180*math.pi)+Y*math.cos(orientation/180*math.pi)
-#                 #X2 = math.degrees(X1)
-#                 #Y2 = math.degrees(Y1)
-#                 X2 = X1 + X_translation
-#                 Y2 = Y1 + Y_translation
-
-                #print(str(XY))
-                #XY = str(XY).encode('utf-16')
-                #UDPClient.sendto(XY, serverAddress)
-                
-                #string = ['@', 2, ts, numDetObj, obj, X2, Y2, detectedZ_array[obj], detectedV_array[obj], detectedRange_array[obj], detectedAzimuth_array[obj], detectedElevAngle_array[obj], detectedSNR_array[obj], detectedNoise_array[obj]]
-                
-                string = [ID, ts, numDetObj, obj, X_New, Y_New, Z_New, detectedV_array[obj], detectedRange_array[obj], detectedAzimuth_array[obj], detectedElevAngle_array[obj], detectedSNR_array[obj], detectedNoise_array[obj]]
+def sendFrameUdp(frame, ID, pose, udpOutput=UDP_OUTPUT_TEXT, printPoints=True, worldRecords=None):
+    """!
+       This function sends the detected points of one parsed frame to serverAddress, rotated and translated to world coordinates.
+
+        @param frame     : Frame returned by parser_frame()
+        @param ID        : the sensor ID sent with every point
+        @param pose      : SensorPose of the sensor, see sensor_pose.get_pose()
+        @param udpOutput : UDP_OUTPUT_TEXT, UDP_OUTPUT_BINARY or None to send nothing
+        @param printPoints : print every text datagram before it is sent
+        @param worldRecords : frame.world_records(pose) if the caller already has it, so the points are not transformed twice
+    """
+    if udpOutput is None:
+        return
+
+    points = frame.points
+    numDetObj = len(points)
+    if worldRecords is None:
+        worldRecords = frame.world_records(pose)
+
+    if udpOutput == UDP_OUTPUT_BINARY:
+        # the whole frame in one versioned binary datagram, split in fragments if it does not fit
+        frameSender.send(ID, frame.frame_number, worldRecords, frame.timestamp)
+
+    elif udpOutput == UDP_OUTPUT_TEXT:
+        # one utf-16 text datagram per detected object
+        # the whole frame was transformed above with one matrix multiply, the sensor pose and its rotation matrix are cached
+        worldPoints = np.column_stack((worldRecords['x'], worldRecords['y'], worldRecords['z'])).tolist()
+        detectedV_array = points['v'].tolist()
+        detectedRange_array = points['range'].tolist()
+        detectedAzimuth_array = points['azimuth'].tolist()
+        detectedElevAngle_array = points['elevation'].tolist()
+        detectedSNR_array = points['snr'].astype(int).tolist()
+        detectedNoise_array = points['noise'].astype(int).tolist()
+
+        for obj in range(numDetObj):
+            dt = datetime.now()
+            ts = datetime.timestamp(dt)
+
+            # sensor (x, y, z) rotated and translated to world coordinates
+            (X_New, Y_New, Z_New) = worldPoints[obj]
+
+            string = [ID, ts, numDetObj, obj, X_New, Y_New, Z_New, detectedV_array[obj], detectedRange_array[obj], detectedAzimuth_array[obj], detectedElevAngle_array[obj], detectedSNR_array[obj], detectedNoise_array[obj]]
+            if printPoints:
                 print(string)
-                string = str(string).encode('utf-16')
-                UDPClient.sendto(string, serverAddress)
-                #time.sleep(0.1)
-                
-    return (result, headerStartIndex, totalPacketNumBytes, numDetObj, numTlv, subFrameNumber, detectedX_array, detectedY_array, detectedZ_array, detectedV_array, detectedRange_array, detectedAzimuth_array, detectedElevAngle_array, detectedSNR_array, detectedNoise_array)
-
+            string = str(string).encode('utf-16')
+            UDPClient.sendto(string, serverAddress)
 
 
+def parser_one_mmw_demo_output_packet(data, readNumBytes, ID, X_translation, Y_translation, Z_translation, yaw_psi, pitch_theta, roll_phi, vectorized=True, sync=None, udpOutput=UDP_OUTPUT_TEXT):
+    """!
+       This function is called by application. It is the list based interface on top of parser_frame(): it parses one frame, sends its points with sendFrameUdp() and returns the points as python lists.
+       Each invocation of this function handles only one frame at a time and user needs to manage looping around to parse data for multiple frames.
 
-    
+        @param data                   : 1-demension byte array holds the the data read from mmw demo output. It ignorant of the fact that data is coming from UART directly or file read.  
+        @param readNumBytes           : the number of bytes contained in this input byte array  
+        @param vectorized             : decode TLV type 1 with one numpy view (True) or one object at a time (False)
+        @param sync                   : optional MagicWordSync passed on to parser_helper()
+        @param udpOutput              : UDP_OUTPUT_TEXT, UDP_OUTPUT_BINARY or None to send nothing to serverAddress
+            
+        @return result                : parser result. 0 pass otherwise fail
+        @return headerStartIndex      : the mmw demo output packet header start location
+        @return totalPacketNumBytes   : the mmw demo output packet lenght           
+        @return numDetObj             : the number of detected objects contained in this mmw demo output packet          
+        @return numTlv                : the number of TLV contained in this mmw demo output packet           
+        @return subFrameNumber        : the sbuframe index (0,1,2 or 3) of the frame contained in this mmw demo output packet
+        @return detectedX_array       : 1-demension array holds each detected target's x of the mmw demo output packet
+        @return detectedY_array       : 1-demension array holds each detected target's y of the mmw demo output packet
+        @return detectedZ_array       : 1-demension array holds each detected target's z of the mmw demo output packet
+        @return detectedV_array       : 1-demension array holds each detected target's v of the mmw demo output packet
+        @return detectedRange_array   : 1-demension array holds each detected target's range profile of the mmw demo output packet
+        @return detectedAzimuth_array : 1-demension array holds each detected target's azimuth of the mmw demo output packet
+        @return detectedElevAngle_array : 1-demension array holds each detected target's elevAngle of the mmw demo output packet
+        @return detectedSNR_array     : 1-demension array holds each detected target's snr of the mmw demo output packet
+        @return detectedNoise_array   : 1-demension array holds each detected target's noise of the mmw demo output packet
+    """
 
+    (result, frame) = parser_frame(data, readNumBytes, None, sync, vectorized)
 
+    if result == TC_PASS:
+        pose = get_pose(X_translation, Y_translation, Z_translation, yaw_psi, pitch_theta, roll_phi)
+        sendFrameUdp(frame, ID, pose, udpOutput)
 
+    points = frame.points
+                
+    return (result, frame.header_start, frame.total_packet_bytes, frame.num_det_obj, frame.num_tlv, frame.sub_frame_number,
+            points['x'].tolist(), points['y'].tolist(), points['z'].tolist(), points['v'].tolist(),
+            points['range'].tolist(), points['azimuth'].tolist(), points['elevation'].tolist(),
+            points['snr'].astype(int).tolist(), points['noise'].astype(int).tolist())
@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+Append-only on-disk recording of point clouds
+The recorder writes every frame's points to segment files in a directory,
+column by column as float32, and keeps a sparse index of frame number,
+timestamp and byte offset next to each segment. Segments rotate by size or
+age. The archive reader memory-maps the segments and answers time range
+queries by a binary search in the index, decoding only the frames and
+columns asked for
+
+Segment files, all little-endian:
+    points-<time>.pts  SEGMENT_MAGIC, then one block per frame: frame
+                       number, point count, timestamp (s), then each
+                       POINT_DTYPE column as point count float32 values
+    points-<time>.idx  INDEX_DTYPE entries for the first frame of the
+                       segment and then every index_every frames
+
+Run as a script to summarize or export a recording:
+    python3 point_cloud_recorder.py recordings/ --since 2026-10-18T08:00 --until 2026-10-18T09:00 --npy points.npy
+"""
+
+import argparse
+import glob
+import mmap
+import os
+import struct
+import time
+from datetime import datetime
+import numpy as np
+from frame_datagram import POINT_DTYPE
+
+SEGMENT_MAGIC = b'MMWPCOL1'
+BLOCK_HEADER = struct.Struct('<IId')
+
+INDEX_DTYPE = np.dtype([
+    ('frame_number', '<u4'), ('num_points', '<u4'), ('timestamp', '<f8'), ('offset', '<u8'),
+])
+
+COLUMNS = POINT_DTYPE.names
+COLUMN_DTYPE = np.dtype('<f4')
+
+# Points of all frames in a query, plus the frame each point belongs to
+RECORDING_POINT_DTYPE = np.dtype([('frame_number', '<u4'), ('timestamp', '<f8')] + POINT_DTYPE.descr)
+
+
+def block_bytes(num_points):
+    return BLOCK_HEADER.size + len(COLUMNS) * COLUMN_DTYPE.itemsize * num_points
+
+
+class PointCloudRecorder:
+    """Writes frames to rotating segments in directory
+
+    A new segment is started when the current one reaches
+    max_segment_bytes or is segment_seconds old. Writes are buffered and
+    flushed every flush_interval seconds, so a reader sees the active
+    segment at most that far behind; after a crash the last partly
+    written frame is ignored by the reader.
+    """
+
+    def __init__(self, directory, max_segment_bytes=64 << 20, segment_seconds=3600.0,
+                 index_every=10, flush_interval=1.0):
+        self.directory = directory
+        self.max_segment_bytes = max_segment_bytes
+        self.segment_seconds = segment_seconds
+        self.index_every = index_every
+        self.flush_interval = flush_interval
+        os.makedirs(directory, exist_ok=True)
+        self._data = None
+        self._index = None
+        self._segment_started = 0.0
+        self._segment_bytes = 0
+        self._segment_frames = 0
+        self._next_flush = 0.0
+        self._columns = np.empty((len(COLUMNS), 0), dtype=COLUMN_DTYPE)
+
+        # Counters
+        self.frames_written = 0
+        self.bytes_written = 0
+        self.segments = 0
+
+    @property
+    def segment_path(self):
+        return self._data.name if self._data else None
+
+    def _open_segment(self, timestamp):
+        self.close()
+        name = datetime.fromtimestamp(timestamp).strftime('points-%Y%m%d-%H%M%S-%f')
+        path = os.path.join(self.directory, name)
+        self._data = open(path + '.pts', 'ab')
+        self._index = open(path + '.idx', 'ab')
+        if self._data.tell() == 0:
+            self._data.write(SEGMENT_MAGIC)
+        self._segment_bytes = self._data.tell()
+        self._segment_started = time.monotonic()
+        self._segment_frames = 0
+        self.segments += 1
+
+    def write(self, frame_number, timestamp, records):
+        """Append one frame of POINT_DTYPE records"""
+        if (self._data is None or self._segment_bytes >= self.max_segment_bytes
+                or time.monotonic() - self._segment_started >= self.segment_seconds):
+            self._open_segment(timestamp)
+
+        num_points = len(records)
+        if self._segment_frames % self.index_every == 0:
+            entry = np.array([(frame_number, num_points, timestamp, self._segment_bytes)], dtype=INDEX_DTYPE)
+            self._index.write(entry.tobytes())
+
+        # One float32 row per column, reusing the buffer between frames
+        if self._columns.shape[1] < num_points:
+            self._columns = np.empty((len(COLUMNS), max(num_points, 2 * self._columns.shape[1])), dtype=COLUMN_DTYPE)
+        columns = self._columns[:, :num_points]
+        for row, name in enumerate(COLUMNS):
+            columns[row] = records[name]
+
+        self._data.write(BLOCK_HEADER.pack(frame_number, num_points, timestamp))
+        self._data.write(columns.tobytes())
+        size = block_bytes(num_points)
+        self._segment_bytes += size
+        self._segment_frames += 1
+        self.frames_written += 1
+        self.bytes_written += size
+
+        now = time.monotonic()
+        if now >= self._next_flush:
+            self._next_flush = now + self.flush_interval
+            self.flush()
+
+    def flush(self):
+        if self._data is not None:
+            # Data before index, so an index entry never points past the data
+            self._data.flush()
+            self._index.flush()
+
+    def close(self):
+        if self._data is not None:
+            self.flush()
+            self._data.close()
+            self._index.close()
+            self._data = None
+            self._index = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Segment:
+    """One memory-mapped segment and its index"""
+
+    def __init__(self, path):
+        self.path = path
+        self.size = os.path.getsize(path)
+        self._file = open(path, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else None
+        if self._mmap is None or self._mmap[:len(SEGMENT_MAGIC)] != SEGMENT_MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a point cloud segment")
+        with open(os.path.splitext(path)[0] + '.idx', 'rb') as f:
+            data = f.read()
+        # A partly written last entry is ignored
+        self.index = np.frombuffer(data, dtype=INDEX_DTYPE, count=len(data) // INDEX_DTYPE.itemsize)
+
+    @property
+    def first_timestamp(self):
+        return float(self.index['timestamp'][0]) if len(self.index) else None
+
+    def blocks(self, since=None, until=None):
+        """(frame_number, timestamp, num_points, columns offset) of every frame with since <= timestamp < until"""
+        position = len(SEGMENT_MAGIC)
+        if since is not None and len(self.index):
+            entry = max(int(np.searchsorted(self.index['timestamp'], since, 'right')) - 1, 0)
+            position = int(self.index['offset'][entry])
+
+        while position + BLOCK_HEADER.size <= self.size:
+            frame_number, num_points, timestamp = BLOCK_HEADER.unpack_from(self._mmap, position)
+            end = position + block_bytes(num_points)
+            if end > self.size or (until is not None and timestamp >= until):
+                break
+            if since is None or timestamp >= since:
+                yield frame_number, timestamp, num_points, position + BLOCK_HEADER.size
+            position = end
+
+    def column(self, offset, num_points, name):
+        """One column of the frame whose columns start at offset, as a float32 view into the file"""
+        row = COLUMNS.index(name)
+        return np.frombuffer(self._mmap, dtype=COLUMN_DTYPE, count=num_points,
+                             offset=offset + row * num_points * COLUMN_DTYPE.itemsize)
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        self._file.close()
+
+
+class PointCloudArchive:
+    """Time range queries over all segments in a recording directory
+
+    Segments are opened when first needed and kept open; refresh() picks up
+    segments (and frames) written since.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._segments = {}
+        self._paths = []
+        self.refresh()
+
+    def refresh(self):
+        self._paths = sorted(glob.glob(os.path.join(self.directory, 'points-*.pts')))
+        # The active segment grows, map it again on the next query
+        if self._paths and self._paths[-1] in self._segments:
+            self._segments.pop(self._paths[-1]).close()
+
+    def _segment(self, path):
+        if path not in self._segments:
+            try:
+                self._segments[path] = Segment(path)
+            except (OSError, ValueError):
+                return None  # just created and nothing flushed yet, or not a segment
+        return self._segments[path]
+
+    def segments(self, since=None, until=None):
+        """The segments that can hold frames with since <= timestamp < until"""
+        segments = [self._segment(path) for path in self._paths]
+        segments = [segment for segment in segments if segment is not None and segment.first_timestamp is not None]
+        selected = []
+        for i, segment in enumerate(segments):
+            if until is not None and segment.first_timestamp >= until:
+                break
+            following = segments[i + 1].first_timestamp if i + 1 < len(segments) else None
+            if since is not None and following is not None and following <= since:
+                continue
+            selected.append(segment)
+        return selected
+
+    def frames(self, since=None, until=None):
+        """(frame_number, timestamp, num_points) of every recorded frame in the range, without reading points"""
+        return [block[:3] for segment in self.segments(since, until) for block in segment.blocks(since, until)]
+
+    def query(self, since=None, until=None, columns=COLUMNS):
+        """The points of every frame in the range as one RECORDING_POINT_DTYPE array
+
+        Only the given columns are read from the files, the others are zero.
+        """
+        blocks = [(segment, block) for segment in self.segments(since, until)
+                  for block in segment.blocks(since, until)]
+        points = np.zeros(sum(block[2] for _, block in blocks), dtype=RECORDING_POINT_DTYPE)
+        start = 0
+        for segment, (frame_number, timestamp, num_points, offset) in blocks:
+            chunk = points[start:start + num_points]
+            chunk['frame_number'] = frame_number
+            chunk['timestamp'] = timestamp
+            for name in columns:
+                chunk[name] = segment.column(offset, num_points, name)
+            start += num_points
+        return points
+
+    def close(self):
+        for segment in self._segments.values():
+            segment.close()
+        self._segments.clear()
+
+
+def parse_time(text):
+    """Seconds since the epoch from a number or an ISO date and time"""
+    if text is None:
+        return None
+    try:
+        return float(text)
+    except ValueError:
+        return datetime.fromisoformat(text).timestamp()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query a point cloud recording")
+    parser.add_argument('directory', help="Recording directory")
+    parser.add_argument('--since', help="Start time, seconds since the epoch or ISO date and time")
+    parser.add_argument('--until', help="End time (exclusive)")
+    parser.add_argument('--columns', default=','.join(COLUMNS), help="Comma separated columns to read")
+    parser.add_argument('--npy', help="Save the points of the range to this .npy file")
+    args = parser.parse_args()
+
+    since, until = parse_time(args.since), parse_time(args.until)
+    archive = PointCloudArchive(args.directory)
+    started = time.perf_counter()
+    frames = archive.frames(since, until)
+    points = archive.query(since, until, args.columns.split(','))
+    elapsed = time.perf_counter() - started
+
+    print(f"{len(archive.segments())} segments, {len(archive.segments(since, until))} in range")
+    print(f"{len(frames)} frames, {len(points)} points in {elapsed * 1000:.1f} ms")
+    if frames:
+        print(f"From {datetime.fromtimestamp(frames[0][1])} (frame {frames[0][0]}) "
+              f"to {datetime.fromtimestamp(frames[-1][1])} (frame {frames[-1][0]})")
+    if args.npy:
+        np.save(args.npy, points)
+        print(f"Saved {args.npy}")
+    archive.close()
+
+
+if __name__ == "__main__":
+    main()
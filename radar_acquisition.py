@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Acquisition loop shared by the radar scripts
+Waits for bytes on the data port (a serial.Serial or a ReplayPort), parses
+them into frames with a StreamParser and hands every frame to a callback
+"""
+
+import os
+import select
+import time
+from radar_metrics import READ, PARSE
+from stream_parser import StreamParser
+
+# Serial ports of the radar, override with RADAR_CLI_PORT / RADAR_DATA_PORT
+# e.g. to use the ptys of radar_emulator.py
+CLI_PORT = os.environ.get('RADAR_CLI_PORT', '/dev/ttyACM0')
+DATA_PORT = os.environ.get('RADAR_DATA_PORT', '/dev/ttyACM1')
+CLI_BAUD = 115200
+DATA_BAUD = 921600
+
+
+class AcquisitionStats:
+    """Frame rate and per-frame latency of one acquisition run
+
+    Parse latency is measured from the wake-up (select returning, or the
+    poll) that delivered the last bytes of a frame until the frame was
+    parsed; for further frames completed by the same read it starts when
+    the callback of the frame before returned. Latency runs until the frame
+    callback returned, so it also covers all output work. Frames the
+    callback raised on are counted in callback_errors; parse failures are
+    the StreamParser's frames_failed.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.frames = 0
+        self.callback_errors = 0
+        self.bytes_read = 0
+        self.wakeups = 0
+        self.idle_polls = 0
+        self.parse_latency_total = 0.0
+        self.parse_latency_max = 0.0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    @property
+    def frame_rate(self):
+        return self.frames / max(self.elapsed, 1e-9)
+
+    @property
+    def parse_latency_mean(self):
+        return self.parse_latency_total / self.frames if self.frames else 0.0
+
+    @property
+    def latency_mean(self):
+        return self.latency_total / self.frames if self.frames else 0.0
+
+    def record(self, parse_latency, latency):
+        self.frames += 1
+        self.parse_latency_total += parse_latency
+        self.parse_latency_max = max(self.parse_latency_max, parse_latency)
+        self.latency_total += latency
+        self.latency_max = max(self.latency_max, latency)
+
+    def summary(self):
+        text = (f"{self.frames} frames in {self.elapsed:.1f} s ({self.frame_rate:.1f} fps), "
+                f"wake-to-parse mean {self.parse_latency_mean * 1000:.2f} ms, max {self.parse_latency_max * 1000:.2f} ms, "
+                f"latency mean {self.latency_mean * 1000:.2f} ms, max {self.latency_max * 1000:.2f} ms")
+        if self.callback_errors:
+            text += f", {self.callback_errors} frame callback errors"
+        return text
+
+
+def wait_for_data(data_port, timeout):
+    """Block until data_port has bytes to read or timeout seconds passed; returns the bytes read
+
+    Uses the port's own wait() (ReplayPort), select() on its file descriptor
+    (serial ports on Linux), or else a blocking one byte read that relies on
+    the port's read timeout.
+    """
+    if hasattr(data_port, 'wait'):
+        data_port.wait(timeout)
+    elif hasattr(data_port, 'fileno'):
+        select.select([data_port.fileno()], [], [], timeout)
+    else:
+        first = data_port.read(1)
+        if not first:
+            return first
+        return first + data_port.read(data_port.inWaiting())
+
+    byte_count = data_port.inWaiting()
+    return data_port.read(byte_count) if byte_count else b''
+
+
+def run_acquisition(data_port, on_frame, stream=None, poll_delay=None, on_idle=None, stats=None, idle_timeout=0.1,
+                    stop_event=None, metrics=None):
+    """Read data_port until Ctrl-C, stop_event is set or a replay finished and call on_frame(frame) for each frame
+
+    By default the loop sleeps until bytes arrive and parses them right away.
+    With poll_delay it polls inWaiting() and sleeps poll_delay seconds after
+    every poll instead, as the scripts used to. Errors raised by on_frame
+    are printed and counted in stats.callback_errors, the loop carries on
+    with the next frame.
+    on_idle(idle_polls) is called after every poll, or every idle_timeout
+    seconds of waiting, that found no data. The read and parse time of
+    every frame go to metrics, a RadarMetrics, when one is given. Returns
+    the AcquisitionStats of the run.
+    """
+    if stream is None:
+        stream = StreamParser(reuse_frame=True)
+    if stats is None:
+        stats = AcquisitionStats()
+
+    try:
+        while not getattr(data_port, 'finished', False) and not (stop_event is not None and stop_event.is_set()):
+            if poll_delay is None:
+                new_data = wait_for_data(data_port, idle_timeout)
+            else:
+                byte_count = data_port.inWaiting()
+                new_data = data_port.read(byte_count) if byte_count > 0 else b''
+            wake_time = time.perf_counter()
+
+            if new_data:
+                stats.wakeups += 1
+                stats.bytes_read += len(new_data)
+
+                frame_start = wake_time
+                for frame in stream.feed(new_data):
+                    parse_time = time.perf_counter()
+                    if metrics is not None:
+                        metrics.observe(READ, stream.read_time)
+                        metrics.observe(PARSE, stream.parse_time)
+                    try:
+                        on_frame(frame)
+                    except Exception as e:
+                        stats.callback_errors += 1
+                        print(f"Frame error: {e}")
+                    done = time.perf_counter()
+                    stats.record(parse_time - frame_start, done - frame_start)
+                    # The next frame of this read was waiting for this one's callback
+                    frame_start = done
+            else:
+                stats.idle_polls += 1
+                if on_idle is not None:
+                    on_idle(stats.idle_polls)
+
+            if poll_delay:
+                time.sleep(poll_delay)
+    except KeyboardInterrupt:
+        pass
+
+    return stats
@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""
+asyncio acquisition service for the mmWave radar
+One event loop reads the serial ports with loop.add_reader(), sends the
+.cfg commands waiting for each reply, and publishes every parsed frame to
+async subscribers: the binary UDP output, a Server-Sent Events push and a
+small status API, all without threads
+
+    python3 radar_async.py --http-port 8081
+    python3 radar_async.py --replay capture.dat --speed 4
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+import serial
+from frame_datagram import pack_frame
+from parcer_XY_test import serverAddress
+from radar_acquisition import CLI_PORT, DATA_PORT, CLI_BAUD, DATA_BAUD
+from radar_cli import PROMPT, CommandResult, command_timeout, config_commands, reply_result
+from radar_replay import ReplayPort
+from sensor_pose import SensorPose
+from stream_parser import StreamParser
+
+CONFIG_FILE = 'xwr18xx_profile_2023_07_26T08_46_17_507.cfg'
+SENSOR_CONFIG_FILE = 'radar_config.json'  # written by web_control.py
+
+DEFAULT_SENSOR_CONFIG = {'ID': 1, 'X': 0.0, 'Y': 0.0, 'Z': 1.0,
+                         'yaw_psi': 0.0, 'pitch_theta': 0.0, 'roll_phi': 0.0}
+
+
+class Subscription:
+    """Frames published to one subscriber; iterate it with async for
+
+    A subscriber that falls more than maxsize frames behind loses the
+    oldest ones, counted in dropped.
+    """
+
+    def __init__(self, hub, maxsize):
+        self._hub = hub
+        self._queue = asyncio.Queue(maxsize)
+        self.dropped = 0
+
+    def put(self, frame):
+        if self._queue.full():
+            self._queue.get_nowait()
+            self.dropped += 1
+        self._queue.put_nowait(frame)
+
+    def close(self):
+        self._hub.unsubscribe(self)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return await self._queue.get()
+
+
+class FrameHub:
+    """Fans every published frame out to all subscriptions"""
+
+    def __init__(self):
+        self._subscriptions = set()
+
+    @property
+    def num_subscribers(self):
+        return len(self._subscriptions)
+
+    def subscribe(self, maxsize=16):
+        subscription = Subscription(self, maxsize)
+        self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        self._subscriptions.discard(subscription)
+
+    def publish(self, frame):
+        for subscription in self._subscriptions:
+            subscription.put(frame)
+
+
+class RadarService:
+    """Configures one radar and publishes its frames to a FrameHub
+
+    With replay the frames come from a ReplayPort instead and no CLI
+    commands are sent. Replies are judged and timed out like radar_cli
+    does; reply_timeout, if given, replaces its per-command timeouts.
+    """
+
+    def __init__(self, hub, cli_path=CLI_PORT, data_path=DATA_PORT, config_file=CONFIG_FILE,
+                 replay=None, speed=1.0, reply_timeout=None):
+        self.hub = hub
+        self.cli_path = cli_path
+        self.data_path = data_path
+        self.config_file = config_file
+        self.replay = replay
+        self.speed = speed
+        self.reply_timeout = reply_timeout
+        self.stream = StreamParser()  # a new Frame each time, subscribers keep them
+        self.cli_port = None
+        self.data_port = None
+        self.finished = None
+        self._cli_reply = bytearray()
+        self._cli_event = None
+        self._replay_task = None
+
+        # Counters
+        self.started = time.time()
+        self.frames = 0
+        self.bytes_read = 0
+        self.commands_failed = 0
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        self.finished = loop.create_future()
+        if self.replay:
+            self.data_port = ReplayPort(self.replay, speed=self.speed)
+            self._replay_task = asyncio.create_task(self._read_replay())
+            return
+
+        self.cli_port = serial.Serial(self.cli_path, CLI_BAUD, timeout=0)
+        self.data_port = serial.Serial(self.data_path, DATA_BAUD, timeout=0)
+        self._cli_event = asyncio.Event()
+        loop.add_reader(self.cli_port.fileno(), self._on_cli_readable)
+        loop.add_reader(self.data_port.fileno(), self._on_data_readable)
+        await self.send_config()
+
+    async def stop(self):
+        loop = asyncio.get_running_loop()
+        if self._replay_task is not None:
+            self._replay_task.cancel()
+        for port in (self.cli_port, self.data_port):
+            if port is None:
+                continue
+            if hasattr(port, 'fileno'):
+                loop.remove_reader(port.fileno())
+            port.close()
+
+    async def send_config(self):
+        """Send the .cfg commands one at a time, each after the reply to the previous one"""
+        for line_number, command in config_commands(self.config_file):
+            result = await self.send_command(command, line_number)
+            if not result.ok:
+                self.commands_failed += 1
+                print(f"✗ {command}: {result.message}")
+
+    async def send_command(self, command, line_number=0):
+        """Send one command and wait for its reply; returns a radar_cli.CommandResult"""
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        self._cli_reply.clear()
+        self._cli_event.clear()
+        self.cli_port.write((command + '\n').encode())
+        timeout = self.reply_timeout if self.reply_timeout is not None else command_timeout(command)
+        await self._wait_reply(started + timeout)
+        ok = reply_result(self._cli_reply)
+        return CommandResult(line_number, command, bool(ok), self._cli_reply.decode(errors='replace'),
+                             loop.time() - started)
+
+    async def _wait_reply(self, deadline):
+        """Collect CLI output until the result and the prompt after it arrived, or deadline passed"""
+        loop = asyncio.get_running_loop()
+        while reply_result(self._cli_reply) is None or PROMPT not in self._cli_reply:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            self._cli_event.clear()
+            try:
+                await asyncio.wait_for(self._cli_event.wait(), remaining)
+            except asyncio.TimeoutError:
+                break
+
+    def _on_cli_readable(self):
+        self._cli_reply += self.cli_port.read(self.cli_port.in_waiting or 1)
+        self._cli_event.set()
+
+    def _on_data_readable(self):
+        self._feed(self.data_port.read(self.data_port.in_waiting or 1))
+
+    async def _read_replay(self):
+        # ReplayPort has no file descriptor, check it every few milliseconds instead
+        while not self.data_port.finished:
+            byte_count = self.data_port.inWaiting()
+            if byte_count:
+                self._feed(self.data_port.read(byte_count))
+                await asyncio.sleep(0)
+            else:
+                await asyncio.sleep(0.005)
+        self.finished.set_result(True)
+
+    def _feed(self, data):
+        self.bytes_read += len(data)
+        for frame in self.stream.feed(data):
+            self.frames += 1
+            self.hub.publish(frame)
+
+    def status(self):
+        elapsed = time.time() - self.started
+        return {
+            'frames': self.frames,
+            'frame_rate': self.frames / max(elapsed, 1e-9),
+            'bytes_read': self.bytes_read,
+            'bytes_skipped': self.stream.bytes_skipped,
+            'frames_failed': self.stream.frames_failed,
+            'commands_failed': self.commands_failed,
+            'subscribers': self.hub.num_subscribers,
+            'uptime': elapsed,
+        }
+
+
+async def udp_sink(hub, sensor_id, pose, address=serverAddress):
+    """Send every frame in the binary datagram format of frame_datagram.py"""
+    loop = asyncio.get_running_loop()
+    transport, _ = await loop.create_datagram_endpoint(asyncio.DatagramProtocol, remote_addr=address)
+    subscription = hub.subscribe()
+    try:
+        async for frame in subscription:
+            for datagram in pack_frame(sensor_id, frame.frame_number, frame.timestamp, frame.world_records(pose)):
+                transport.sendto(datagram)
+    finally:
+        subscription.close()
+        transport.close()
+
+
+def frame_event(frame, sensor_id, pose):
+    """One Server-Sent Events message with the frame's world points"""
+    world = frame.world_points(pose).round(3).tolist()
+    message = {
+        'sensor': sensor_id,
+        'frame': frame.frame_number,
+        'timestamp': frame.timestamp,
+        'points': [xyz + [round(v, 3)] for xyz, v in zip(world, frame.points['v'].tolist())],
+    }
+    return f"data: {json.dumps(message)}\n\n".encode()
+
+
+async def serve_http(reader, writer, service, sensor_id, pose):
+    """GET /events streams frames as Server-Sent Events, GET /status returns the service counters"""
+    try:
+        request_line = await reader.readline()
+        while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+            pass  # headers are not needed
+        parts = request_line.decode(errors='replace').split()
+        path = parts[1] if len(parts) > 1 else '/'
+
+        if path == '/status':
+            body = json.dumps(service.status()).encode()
+            writer.write(b'HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n'
+                         b'Content-Length: %d\r\nConnection: close\r\n\r\n' % len(body) + body)
+        elif path == '/events':
+            writer.write(b'HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n'
+                         b'Cache-Control: no-cache\r\nConnection: keep-alive\r\n\r\n')
+            subscription = service.hub.subscribe(maxsize=4)
+            try:
+                async for frame in subscription:
+                    writer.write(frame_event(frame, sensor_id, pose))
+                    await writer.drain()
+            finally:
+                subscription.close()
+        else:
+            writer.write(b'HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\nConnection: close\r\n\r\n')
+        await writer.drain()
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+def load_sensor_config(path=SENSOR_CONFIG_FILE):
+    config = dict(DEFAULT_SENSOR_CONFIG)
+    if os.path.exists(path):
+        with open(path, 'r') as f:
+            config.update(json.load(f))
+    return config
+
+
+async def run(args):
+    sensor_config = load_sensor_config(args.sensor_config)
+    pose = SensorPose.from_config(sensor_config)
+    sensor_id = sensor_config['ID']
+
+    hub = FrameHub()
+    service = RadarService(hub, args.cli_port, args.data_port, args.config, args.replay, args.speed)
+    tasks = [asyncio.create_task(udp_sink(hub, sensor_id, pose, (args.udp_host, args.udp_port)))]
+    server = None
+    if args.http_port:
+        server = await asyncio.start_server(lambda r, w: serve_http(r, w, service, sensor_id, pose),
+                                            args.http_host, args.http_port)
+        print(f"Events on http://{args.http_host}:{args.http_port}/events, status on /status")
+
+    await service.start()
+    print(f"✓ Radar service running for sensor {sensor_id}")
+    try:
+        await service.finished
+    finally:
+        await service.stop()
+        for task in tasks:
+            task.cancel()
+        if server is not None:
+            server.close()
+        print(f"\n{json.dumps(service.status(), indent=2)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="asyncio mmWave radar acquisition service")
+    parser.add_argument('--cli-port', default=CLI_PORT, help="Radar CLI serial port")
+    parser.add_argument('--data-port', default=DATA_PORT, help="Radar data serial port")
+    parser.add_argument('--config', default=CONFIG_FILE, help="Radar .cfg file")
+    parser.add_argument('--sensor-config', default=SENSOR_CONFIG_FILE, help="Sensor ID and pose JSON")
+    parser.add_argument('--replay', help="Play back a capture instead of the radar")
+    parser.add_argument('--speed', type=float, default=1.0, help="Replay speed factor, 0 for as fast as possible")
+    parser.add_argument('--udp-host', default=serverAddress[0], help="Binary frame datagram destination")
+    parser.add_argument('--udp-port', type=int, default=serverAddress[1], help="Binary frame datagram port")
+    parser.add_argument('--http-host', default='0.0.0.0', help="Address of the event and status server")
+    parser.add_argument('--http-port', type=int, default=0, help="Port of the event and status server, 0 for none")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(run(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+Model of an mmw demo .cfg profile
+Parses the commands of a .cfg file, derives the chirp and frame figures
+(range resolution, maximum range and velocity, chirps per frame) and plans
+the UART throughput: the bytes each frame takes for the enabled guiMonitor
+outputs, whether the worst case fits into one frame period at the data
+port baud rate, and how large the parser buffers need to be
+
+    python3 radar_cfg.py xwr18xx_profile_2023_07_26T08_46_17_507.cfg
+    python3 radar_cfg.py profile.cfg --max-points 200
+"""
+
+import argparse
+import sys
+from radar_acquisition import DATA_BAUD
+from radar_cli import config_commands
+from frame_assembler import HEADER_NUM_BYTES
+
+SPEED_OF_LIGHT = 299792458.0
+
+# Output packets are padded to a multiple of 32 bytes
+PACKET_ALIGN = 32
+TLV_HEADER_NUM_BYTES = 8
+
+# Payload bytes per detected point: x, y, z, v as float32, and snr, noise as int16
+POINT_NUM_BYTES = 16
+SIDE_INFO_NUM_BYTES = 4
+STATS_NUM_BYTES = 24
+TEMPERATURE_NUM_BYTES = 28
+
+# Worst case number of detected points assumed when planning a profile
+DEFAULT_MAX_POINTS = 500
+
+# Share of the ADC sampling rate usable as IF bandwidth, by adcCfg adcOutputFmt
+IF_BANDWIDTH_FACTOR = {0: 0.45, 1: 0.9, 2: 0.45}
+
+# Each UART byte takes a start and a stop bit
+UART_BITS_PER_BYTE = 10
+
+
+def next_power_of_2(value):
+    power = 1
+    while power < value:
+        power *= 2
+    return power
+
+
+def pad_packet(num_bytes):
+    return -(-num_bytes // PACKET_ALIGN) * PACKET_ALIGN
+
+
+class RadarProfile:
+    """The commands of one .cfg file and the figures derived from them
+
+    Only commands that apply to every subframe (subFrameIdx -1) or that have
+    no subframe argument are considered, which covers legacy frame mode.
+    """
+
+    def __init__(self, commands, config_file=None):
+        self.config_file = config_file
+        self.commands = {}
+        for line_number, command in commands:
+            words = command.split()
+            self.commands.setdefault(words[0], []).append(words[1:])
+
+        profile = self._args('profileCfg')
+        self.start_freq_ghz = float(profile[1])
+        self.idle_time_us = float(profile[2])
+        self.adc_start_time_us = float(profile[3])
+        self.ramp_end_time_us = float(profile[4])
+        self.freq_slope_mhz_us = float(profile[7])
+        self.num_adc_samples = int(profile[9])
+        self.sample_rate_ksps = int(profile[10])
+
+        channel = self._args('channelCfg')
+        self.num_rx = bin(int(channel[0])).count('1')
+        self.num_tx = bin(int(channel[1])).count('1')
+
+        adc = self.commands.get('adcCfg', [['2', '1']])[0]
+        self.adc_output_format = int(adc[1])
+
+        frame = self._args('frameCfg')
+        self.chirp_start = int(frame[0])
+        self.chirp_end = int(frame[1])
+        self.num_loops = int(frame[2])
+        self.num_frames = int(frame[3])
+        self.frame_period_ms = float(frame[4])
+
+        # guiMonitor -1 detectedObjects logMagRange noiseProfile rangeAzimuthHeatMap rangeDopplerHeatMap statsInfo
+        monitor = self.commands.get('guiMonitor', [['-1', '1', '0', '0', '0', '0', '0']])[0]
+        self.detected_objects, self.log_mag_range, self.noise_profile, \
+            self.range_azimuth_heatmap, self.range_doppler_heatmap, self.stats_info = (int(v) for v in monitor[1:7])
+
+        # cfarCfg -1 procDirection mode noiseWin guardLen divShift cyclicMode thresholdScale peakGrouping
+        self.cfar = {int(args[1]): args for args in self.commands.get('cfarCfg', []) if args[0] == '-1'}
+
+    @classmethod
+    def from_file(cls, config_file):
+        return cls(config_commands(config_file), config_file)
+
+    def _args(self, name):
+        if name not in self.commands:
+            raise ValueError(f"{self.config_file or 'profile'} has no {name} command")
+        return self.commands[name][0]
+
+    # Chirp and frame figures
+
+    @property
+    def num_range_bins(self):
+        return next_power_of_2(self.num_adc_samples)
+
+    @property
+    def num_doppler_bins(self):
+        return next_power_of_2(self.num_loops)
+
+    @property
+    def chirps_per_frame(self):
+        return (self.chirp_end - self.chirp_start + 1) * self.num_loops
+
+    @property
+    def chirp_time_us(self):
+        return self.idle_time_us + self.ramp_end_time_us
+
+    @property
+    def active_frame_time_ms(self):
+        return self.chirps_per_frame * self.chirp_time_us / 1000
+
+    @property
+    def frame_period(self):
+        """Frame period in seconds"""
+        return self.frame_period_ms / 1000
+
+    @property
+    def bandwidth_hz(self):
+        """Swept bandwidth during ADC sampling"""
+        return self.freq_slope_mhz_us * 1e12 * self.num_adc_samples / (self.sample_rate_ksps * 1e3)
+
+    @property
+    def wavelength(self):
+        center = self.start_freq_ghz * 1e9 + self.freq_slope_mhz_us * 1e12 * (
+            self.adc_start_time_us + self.num_adc_samples / self.sample_rate_ksps * 1e3 / 2) * 1e-6
+        return SPEED_OF_LIGHT / center
+
+    @property
+    def range_resolution(self):
+        return SPEED_OF_LIGHT / (2 * self.bandwidth_hz)
+
+    @property
+    def max_range(self):
+        if_bandwidth = IF_BANDWIDTH_FACTOR.get(self.adc_output_format, 0.9) * self.sample_rate_ksps * 1e3
+        return if_bandwidth * SPEED_OF_LIGHT / (2 * self.freq_slope_mhz_us * 1e12)
+
+    @property
+    def max_velocity(self):
+        return self.wavelength / (4 * self.num_tx * self.chirp_time_us * 1e-6)
+
+    @property
+    def velocity_resolution(self):
+        return self.wavelength / (2 * self.num_doppler_bins * self.num_tx * self.chirp_time_us * 1e-6)
+
+    def cfar_threshold(self, direction):
+        """CFAR threshold in dB for procDirection 0 (range) or 1 (doppler)"""
+        if direction not in self.cfar:
+            raise ValueError(f"{self.config_file or 'profile'} has no cfarCfg for direction {direction}")
+        return float(self.cfar[direction][7])
+
+    # UART throughput
+
+    @property
+    def num_virtual_antennas_azimuth(self):
+        # On the xWR18xx EVM TX2 sits above the others and only adds elevation
+        return min(self.num_tx, 2) * self.num_rx
+
+    def tlv_sizes(self, num_points):
+        """Payload bytes of each enabled output TLV, by TLV type"""
+        sizes = {}
+        if self.detected_objects in (1, 2):
+            sizes[1] = POINT_NUM_BYTES * num_points
+        if self.detected_objects == 1:
+            sizes[7] = SIDE_INFO_NUM_BYTES * num_points
+        if self.log_mag_range:
+            sizes[2] = 2 * self.num_range_bins
+        if self.noise_profile:
+            sizes[3] = 2 * self.num_range_bins
+        if self.range_azimuth_heatmap:
+            sizes[4] = 4 * self.num_virtual_antennas_azimuth * self.num_range_bins
+        if self.range_doppler_heatmap:
+            sizes[5] = 2 * self.num_range_bins * self.num_doppler_bins
+        if self.stats_info:
+            sizes[6] = STATS_NUM_BYTES
+            sizes[9] = TEMPERATURE_NUM_BYTES
+        return sizes
+
+    def frame_bytes(self, num_points):
+        """Bytes of one output packet with num_points detected points, padding included"""
+        sizes = self.tlv_sizes(num_points)
+        # The point TLVs are left out of frames without detections
+        num_tlvs = sum(1 for tlv_type, size in sizes.items() if size or tlv_type not in (1, 7))
+        return pad_packet(HEADER_NUM_BYTES + TLV_HEADER_NUM_BYTES * num_tlvs + sum(sizes.values()))
+
+    def uart_budget(self, baud=DATA_BAUD):
+        """Bytes the data port can carry in one frame period"""
+        return int(baud / UART_BITS_PER_BYTE * self.frame_period)
+
+    def max_points(self, baud=DATA_BAUD):
+        """Most detected points per frame that still fit into one frame period"""
+        return self.points_for_bytes(self.uart_budget(baud))
+
+    def points_for_bytes(self, budget):
+        """Most detected points per frame whose frames take at most budget bytes"""
+        if self.frame_bytes(0) > budget:
+            return 0
+        low, high = 0, budget // POINT_NUM_BYTES
+        while low < high:
+            middle = (low + high + 1) // 2
+            if self.frame_bytes(middle) <= budget:
+                low = middle
+            else:
+                high = middle - 1
+        return low
+
+    def stream_parser_options(self, max_points=DEFAULT_MAX_POINTS):
+        """capacity and max_frame_bytes for StreamParser / FrameAssembler
+
+        max_frame_bytes is twice the worst case frame, so a corrupt length
+        field is rejected at once while a scene with more points than
+        max_points still parses; the buffer holds a few of those plus one read.
+        """
+        max_frame_bytes = 2 * self.frame_bytes(max_points)
+        capacity = next_power_of_2(max(4 * max_frame_bytes, 2 * self.uart_budget()))
+        return {'capacity': capacity, 'max_frame_bytes': max_frame_bytes}
+
+    def check(self, max_points=DEFAULT_MAX_POINTS, baud=DATA_BAUD):
+        """Return a list of problems with the profile, empty if there are none"""
+        problems = []
+        sampling_end = self.adc_start_time_us + self.num_adc_samples / self.sample_rate_ksps * 1e3
+        if sampling_end > self.ramp_end_time_us:
+            problems.append(f"ADC sampling ends at {sampling_end:.2f} us, after the ramp end at {self.ramp_end_time_us} us")
+        if self.active_frame_time_ms > self.frame_period_ms:
+            problems.append(f"{self.chirps_per_frame} chirps take {self.active_frame_time_ms:.2f} ms, "
+                            f"longer than the {self.frame_period_ms} ms frame period")
+
+        budget = self.uart_budget(baud)
+        if self.frame_bytes(0) > budget:
+            problems.append(f"Frames need {self.frame_bytes(0)} bytes without any points, "
+                            f"the UART carries {budget} bytes per frame period at {baud} baud")
+        elif self.frame_bytes(max_points) > budget:
+            problems.append(f"A frame with {max_points} points takes {self.frame_bytes(max_points)} bytes, "
+                            f"the UART carries {budget} bytes per frame period at {baud} baud; "
+                            f"frames with more than {self.max_points(baud)} points will back up and be dropped")
+        return problems
+
+    def to_dict(self, max_points=DEFAULT_MAX_POINTS, baud=DATA_BAUD):
+        return {
+            'config_file': self.config_file,
+            'range_resolution': self.range_resolution,
+            'max_range': self.max_range,
+            'max_velocity': self.max_velocity,
+            'velocity_resolution': self.velocity_resolution,
+            'frame_period': self.frame_period,
+            'chirps_per_frame': self.chirps_per_frame,
+            'active_frame_time': self.active_frame_time_ms / 1000,
+            'num_range_bins': self.num_range_bins,
+            'num_doppler_bins': self.num_doppler_bins,
+            'frame_bytes_empty': self.frame_bytes(0),
+            'frame_bytes_worst': self.frame_bytes(max_points),
+            'worst_case_points': max_points,
+            'uart_budget': self.uart_budget(baud),
+            'max_points': self.max_points(baud),
+            'problems': self.check(max_points, baud),
+        }
+
+    def summary(self, max_points=DEFAULT_MAX_POINTS, baud=DATA_BAUD):
+        lines = [
+            f"Range resolution {self.range_resolution:.4f} m, max range {self.max_range:.2f} m",
+            f"Velocity resolution {self.velocity_resolution:.3f} m/s, max velocity {self.max_velocity:.2f} m/s",
+            f"{self.chirps_per_frame} chirps per frame ({self.num_tx} TX, {self.num_rx} RX), "
+            f"active {self.active_frame_time_ms:.2f} ms of a {self.frame_period_ms} ms period",
+            f"{self.num_range_bins} range bins, {self.num_doppler_bins} doppler bins",
+            f"Frame bytes: {self.frame_bytes(0)} empty, {self.frame_bytes(max_points)} with {max_points} points "
+            f"(TLVs {sorted(self.tlv_sizes(0))})",
+            f"UART budget {self.uart_budget(baud)} bytes per frame at {baud} baud, "
+            f"room for {self.max_points(baud)} points",
+        ]
+        return '\n'.join(lines)
+
+
+def load_profile(config_file):
+    """RadarProfile of config_file, or None (with a message) if it cannot be parsed"""
+    try:
+        return RadarProfile.from_file(config_file)
+    except (OSError, ValueError, IndexError) as e:
+        print(f"Warning: Could not parse config file: {e}")
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Derived figures and UART throughput of an mmw demo .cfg profile")
+    parser.add_argument('config', help="Radar .cfg file")
+    parser.add_argument('--max-points', type=int, default=DEFAULT_MAX_POINTS, help="Worst case detected points per frame")
+    parser.add_argument('--baud', type=int, default=DATA_BAUD, help="Data port baud rate")
+    args = parser.parse_args()
+
+    profile = RadarProfile.from_file(args.config)
+    print(profile.summary(args.max_points, args.baud))
+    options = profile.stream_parser_options(args.max_points)
+    print(f"Parser buffer {options['capacity']} bytes, max frame {options['max_frame_bytes']} bytes")
+
+    problems = profile.check(args.max_points, args.baud)
+    for problem in problems:
+        print(f"⚠ {problem}")
+    if not problems:
+        print("✓ Profile fits")
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
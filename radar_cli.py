@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+CLI port of the mmw demo
+Sends .cfg commands one at a time and waits for each Done/Error reply, and
+remembers a hash of the configuration last applied to each radar so a
+restart with an unchanged .cfg only restarts the sensor
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+from datetime import datetime
+
+PROMPT = b'mmwDemo:/>'
+
+# Commands that can take the device noticeably longer to answer
+SLOW_COMMANDS = {'sensorStart': 5.0, 'calibData': 5.0, 'sensorStop': 2.0}
+DEFAULT_TIMEOUT = 1.0
+
+# Host side record of the configuration applied to each CLI port
+STATE_FILE = '.radar_cli_state.json'
+
+
+class CommandResult:
+    """Outcome of one CLI command"""
+
+    __slots__ = ('line_number', 'command', 'ok', 'reply', 'seconds')
+
+    def __init__(self, line_number, command, ok, reply, seconds):
+        self.line_number = line_number
+        self.command = command
+        self.ok = ok
+        self.reply = reply
+        self.seconds = seconds
+
+    @property
+    def message(self):
+        """The reply without the echoed command and the prompt"""
+        text = self.reply.replace(PROMPT.decode(), '').strip()
+        if text.startswith(self.command):
+            text = text[len(self.command):].strip()
+        return text or 'no reply'
+
+    def __repr__(self):
+        return f"CommandResult({self.command!r}, ok={self.ok}, seconds={self.seconds:.3f})"
+
+
+def config_commands(config_file):
+    """Return (line number, command) for every command line of a .cfg file"""
+    with open(config_file, 'r') as f:
+        config_lines = [line.rstrip('\r\n') for line in f]
+    return [(i + 1, line.strip()) for i, line in enumerate(config_lines)
+            if line.strip() and not line.startswith('%')]
+
+
+def config_hash(commands):
+    """Hash of the commands that configure the device, without sensorStop/sensorStart"""
+    digest = hashlib.sha256()
+    for _, command in commands:
+        if command.split()[0] not in ('sensorStop', 'sensorStart'):
+            digest.update(' '.join(command.split()).encode() + b'\n')
+    return digest.hexdigest()
+
+
+def command_timeout(command):
+    """Seconds to wait for the reply to command"""
+    return SLOW_COMMANDS.get(command.split()[0], DEFAULT_TIMEOUT)
+
+
+def reply_result(reply):
+    """True if the reply bytes so far report Done, False for Error or an unknown command, None while neither arrived"""
+    if b'Done' in reply:
+        return True
+    if b'Error' in reply or b'not recognized' in reply:
+        return False
+    return None
+
+
+def send_command(cli_port, command, line_number=0, timeout=None):
+    """Send one command and wait for Done or Error, at most timeout seconds"""
+    if timeout is None:
+        timeout = command_timeout(command)
+
+    started = time.monotonic()
+    deadline = started + timeout
+    cli_port.write((command + '\n').encode())
+
+    reply = bytearray()
+    ok = False
+    while time.monotonic() < deadline:
+        reply += cli_port.read(cli_port.in_waiting or 1)
+        if reply_result(reply) is not None:
+            ok = reply_result(reply)
+            # The prompt follows the result, read it so it is not taken for the next reply
+            while PROMPT not in reply and time.monotonic() < deadline:
+                reply += cli_port.read(cli_port.in_waiting or 1)
+            break
+
+    return CommandResult(line_number, command, ok, reply.decode(errors='replace'), time.monotonic() - started)
+
+
+def upload_config(cli_port, commands, on_result=None):
+    """Send every command, each after the previous one was acknowledged; returns the CommandResults"""
+    results = []
+    for line_number, command in commands:
+        result = send_command(cli_port, command, line_number)
+        results.append(result)
+        if on_result is not None:
+            on_result(result)
+    return results
+
+
+def load_state(state_file=STATE_FILE):
+    if not os.path.exists(state_file):
+        return {}
+    try:
+        with open(state_file, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_state(state, state_file=STATE_FILE):
+    """Write the state to a temporary file that then replaces state_file
+
+    Readers see either the old or the new file, never a half-written one.
+    """
+    directory, name = os.path.split(os.path.abspath(state_file))
+    fd, temp_path = tempfile.mkstemp(prefix=name + '.', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(state, f, indent=4)
+        os.replace(temp_path, state_file)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def update_state(port_name, entry, state_file=STATE_FILE):
+    """Store entry for one port, or remove it when entry is None
+
+    The file is read again right before writing, so entries other processes
+    saved for other ports in the meantime are kept.
+    """
+    state = load_state(state_file)
+    if entry is None:
+        if state.pop(port_name, None) is None:
+            return
+    else:
+        state[port_name] = entry
+    save_state(state, state_file)
+
+
+def port_key(cli_port):
+    """Name a CLI port is stored under in the state file"""
+    return getattr(cli_port, 'name', None) or getattr(cli_port, 'port', None) or 'default'
+
+
+def forget_config(cli_port, state_file=STATE_FILE):
+    """Drop the stored hash of cli_port, e.g. after a command changed the device's configuration
+
+    The next configure_radar() then uploads the whole .cfg again.
+    """
+    update_state(port_key(cli_port), None, state_file)
+
+
+def configure_radar(cli_port, config_file, force=False, on_result=None, state_file=STATE_FILE):
+    """Bring the radar to the configuration of config_file
+
+    If the hash of config_file matches the one last applied on this CLI
+    port, only sensorStop and sensorStart 0 (start without reconfiguring)
+    are sent. A full upload follows if that restart fails, e.g. because the
+    radar was power cycled. Returns (ok, results, skipped_upload).
+    """
+    commands = config_commands(config_file)
+    digest = config_hash(commands)
+    port_name = port_key(cli_port)
+    state = load_state(state_file)
+
+    if not force and state.get(port_name, {}).get('hash') == digest:
+        results = upload_config(cli_port, [(0, 'sensorStop'), (0, 'sensorStart 0')], on_result)
+        if results[-1].ok:
+            return True, results, True
+
+    results = upload_config(cli_port, commands, on_result)
+    ok = all(result.ok for result in results)
+    entry = None
+    if ok:
+        entry = {'hash': digest, 'config_file': config_file, 'applied': datetime.now().isoformat(timespec='seconds')}
+    update_state(port_name, entry, state_file)
+    return ok, results, False
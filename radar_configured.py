@@ -4,48 +4,88 @@
 
 import os
 import sys
+import argparse
+import signal
 import serial
 import time
 import numpy as np
 from datetime import datetime
-from parcer_XY_test import parser_one_mmw_demo_output_packet
+from parcer_XY_test import sendFrameUdp, UDP_OUTPUT_TEXT, UDP_OUTPUT_BINARY
+from stream_parser import StreamParser
+from sensor_pose import SensorPose
+from radar_acquisition import run_acquisition, CLI_PORT, DATA_PORT, CLI_BAUD, DATA_BAUD
+from radar_replay import ReplayPort
+from radar_cli import configure_radar
+from radar_pipeline import RadarPipeline, OVERLOAD_POLICIES, DROP_OLDEST, BLOCK
+from radar_cfg import load_profile
+from cfar_controller import CfarController
+from radar_ipc import IpcSender
+from point_cloud_recorder import PointCloudRecorder
+from radar_metrics import RadarMetrics, TRANSFORM, EMIT
+
+CFAR_LOG_FILE = 'cfar_adjustments.log'
 
 # Current sensor configuration
 SENSOR_CONFIG = {'ID': 1, 'X': 0.0, 'Y': 0.0, 'Z': 1.0, 'sensor_delay': 0.1, 'yaw_psi': 0.0, 'pitch_theta': 0.0, 'roll_phi': 0.0, 'name': 'Radar Sensor 1', 'description': 'Main entrance radar'}
 
-def setup_radar_ports():
+def setup_radar_ports(cli_path=CLI_PORT, data_path=DATA_PORT):
     """Setup serial connections to radar"""
     try:
-        cli_port = serial.Serial('/dev/ttyACM0', 115200, timeout=1)
-        data_port = serial.Serial('/dev/ttyACM1', 921600, timeout=1)
+        cli_port = serial.Serial(cli_path, CLI_BAUD, timeout=1)
+        data_port = serial.Serial(data_path, DATA_BAUD, timeout=1)
         print("✓ Serial ports connected successfully")
         return cli_port, data_port
     except Exception as e:
         print(f"✗ Error connecting to serial ports: {e}")
         return None, None
 
-def send_config_to_radar(cli_port, config_file):
-    """Send configuration commands to radar"""
+def send_config_to_radar(cli_port, config_file, force=False):
+    """Send configuration commands to radar, each after the previous one was acknowledged"""
     try:
-        with open(config_file, 'r') as f:
-            config_lines = [line.rstrip('\r\n') for line in f]
-        
-        print(f"Sending {len(config_lines)} configuration commands...")
-        for i, line in enumerate(config_lines):
-            if line.strip() and not line.startswith('%'):
-                cli_port.write((line + '\n').encode())
-                print(f"  {i+1:2d}: {line}")
-                time.sleep(0.01)
+        def on_result(result):
+            mark = "✓" if result.ok else "✗"
+            print(f"  {result.line_number:2d}: {mark} {result.command} ({result.seconds * 1000:.0f} ms)")
+            if not result.ok:
+                print(f"      {result.message}")
         
-        print("✓ Configuration sent successfully")
-        return True
+        print("Configuring radar...")
+        ok, results, skipped = configure_radar(cli_port, config_file, force, on_result)
+        if skipped:
+            print("✓ Configuration unchanged, radar restarted without upload")
+        elif ok:
+            print("✓ Configuration sent successfully")
+        else:
+            print(f"✗ {sum(not result.ok for result in results)} configuration commands failed")
+        return ok
     except Exception as e:
         print(f"✗ Error sending configuration: {e}")
         return False
 
+def parse_args():
+    """Command line options, only needed for replay or other serial ports"""
+    parser = argparse.ArgumentParser(description="mmWave radar acquisition")
+    parser.add_argument('--cli-port', default=CLI_PORT, help="Radar CLI serial port")
+    parser.add_argument('--data-port', default=DATA_PORT, help="Radar data serial port")
+    parser.add_argument('--replay', help="Play back a recorded .dat capture or raw UART dump instead of the radar")
+    parser.add_argument('--speed', type=float, default=1.0, help="Replay speed factor, 0 for as fast as possible")
+    parser.add_argument('--loop', action='store_true', help="Start the replay over when it ends")
+    parser.add_argument('--poll', action='store_true', help="Poll the data port every sensor_delay seconds instead of waiting for data")
+    parser.add_argument('--pipeline', action='store_true', help="Read, parse and output on separate threads")
+    parser.add_argument('--overload', choices=OVERLOAD_POLICIES, help="What the pipeline does when a stage falls behind, block for a replay (nothing to lose there), else drop_oldest")
+    parser.add_argument('--force-config', action='store_true', help="Upload the whole .cfg even if the radar already has it")
+    parser.add_argument('--quiet', action='store_true', help="Don't print the detected objects")
+    parser.add_argument('--udp', choices=('text', 'binary', 'off'), help="UDP output format, binary by default with --quiet or --ipc, else text")
+    parser.add_argument('--record', help="Record every frame's points to segment files in this directory")
+    parser.add_argument('--ipc', help="Send frames and counters to the web panel over this Unix socket")
+    parser.add_argument('--cfar-target', type=int, help="Raise the CFAR threshold while frames average more points than this, 0 for what fits through the UART")
+    return parser.parse_args()
+
 def main():
     """Main radar processing loop"""
+    args = parse_args()
     config_file = 'xwr18xx_profile_2023_07_26T08_46_17_507.cfg'
+    # The web panel stops us with SIGTERM; handle it like Ctrl-C so the cleanup below runs
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
     
     print("=" * 60)
     print("mmWave Radar - Web Controlled")
@@ -55,92 +95,152 @@ def main():
     print(f"Orientation: Yaw={SENSOR_CONFIG['yaw_psi']}°, Pitch={SENSOR_CONFIG['pitch_theta']}°, Roll={SENSOR_CONFIG['roll_phi']}°")
     print("=" * 60)
     
-    if not os.path.exists(config_file):
-        print(f"✗ Configuration file '{config_file}' not found!")
-        return
-    
-    cli_port, data_port = setup_radar_ports()
-    if not cli_port or not data_port:
-        return
+    # Without --poll the loop wakes up as soon as bytes arrive
+    poll_delay = SENSOR_CONFIG['sensor_delay'] if args.poll else None
+    profile = None
+    cfar = None
+    ipc = None
+    recorder = None
+    if args.replay:
+        cli_port = None
+        data_port = ReplayPort(args.replay, speed=args.speed, loop=args.loop)
+        print(f"✓ Replaying {data_port.num_frames} frames from {args.replay} at speed {args.speed or 'max'}")
+        if args.poll and not args.speed:
+            poll_delay = 0
+    else:
+        if not os.path.exists(config_file):
+            print(f"✗ Configuration file '{config_file}' not found!")
+            return
+        
+        # Warn about a profile whose frames will not fit through the UART
+        profile = load_profile(config_file)
+        if profile:
+            for problem in profile.check():
+                print(f"⚠ {problem}")
+        
+        cli_port, data_port = setup_radar_ports(args.cli_port, args.data_port)
+        if not cli_port or not data_port:
+            return
     
     try:
-        if not send_config_to_radar(cli_port, config_file):
+        if cli_port and not send_config_to_radar(cli_port, config_file, args.force_config):
             return
         
         print("\nStarting radar data acquisition...")
         print("Use web interface to stop")
         print("=" * 60)
         
+        # Buffers sized for the worst case frame of the profile; a replay may come from another one
+        parser_options = profile.stream_parser_options() if profile else {}
+        stream = StreamParser(reuse_frame=True, **parser_options)
+        pose = SensorPose.from_config(SENSOR_CONFIG)
+        metrics = RadarMetrics()
+        # The text format prints every point, keep it off the hot loop of a quiet or IPC run
+        udp_output = {'text': UDP_OUTPUT_TEXT, 'binary': UDP_OUTPUT_BINARY, 'off': None}.get(
+            args.udp, UDP_OUTPUT_BINARY if args.quiet or args.ipc else UDP_OUTPUT_TEXT)
+        pipeline = None
         frame_count = 0
-        no_data_count = 0
-        data_buffer = bytearray()
+        point_count = 0
         
-        while True:
-            byte_count = data_port.inWaiting()
-            if byte_count > 0:
-                new_data = data_port.read(byte_count)
-                data_buffer.extend(new_data)
-                no_data_count = 0
+        if args.ipc:
+            ipc = IpcSender(args.ipc, int(SENSOR_CONFIG['ID']))
+        if args.record:
+            recorder = PointCloudRecorder(args.record)
+            print(f"Recording point clouds to {args.record}")
+        
+        if args.cfar_target is not None and cli_port and profile:
+            cfar = CfarController(cli_port, profile, args.cfar_target or None, log_file=CFAR_LOG_FILE)
+            print(f"CFAR control: target {cfar.target_points} points per frame, adjustments logged to {CFAR_LOG_FILE}")
+        
+        def ipc_stats():
+            assembler = pipeline.assembler if pipeline else stream.assembler
+            stats = {'frames': frame_count, 'points': point_count,
+                     'bytes_received': assembler.bytes_received, 'bytes_skipped': assembler.bytes_skipped,
+                     'resync_count': assembler.resync_count, 'assembler_pending': assembler.pending,
+                     'frames_failed': pipeline.parser_stats.failed if pipeline else stream.frames_failed,
+                     'cfar_offset_db': cfar.offset_db if cfar else 0.0}
+            if pipeline:
+                stats['queues'] = {name: {'depth': queue.depth, 'maxsize': queue.maxsize, 'dropped': queue.dropped}
+                                   for name, queue in (('packets', pipeline.packets), ('frames', pipeline.frames))}
+            stats.update(metrics.snapshot())
+            return stats
+        
+        def on_frame(parsed):
+            nonlocal frame_count, point_count
+            frame_count += 1
+            timestamp = datetime.now().strftime("%H:%M:%S.%f")[:-3]
+            num_objects = parsed.num_points
+            point_count += num_objects
+            metrics.frame(parsed.frame_number)
+            if cfar:
+                cfar.update(num_objects, parsed.frame_number)
+            # Transformed once for every output, so emit only covers sending
+            transformed = time.perf_counter()
+            records = None
+            if udp_output or ipc or recorder:
+                records = parsed.world_records(pose)
+                started, transformed = transformed, time.perf_counter()
+                metrics.observe(TRANSFORM, transformed - started)
+            sendFrameUdp(parsed, SENSOR_CONFIG['ID'], pose, udp_output, printPoints=not args.quiet, worldRecords=records)
+            if recorder:
+                recorder.write(parsed.frame_number, parsed.timestamp, records)
+            if ipc:
+                ipc.send_frame(parsed.frame_number, parsed.timestamp, records)
+            metrics.observe(EMIT, time.perf_counter() - transformed)
+            if ipc and ipc.stats_due():
+                ipc.send_stats(ipc_stats())
+            if args.quiet:
+                return
+            
+            if num_objects > 0:
+                print(f"\n[{timestamp}] Frame #{frame_count} - {num_objects} objects detected:")
+                print("-" * 80)
+                print(f"{'Obj':<4} {'X(m)':<8} {'Y(m)':<8} {'Z(m)':<8} {'V(m/s)':<8} {'Range(m)':<8} {'Az(°)':<7} {'El(°)':<7}")
+                print("-" * 80)
                 
-                if len(data_buffer) > 40:
-                    try:
-                        result = parser_one_mmw_demo_output_packet(
-                            data_buffer, 
-                            len(data_buffer),
-                            SENSOR_CONFIG['ID'],
-                            SENSOR_CONFIG['X'],
-                            SENSOR_CONFIG['Y'], 
-                            SENSOR_CONFIG['Z'],
-                            SENSOR_CONFIG['yaw_psi'],
-                            SENSOR_CONFIG['pitch_theta'],
-                            SENSOR_CONFIG['roll_phi']
-                        )
-                        
-                        (parser_result, header_start, total_bytes, num_objects, 
-                         num_tlv, subframe, x_array, y_array, z_array, v_array,
-                         range_array, azimuth_array, elevation_array, 
-                         snr_array, noise_array) = result
-                        
-                        if parser_result == 0:
-                            frame_count += 1
-                            timestamp = datetime.now().strftime("%H:%M:%S.%f")[:-3]
-                            
-                            if header_start >= 0 and total_bytes > 0:
-                                bytes_to_remove = header_start + total_bytes
-                                data_buffer = data_buffer[bytes_to_remove:]
-                            
-                            if num_objects > 0:
-                                print(f"\n[{timestamp}] Frame #{frame_count} - {num_objects} objects detected:")
-                                print("-" * 80)
-                                print(f"{'Obj':<4} {'X(m)':<8} {'Y(m)':<8} {'Z(m)':<8} {'V(m/s)':<8} {'Range(m)':<8} {'Az(°)':<7} {'El(°)':<7}")
-                                print("-" * 80)
-                                
-                                for i in range(num_objects):
-                                    print(f"{i:<4} {x_array[i]:<8.3f} {y_array[i]:<8.3f} {z_array[i]:<8.3f} "
-                                          f"{v_array[i]:<8.3f} {range_array[i]:<8.3f} {azimuth_array[i]:<7.1f} "
-                                          f"{elevation_array[i]:<7.1f}")
-                            else:
-                                if frame_count % 50 == 0:
-                                    print(f"[{timestamp}] Frame #{frame_count} - No objects detected")
-                        else:
-                            if len(data_buffer) > 10000:
-                                data_buffer = data_buffer[-5000:]
-                    
-                    except Exception as e:
-                        print(f"Parser error: {e}")
-                        data_buffer = bytearray()
+                for i, (x, y, z, v, rng, az, el, snr, noise) in enumerate(parsed.points.tolist()):
+                    print(f"{i:<4} {x:<8.3f} {y:<8.3f} {z:<8.3f} "
+                          f"{v:<8.3f} {rng:<8.3f} {az:<7.1f} "
+                          f"{el:<7.1f}")
             else:
-                no_data_count += 1
-                if no_data_count % 100 == 0:
-                    print(".", end="", flush=True)
+                if frame_count % 50 == 0:
+                    print(f"[{timestamp}] Frame #{frame_count} - No objects detected")
+        
+        def on_idle(idle_polls):
+            if ipc and ipc.stats_due():
+                ipc.send_stats(ipc_stats())
+            if idle_polls % 100 == 0:
+                print(".", end="", flush=True)
+        
+        if args.pipeline:
+            # The UART keeps being drained while the table is printed or UDP is sent
+            # A replay waits for a slow stage instead of dropping; only a live UART can overflow
+            policy = args.overload or (BLOCK if args.replay else DROP_OLDEST)
+            pipeline = RadarPipeline(data_port, on_frame, policy=policy, on_idle=on_idle, metrics=metrics, **parser_options)
+            pipeline.run()
             
-            time.sleep(SENSOR_CONFIG['sensor_delay'])
-    
-    except KeyboardInterrupt:
-        print(f"\n\nStopping radar... Processed {frame_count} frames")
+            print(f"\n\nStopping radar... Processed {frame_count} frames")
+            print(f"Pipeline: {pipeline.summary()}")
+            print(f"Resync: skipped {pipeline.assembler.bytes_skipped} bytes in {pipeline.assembler.resync_count} resyncs")
+        else:
+            stats = run_acquisition(data_port, on_frame, stream, poll_delay, on_idle, metrics=metrics)
+            
+            print(f"\n\nStopping radar... Processed {frame_count} frames")
+            print(f"Acquisition: {stats.summary()}")
+            print(f"Resync: skipped {stream.bytes_skipped} bytes in {stream.resync_count} resyncs, {stream.frames_failed} frames failed to parse")
+        if args.replay:
+            print(f"Replay: {data_port.frames_released} frames released, max lag {data_port.max_lag * 1000:.1f} ms")
+        if cfar:
+            print(cfar.summary())
     except Exception as e:
         print(f"Error during operation: {e}")
     finally:
+        if cfar:
+            cfar.restore()  # the hash in radar_cli's state file is for the profile's thresholds
+        if ipc:
+            ipc.close()
+        if recorder:
+            recorder.close()
         if cli_port:
             cli_port.close()
         if data_port:
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Pseudo-terminal emulator of an IWR1843 running the mmw demo
+Creates one pty for the CLI port and one for the data port. The CLI answers
+the .cfg commands like the demo does and sensorStart streams synthetic or
+replayed frames on the data port at the frameCfg period, no faster than the
+UART baud rate allows
+
+    python3 radar_emulator.py --points 20
+    RADAR_CLI_PORT=/dev/pts/5 RADAR_DATA_PORT=/dev/pts/6 python3 radar_configured.py
+
+The emulator stamps timeCpuCycles of synthetic frames from its own clock,
+so frame_age() gives the end-to-end latency of a frame on the same host.
+"""
+
+import argparse
+import errno
+import os
+import select
+import threading
+import time
+import tty
+import numpy as np
+from mmw_frame_generator import make_frame, CPU_CLOCK_HZ
+from radar_acquisition import CLI_BAUD, DATA_BAUD
+from radar_replay import ReplayPort
+
+PROMPT = b'mmwDemo:/>'
+
+
+def uart_byte_rate(baud):
+    """Bytes per second of an 8N1 UART"""
+    return baud / 10
+
+
+def frame_age(frame):
+    """Seconds since the emulator on this host started sending frame (a parsed Frame)"""
+    now = int(time.monotonic() * CPU_CLOCK_HZ) % 2**32
+    return ((now - frame.time_cpu_cycles) % 2**32) / CPU_CLOCK_HZ
+
+
+class PtyPort:
+    """Master side of a pty; the slave path is what the acquisition scripts open"""
+
+    def __init__(self, baud, link=None):
+        self.baud = baud
+        self.master, self._slave = os.openpty()
+        tty.setraw(self._slave)  # no echo or line editing until the client configures it
+        os.set_blocking(self.master, False)
+        self.path = os.ttyname(self._slave)
+        self.link = link
+        if link:
+            if os.path.islink(link):
+                os.unlink(link)
+            os.symlink(self.path, link)
+
+        # Counters
+        self.bytes_written = 0
+        self.bytes_dropped = 0
+
+    def write(self, data, timeout=0.1):
+        """Write data, waiting up to timeout for a slow reader; returns the bytes written
+
+        What does not fit in time is dropped, like a UART whose host does not
+        keep up.
+        """
+        view = memoryview(data)
+        deadline = time.monotonic() + timeout
+        while view:
+            try:
+                count = os.write(self.master, view)
+                view = view[count:]
+                self.bytes_written += count
+            except BlockingIOError:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not select.select([], [self.master], [], remaining)[1]:
+                    break
+        self.bytes_dropped += len(view)
+        return len(data) - len(view)
+
+    def close(self):
+        if self.link and os.path.islink(self.link):
+            os.unlink(self.link)
+        os.close(self.master)
+        os.close(self._slave)
+
+
+class RadarEmulator:
+    """CLI and data port of one emulated radar
+
+    Frames come from replay (a ReplayPort, looped) when given, otherwise
+    they are synthetic with num_points random points each.
+    """
+
+    def __init__(self, num_points=20, replay=None, link_dir=None):
+        self.num_points = num_points
+        self.replay = replay
+        self.cli = PtyPort(CLI_BAUD, os.path.join(link_dir, 'ttyACM0') if link_dir else None)
+        self.data = PtyPort(DATA_BAUD, os.path.join(link_dir, 'ttyACM1') if link_dir else None)
+        self.frame_period = 0.1
+        self.cfar_base = None
+        self.cfar_threshold = None
+        self.streaming = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+
+        # Counters
+        self.commands = 0
+        self.frames_sent = 0
+
+    def start(self):
+        for target in (self._cli_loop, self._data_loop):
+            thread = threading.Thread(target=target, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join()
+        self.cli.close()
+        self.data.close()
+
+    def handle_command(self, line):
+        """Apply one CLI command and return the demo's reply"""
+        words = line.split()
+        if not words or line.startswith('%'):
+            return b''
+        self.commands += 1
+        command = words[0]
+        try:
+            if command == 'sensorStart':
+                self.streaming.set()
+            elif command == 'sensorStop':
+                self.streaming.clear()
+            elif command == 'frameCfg':
+                frame_period = float(words[5]) / 1000
+                if frame_period <= 0:
+                    return b'Error -1\r\n'
+                self.frame_period = frame_period
+            elif command == 'cfarCfg':
+                if len(words) < 10:
+                    return b'Error -1\r\n'
+                threshold = float(words[8])
+                if words[2] == '0':  # range direction
+                    self.cfar_threshold = threshold
+                    if self.cfar_base is None:
+                        self.cfar_base = self.cfar_threshold
+        except (IndexError, ValueError):
+            # The demo rejects missing or non-numeric arguments the same way
+            return b'Error -1\r\n'
+        return b'Done\r\n'
+
+    def detected_points(self):
+        """Points per synthetic frame: num_points at the first range CFAR threshold, 10 dB more for a tenth"""
+        if self.cfar_base is None:
+            return self.num_points
+        return int(round(self.num_points * 10 ** ((self.cfar_base - self.cfar_threshold) / 10)))
+
+    def _cli_loop(self):
+        line = bytearray()
+        while not self._stop.is_set():
+            if not select.select([self.cli.master], [], [], 0.1)[0]:
+                continue
+            try:
+                received = os.read(self.cli.master, 1024)
+            except OSError as e:
+                if e.errno == errno.EIO:  # no client has the port open
+                    time.sleep(0.1)
+                    continue
+                raise
+            for byte in received:
+                if byte in b'\r\n':
+                    if line:
+                        text = line.decode(errors='replace')
+                        self.cli.write(line + b'\r\n' + self.handle_command(text) + PROMPT)
+                        line.clear()
+                else:
+                    line.append(byte)
+
+    def _data_loop(self):
+        byte_rate = uart_byte_rate(self.data.baud)
+        source = ReplayPort(self.replay, loop=True) if self.replay else None
+        frame_number = 0
+        next_frame = None
+
+        while not self._stop.is_set():
+            if not self.streaming.wait(0.1):
+                next_frame = None  # start on time again after sensorStart
+                continue
+
+            if source is not None:
+                count = source.inWaiting()
+                data = source.read(count) if count else b''
+                if not data:
+                    time.sleep(0.005)
+                    continue
+                self.frames_sent = source.frames_released
+            else:
+                if next_frame is None:
+                    next_frame = time.monotonic()
+                delay = next_frame - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                frame_number += 1
+                next_frame += self.frame_period
+                cycles = int(time.monotonic() * CPU_CLOCK_HZ) % 2**32
+                data = make_frame(self.detected_points(), frame_number, rng=np.random.default_rng(frame_number),
+                                  frame_period=self.frame_period, time_cpu_cycles=cycles)
+                self.frames_sent += 1
+
+            # Send no faster than the UART could
+            started = time.monotonic()
+            self.data.write(data, timeout=self.frame_period)
+            remaining = started + len(data) / byte_rate - time.monotonic()
+            if remaining > 0:
+                time.sleep(remaining)
+
+        if source is not None:
+            source.close()
+
+
+def main():
+    """Run the emulator until Ctrl-C"""
+    parser = argparse.ArgumentParser(description="Emulate the mmWave radar on two pseudo-terminals")
+    parser.add_argument('--points', type=int, default=20, help="Points per synthetic frame")
+    parser.add_argument('--replay', help="Send the frames of this capture instead of synthetic ones")
+    parser.add_argument('--link-dir', help="Also create ttyACM0 and ttyACM1 symlinks in this directory")
+    args = parser.parse_args()
+
+    emulator = RadarEmulator(args.points, args.replay, args.link_dir)
+    emulator.start()
+    print(f"CLI port:  {emulator.cli.path}")
+    print(f"Data port: {emulator.data.path}")
+    print(f"export RADAR_CLI_PORT={emulator.cli.link or emulator.cli.path} "
+          f"RADAR_DATA_PORT={emulator.data.link or emulator.data.path}")
+
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        emulator.stop()
+        print(f"\n{emulator.commands} commands, {emulator.frames_sent} frames sent, "
+              f"{emulator.data.bytes_dropped} bytes dropped")
+
+
+if __name__ == "__main__":
+    main()
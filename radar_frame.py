@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Parsed mmWave radar frame
+Header fields plus one structured array holding every detected point, with
+storage that can be reused from frame to frame
+"""
+
+import numpy as np
+from frame_datagram import POINT_DTYPE
+
+# Point columns, shared with the binary UDP format so frames serialize as-is
+FRAME_POINT_DTYPE = POINT_DTYPE
+
+HEADER_FIELDS = ('header_start', 'total_packet_bytes', 'version', 'platform', 'frame_number',
+                 'time_cpu_cycles', 'num_det_obj', 'num_tlv', 'sub_frame_number', 'timestamp')
+
+
+class Frame:
+    """One mmw demo output packet
+
+    points is a FRAME_POINT_DTYPE array with columns x, y, z, v, range,
+    azimuth, elevation, snr and noise in the sensor frame. It is a view into
+    storage that only grows, so parsing into the same Frame again allocates
+    nothing once the largest frame has been seen. Use copy() to keep a frame
+    while the original is reused.
+
+    tlvs is the TlvPacket index of the packet for TLVs other than the
+    detected points. It refers to the packet bytes and is only valid while
+    those bytes are.
+    """
+
+    __slots__ = HEADER_FIELDS + ('points', 'tlvs', '_storage')
+
+    def __init__(self, capacity=64):
+        self._storage = np.zeros(capacity, dtype=FRAME_POINT_DTYPE)
+        self.clear()
+
+    def clear(self):
+        """Reset the header fields and drop all points, keeping the storage"""
+        self.header_start = -1
+        self.total_packet_bytes = -1
+        self.version = -1
+        self.platform = -1
+        self.frame_number = -1
+        self.time_cpu_cycles = -1
+        self.num_det_obj = -1
+        self.num_tlv = -1
+        self.sub_frame_number = -1
+        self.timestamp = 0.0
+        self.points = self._storage[:0]
+        self.tlvs = None
+
+    def resize(self, num_points):
+        """Make points num_points long, growing the storage if needed; contents are undefined"""
+        if num_points > len(self._storage):
+            self._storage = np.zeros(max(num_points, 2 * len(self._storage)), dtype=FRAME_POINT_DTYPE)
+        self.points = self._storage[:num_points]
+        return self.points
+
+    @property
+    def num_points(self):
+        return len(self.points)
+
+    def copy(self):
+        """Return an independent copy that is not affected when this frame is reused"""
+        other = Frame(capacity=max(1, len(self.points)))
+        for name in HEADER_FIELDS:
+            setattr(other, name, getattr(self, name))
+        other.resize(len(self.points))[:] = self.points
+        return other
+
+    def world_points(self, pose, out=None):
+        """Return the N x 3 world coordinates of the points for a SensorPose"""
+        xyz = np.empty((len(self.points), 3))
+        xyz[:, 0] = self.points['x']
+        xyz[:, 1] = self.points['y']
+        xyz[:, 2] = self.points['z']
+        return pose.transform(xyz, out=out)
+
+    def world_records(self, pose):
+        """Return a copy of points with x, y, z in world coordinates for a SensorPose"""
+        records = self.points.copy()
+        world = self.world_points(pose)
+        records['x'] = world[:, 0]
+        records['y'] = world[:, 1]
+        records['z'] = world[:, 2]
+        return records
+
+    def __repr__(self):
+        return (f"Frame(frame_number={self.frame_number}, sub_frame_number={self.sub_frame_number}, "
+                f"num_points={len(self.points)}, total_packet_bytes={self.total_packet_bytes})")
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Binary IPC between the acquisition process and the web panel
+The radar process sends every frame's world points and, once a second, its
+counters over a Unix domain socket as length-prefixed messages; the web
+panel receives them on a thread. Nothing is formatted or parsed as text
+
+Message layout, all little-endian:
+    header  (5 bytes)  payload length, message type
+    MSG_FRAME payload  sensor ID, frame number, timestamp (s), point count,
+                       then the points as frame_datagram.POINT_DTYPE records
+    MSG_STATS payload  the counters as JSON
+
+Run as a script to print what arrives on a socket:
+    python3 radar_ipc.py --socket /tmp/mmwave_radar.sock
+"""
+
+import argparse
+import json
+import os
+import socket
+import struct
+import threading
+import time
+import numpy as np
+from frame_datagram import POINT_DTYPE
+
+DEFAULT_SOCKET_PATH = '/tmp/mmwave_radar.sock'
+
+MESSAGE_HEADER = struct.Struct('<IB')
+FRAME_HEADER = struct.Struct('<HIdI')
+
+MSG_FRAME = 1
+MSG_STATS = 2
+
+# Unsent bytes the sender keeps for a slow receiver before it drops frames
+DEFAULT_MAX_PENDING_BYTES = 1 << 20
+
+
+def pack_frame_message(sensor_id, frame_number, timestamp, records):
+    """Header and payload of a MSG_FRAME message, as a list of buffers"""
+    payload = memoryview(np.ascontiguousarray(records, dtype=POINT_DTYPE)).cast('B')
+    header = MESSAGE_HEADER.pack(FRAME_HEADER.size + len(payload), MSG_FRAME)
+    return [header + FRAME_HEADER.pack(sensor_id, frame_number, timestamp, len(records)), payload]
+
+
+def pack_stats_message(stats):
+    payload = json.dumps(stats).encode()
+    return [MESSAGE_HEADER.pack(len(payload), MSG_STATS) + payload]
+
+
+class IpcSender:
+    """Client side, used by the acquisition process
+
+    The socket is non-blocking: when the receiver falls behind, unsent bytes
+    are kept up to max_pending_bytes and frames beyond that are dropped and
+    counted instead of stalling the acquisition. Without a receiver the
+    sender tries to connect again every reconnect_interval seconds.
+    """
+
+    def __init__(self, path=DEFAULT_SOCKET_PATH, sensor_id=1, stats_interval=1.0,
+                 max_pending_bytes=DEFAULT_MAX_PENDING_BYTES, reconnect_interval=2.0):
+        self.path = path
+        self.sensor_id = sensor_id
+        self.stats_interval = stats_interval
+        self.max_pending_bytes = max_pending_bytes
+        self.reconnect_interval = reconnect_interval
+        self._sock = None
+        self._pending = bytearray()
+        self._next_connect = 0.0
+        self._next_stats = time.monotonic() + stats_interval
+
+        # Counters
+        self.frames_sent = 0
+        self.frames_dropped = 0
+        self.bytes_sent = 0
+
+    @property
+    def connected(self):
+        return self._sock is not None
+
+    def _connect(self):
+        now = time.monotonic()
+        if now < self._next_connect:
+            return False
+        self._next_connect = now + self.reconnect_interval
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(self.path)
+        except OSError:
+            sock.close()
+            return False
+        sock.setblocking(False)
+        self._sock = sock
+        self._pending.clear()
+        return True
+
+    def _disconnect(self):
+        self._sock.close()
+        self._sock = None
+        self._pending.clear()
+
+    def _flush(self):
+        """Send pending bytes; True once nothing is pending"""
+        while self._pending:
+            try:
+                count = self._sock.send(self._pending)
+            except BlockingIOError:
+                return False
+            self.bytes_sent += count
+            del self._pending[:count]
+        return True
+
+    def _send(self, buffers, droppable):
+        if self._sock is None and not self._connect():
+            return False
+        try:
+            if not self._flush() and droppable:
+                return False
+            size = sum(len(buffer) for buffer in buffers)
+            if droppable and len(self._pending) + size > self.max_pending_bytes:
+                return False
+            if self._pending:
+                for buffer in buffers:
+                    self._pending += buffer
+                return True
+            try:
+                count = self._sock.sendmsg(buffers)
+            except BlockingIOError:
+                count = 0
+            self.bytes_sent += count
+            # Keep the rest of a partly sent message so the stream stays in step
+            if count < size:
+                self._pending += b''.join(bytes(buffer) for buffer in buffers)[count:]
+            return True
+        except OSError:
+            # The receiver went away, e.g. the web panel was restarted
+            self._disconnect()
+            return False
+
+    def send_frame(self, frame_number, timestamp, records):
+        """Send one frame of POINT_DTYPE records; False if it was dropped"""
+        if self._send(pack_frame_message(self.sensor_id, frame_number, timestamp, records), True):
+            self.frames_sent += 1
+            return True
+        self.frames_dropped += 1
+        return False
+
+    def stats_due(self):
+        return time.monotonic() >= self._next_stats
+
+    def send_stats(self, stats):
+        self._next_stats = time.monotonic() + self.stats_interval
+        stats = dict(stats, ipc_frames_sent=self.frames_sent, ipc_frames_dropped=self.frames_dropped,
+                     ipc_pending_bytes=len(self._pending))
+        return self._send(pack_stats_message(stats), False)
+
+    def close(self):
+        if self._sock is not None:
+            self._sock.setblocking(True)
+            self._sock.settimeout(1.0)
+            try:
+                self._flush()
+            except OSError:
+                pass
+            self._disconnect()
+
+
+class IpcReceiver:
+    """Server side, used by the web panel
+
+    Listens on path and calls on_frame(sensor_id, frame_number, timestamp,
+    records) and on_stats(stats) on its own thread for every message of the
+    connected acquisition process. A new connection replaces the old one,
+    so a restarted radar process picks up where the last one stopped.
+    """
+
+    def __init__(self, path=DEFAULT_SOCKET_PATH, on_frame=None, on_stats=None):
+        self.path = path
+        self.on_frame = on_frame
+        self.on_stats = on_stats
+        self._server = None
+        self._thread = None
+
+        # Counters
+        self.frames_received = 0
+        self.stats_received = 0
+        self.connections = 0
+
+    def start(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._server.bind(self.path)
+        self._server.listen(1)
+        self._thread = threading.Thread(target=self._serve, name='radar-ipc', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+    def _serve(self):
+        while self._server is not None:
+            try:
+                connection, _ = self._server.accept()
+            except OSError:
+                break
+            self.connections += 1
+            with connection, connection.makefile('rb', buffering=1 << 16) as stream:
+                self._read(stream)
+
+    def _read(self, stream):
+        while True:
+            header = stream.read(MESSAGE_HEADER.size)
+            if len(header) < MESSAGE_HEADER.size:
+                return
+            length, message_type = MESSAGE_HEADER.unpack(header)
+            payload = stream.read(length)
+            if len(payload) < length:
+                return
+
+            if message_type == MSG_FRAME:
+                sensor_id, frame_number, timestamp, num_points = FRAME_HEADER.unpack_from(payload)
+                records = np.frombuffer(payload, dtype=POINT_DTYPE, count=num_points, offset=FRAME_HEADER.size)
+                self.frames_received += 1
+                if self.on_frame is not None:
+                    self.on_frame(sensor_id, frame_number, timestamp, records)
+            elif message_type == MSG_STATS:
+                self.stats_received += 1
+                if self.on_stats is not None:
+                    self.on_stats(json.loads(payload))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Print the frames and counters sent by the radar process")
+    parser.add_argument('--socket', default=DEFAULT_SOCKET_PATH, help="Unix socket path to listen on")
+    args = parser.parse_args()
+
+    def on_frame(sensor_id, frame_number, timestamp, records):
+        print(f"sensor {sensor_id} frame {frame_number} at {timestamp:.3f}: {len(records)} points")
+
+    def on_stats(stats):
+        print(f"stats: {stats}")
+
+    receiver = IpcReceiver(args.socket, on_frame, on_stats)
+    receiver.start()
+    print(f"Listening on {args.socket}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    receiver.stop()
+
+
+if __name__ == "__main__":
+    main()
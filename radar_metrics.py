@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Acquisition metrics in the Prometheus text format
+The radar process times every frame through the stages read, parse,
+transform and emit in fixed-bucket histograms and tracks the frame rate
+and the frames lost between sensor and output from gaps in frameNumber.
+It sends a snapshot with its other counters over the IPC socket and the web
+panel renders everything on /metrics
+
+Stages:
+    read       the frame assembler cutting the frame's packet out of the
+               received bytes (buffer copy and header search); the wait
+               for the bytes and the handling of earlier frames that
+               arrived in the same read are not included
+    parse      parser_frame() of the packet
+    transform  the points to world coordinates (Frame.world_records), done
+               once for all outputs
+    emit       UDP, IPC and recording of the frame
+"""
+
+import bisect
+import collections
+import math
+import time
+
+READ = 'read'
+PARSE = 'parse'
+TRANSFORM = 'transform'
+EMIT = 'emit'
+STAGES = (READ, PARSE, TRANSFORM, EMIT)
+
+# Upper bounds in seconds; a 100 ms frame period leaves the top buckets for stalls
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+METRIC_PREFIX = 'mmwave_'
+
+
+class Histogram:
+    """Counts of observations per bucket, with their sum
+
+    observe() is a binary search over the fixed bucket bounds and one
+    increment, so it costs the same for every frame however long the run.
+    The counts are kept per bucket and only made cumulative for output.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # the last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """(upper bound, observations <= bound) for every bucket, ending with +Inf"""
+        total = 0
+        result = []
+        for bound, count in zip(self.buckets + (math.inf,), self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+    def to_dict(self):
+        return {'buckets': list(self.buckets), 'counts': list(self.counts), 'sum': self.sum, 'count': self.count}
+
+    @classmethod
+    def from_dict(cls, data):
+        histogram = cls(data['buckets'])
+        histogram.counts = list(data['counts'])
+        histogram.sum = data['sum']
+        histogram.count = data['count']
+        return histogram
+
+
+class FrameNumberTracker:
+    """Frames lost before the output, from gaps in the frame numbers
+
+    A frame number that does not increase means the numbers started over
+    (sensor restart, replay loop); that is counted as a restart, not a gap.
+    """
+
+    def __init__(self):
+        self.last = None
+
+        # Counters
+        self.dropped = 0
+        self.restarts = 0
+
+    def update(self, frame_number):
+        if self.last is not None:
+            gap = frame_number - self.last - 1
+            if gap > 0:
+                self.dropped += gap
+            elif gap < 0:
+                self.restarts += 1
+        self.last = frame_number
+
+
+class RadarMetrics:
+    """Stage latencies, frame rate and dropped frames of one acquisition run
+
+    The frame rate is measured over the last rate_window frames up to now,
+    so it falls to zero when frames stop arriving.
+    """
+
+    def __init__(self, rate_window=50):
+        self.stages = {stage: Histogram() for stage in STAGES}
+        self.frame_numbers = FrameNumberTracker()
+        self._frame_times = collections.deque(maxlen=rate_window)
+
+    def observe(self, stage, seconds):
+        self.stages[stage].observe(seconds)
+
+    def frame(self, frame_number):
+        """Account one frame that reached the output"""
+        self.frame_numbers.update(frame_number)
+        self._frame_times.append(time.monotonic())
+
+    @property
+    def frame_rate(self):
+        if not self._frame_times:
+            return 0.0
+        return len(self._frame_times) / max(time.monotonic() - self._frame_times[0], 1e-3)
+
+    def snapshot(self):
+        """The metrics as a JSON-serializable dict, for the IPC counters"""
+        return {
+            'frame_rate': round(self.frame_rate, 3),
+            'frames_dropped': self.frame_numbers.dropped,
+            'sensor_restarts': self.frame_numbers.restarts,
+            'stages': {stage: histogram.to_dict() for stage, histogram in self.stages.items()},
+        }
+
+
+def format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+               for value in labels.values())
+    return '{' + ','.join(f'{name}="{value}"' for name, value in zip(labels, escaped)) + '}'
+
+
+class MetricsWriter:
+    """Builds a text exposition; samples of one metric are kept together under its HELP and TYPE"""
+
+    def __init__(self, prefix=METRIC_PREFIX):
+        self.prefix = prefix
+        self._families = {}
+
+    def _family(self, name, kind, help_text):
+        name = self.prefix + name
+        if name not in self._families:
+            self._families[name] = (kind, help_text, [])
+        return name, self._families[name][2]
+
+    def counter(self, name, help_text, value, labels=None):
+        name, samples = self._family(name, 'counter', help_text)
+        samples.append(f"{name}{format_labels(labels)} {format_value(value)}")
+
+    def gauge(self, name, help_text, value, labels=None):
+        name, samples = self._family(name, 'gauge', help_text)
+        samples.append(f"{name}{format_labels(labels)} {format_value(value)}")
+
+    def histogram(self, name, help_text, histogram, labels=None):
+        name, samples = self._family(name, 'histogram', help_text)
+        labels = labels or {}
+        for bound, count in histogram.cumulative():
+            samples.append(f"{name}_bucket{format_labels(dict(labels, le=format_value(float(bound))))} {count}")
+        samples.append(f"{name}_sum{format_labels(labels)} {format_value(float(histogram.sum))}")
+        samples.append(f"{name}_count{format_labels(labels)} {histogram.count}")
+
+    def text(self):
+        lines = []
+        for name, (kind, help_text, samples) in self._families.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(samples)
+        return '\n'.join(lines) + '\n'
+
+
+def write_acquisition_metrics(writer, stats):
+    """Add the counters the radar process sent over IPC (see radar_configured.py) to writer"""
+    writer.gauge('frame_rate', "Frames per second reaching the output", stats.get('frame_rate', 0.0))
+    writer.counter('frames_total', "Frames parsed and handed to the output", stats.get('frames', 0))
+    writer.counter('points_total', "Detected points in those frames", stats.get('points', 0))
+    writer.counter('frames_dropped_total', "Frames missing from the output, from gaps in frameNumber",
+                   stats.get('frames_dropped', 0))
+    writer.counter('sensor_restarts_total', "Times the frame numbers started over", stats.get('sensor_restarts', 0))
+    writer.counter('frames_failed_total', "Packets that failed to parse", stats.get('frames_failed', 0))
+    writer.counter('bytes_read_total', "Bytes read from the data port", stats.get('bytes_received', 0))
+    writer.counter('resync_bytes_skipped_total', "Bytes skipped while searching for a frame header",
+                   stats.get('bytes_skipped', 0))
+    writer.counter('resyncs_total', "Times the stream lost the frame boundary", stats.get('resync_count', 0))
+    writer.gauge('assembler_pending_bytes', "Bytes of a partial frame waiting in the assembler",
+                 stats.get('assembler_pending', 0))
+    for queue, status in stats.get('queues', {}).items():
+        labels = {'queue': queue}
+        writer.gauge('queue_depth', "Items waiting in a pipeline queue", status['depth'], labels)
+        writer.gauge('queue_capacity', "Size limit of a pipeline queue", status['maxsize'], labels)
+        writer.counter('queue_dropped_total', "Items a pipeline queue dropped when full", status['dropped'], labels)
+    writer.counter('ipc_frames_sent_total', "Frames sent to the web panel", stats.get('ipc_frames_sent', 0))
+    writer.counter('ipc_frames_dropped_total', "Frames not sent because the web panel fell behind",
+                   stats.get('ipc_frames_dropped', 0))
+    writer.gauge('ipc_pending_bytes', "Bytes waiting to be sent to the web panel", stats.get('ipc_pending_bytes', 0))
+    writer.gauge('cfar_offset_db', "CFAR threshold raise above the profile", stats.get('cfar_offset_db', 0.0))
+    for stage, data in stats.get('stages', {}).items():
+        writer.histogram('stage_latency_seconds', "Time a frame spent in each acquisition stage",
+                         Histogram.from_dict(data), {'stage': stage})
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Threaded acquisition pipeline
+A reader thread only drains the data port into the frame assembler, a parser
+thread turns packets into Frames and a sink thread runs the output callback.
+The stages are joined by bounded queues, so a slow stdout pipe or UDP send
+never stops the UART from being read
+"""
+
+import collections
+import threading
+import time
+from frame_assembler import FrameAssembler
+from parcer_XY_test import parser_frame, TC_PASS
+from radar_acquisition import wait_for_data
+from radar_metrics import READ, PARSE
+
+DROP_OLDEST = 'drop_oldest'
+BLOCK = 'block'
+OVERLOAD_POLICIES = (DROP_OLDEST, BLOCK)
+
+# Put on a queue by a stage that stops, so the next stage stops after it
+_END = object()
+
+
+class StageQueue:
+    """Bounded queue between two stages
+
+    When the queue is full, DROP_OLDEST discards the oldest item to make room
+    and BLOCK makes the producer wait for the consumer.
+    """
+
+    def __init__(self, maxsize=8, policy=DROP_OLDEST):
+        if policy not in OVERLOAD_POLICIES:
+            raise ValueError(f"Unknown overload policy {policy!r}, use one of {OVERLOAD_POLICIES}")
+        self.maxsize = maxsize
+        self.policy = policy
+        self._items = collections.deque()
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+
+        # Counters
+        self.put_count = 0
+        self.dropped = 0
+        self.max_depth = 0
+
+    @property
+    def depth(self):
+        return len(self._items)
+
+    def put(self, item, force=False):
+        """Add an item; force skips the size limit (used for the end marker)"""
+        with self._lock:
+            if not force and len(self._items) >= self.maxsize:
+                if self.policy == DROP_OLDEST:
+                    self._items.popleft()
+                    self.dropped += 1
+                else:
+                    while len(self._items) >= self.maxsize:
+                        self._not_full.wait()
+            self._items.append(item)
+            if not force:
+                self.put_count += 1
+                self.max_depth = max(self.max_depth, len(self._items))
+            self._not_empty.notify()
+
+    def get(self, timeout=None):
+        """Remove and return the oldest item, or None after timeout seconds"""
+        with self._lock:
+            if not self._items and not self._not_empty.wait_for(lambda: self._items, timeout):
+                return None
+            item = self._items.popleft()
+            self._not_full.notify()
+            return item
+
+
+class StageStats:
+    """Work done by one pipeline stage"""
+
+    def __init__(self, name):
+        self.name = name
+        self.processed = 0
+        self.failed = 0
+        self.busy_time = 0.0
+        self.busy_max = 0.0
+
+    def record(self, seconds):
+        self.processed += 1
+        self.busy_time += seconds
+        self.busy_max = max(self.busy_max, seconds)
+
+    def summary(self):
+        mean = self.busy_time / self.processed if self.processed else 0.0
+        return (f"{self.name}: {self.processed} done, {self.failed} failed, "
+                f"{mean * 1000:.2f} ms mean, {self.busy_max * 1000:.2f} ms max")
+
+
+class RadarPipeline:
+    """Reader, parser and sink threads for one data port
+
+    on_frame(frame) runs on the sink thread. Every frame is a new Frame, so
+    it may be kept. latency_max and latency_total cover the time from the
+    wake-up that delivered a frame's last bytes until on_frame returned.
+    The read and parse time of every packet go to metrics, a RadarMetrics,
+    when one is given. capacity and max_frame_bytes size the frame assembler
+    as for a StreamParser (see RadarProfile.stream_parser_options()).
+    """
+
+    def __init__(self, data_port, on_frame, queue_size=8, policy=DROP_OLDEST, on_idle=None, idle_timeout=0.1,
+                 metrics=None, capacity=65536, max_frame_bytes=None):
+        self.data_port = data_port
+        self.on_frame = on_frame
+        self.on_idle = on_idle
+        self.idle_timeout = idle_timeout
+        self.assembler = FrameAssembler(capacity, max_frame_bytes)
+        self.packets = StageQueue(queue_size, policy)
+        self.frames = StageQueue(queue_size, policy)
+        self.reader_stats = StageStats('reader')
+        self.parser_stats = StageStats('parser')
+        self.sink_stats = StageStats('sink')
+        self.metrics = metrics
+        self._stop = threading.Event()
+        self._threads = []
+
+        # Counters
+        self.bytes_read = 0
+        self.idle_polls = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    def start(self):
+        for target in (self._read, self._parse, self._sink):
+            thread = threading.Thread(target=target, name=f"pipeline-{target.__name__[1:]}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        self._stop.set()
+
+    def join(self):
+        for thread in self._threads:
+            thread.join()
+
+    def run(self):
+        """Run the pipeline until Ctrl-C or a finished replay"""
+        self.start()
+        try:
+            while self._threads[-1].is_alive():
+                self._threads[-1].join(0.1)
+        except KeyboardInterrupt:
+            pass
+        self.stop()
+        self.join()
+
+    def _read(self):
+        try:
+            while not self._stop.is_set() and not getattr(self.data_port, 'finished', False):
+                new_data = wait_for_data(self.data_port, self.idle_timeout)
+                if not new_data:
+                    self.idle_polls += 1
+                    if self.on_idle is not None:
+                        self.on_idle(self.idle_polls)
+                    continue
+
+                wake_time = time.perf_counter()
+                self.bytes_read += len(new_data)
+                started = wake_time
+                for packet in self.assembler.feed(new_data):
+                    # The assembler reuses its buffer, the parser gets a copy
+                    packet = bytes(packet)
+                    if self.metrics is not None:
+                        # Only this packet's assembly, not the queue or the packets before it
+                        self.metrics.observe(READ, time.perf_counter() - started)
+                    self.packets.put((wake_time, packet))
+                    started = time.perf_counter()
+                self.reader_stats.record(time.perf_counter() - wake_time)
+        finally:
+            self.packets.put(_END, force=True)
+
+    # The parser and the sink run until the stage before them sends _END,
+    # so everything the reader queued is still handled after stop()
+
+    def _parse(self):
+        while True:
+            item = self.packets.get()
+            if item is _END:
+                break
+
+            wake_time, packet = item
+            started = time.perf_counter()
+            try:
+                result, frame = parser_frame(packet, len(packet))
+            except Exception:
+                result = None  # a damaged packet must not stop the parser thread
+            if result == TC_PASS:
+                self.frames.put((wake_time, frame))
+            else:
+                self.parser_stats.failed += 1
+            elapsed = time.perf_counter() - started
+            self.parser_stats.record(elapsed)
+            if self.metrics is not None:
+                self.metrics.observe(PARSE, elapsed)
+        self.frames.put(_END, force=True)
+
+    def _sink(self):
+        while True:
+            item = self.frames.get()
+            if item is _END:
+                break
+
+            wake_time, frame = item
+            started = time.perf_counter()
+            try:
+                self.on_frame(frame)
+            except Exception as e:
+                self.sink_stats.failed += 1
+                print(f"Frame error: {e}")
+            done = time.perf_counter()
+            self.sink_stats.record(done - started)
+            self.latency_total += done - wake_time
+            self.latency_max = max(self.latency_max, done - wake_time)
+
+    def summary(self):
+        frames = self.sink_stats.processed
+        mean = self.latency_total / frames if frames else 0.0
+        lines = [f"{frames} frames, latency mean {mean * 1000:.2f} ms, max {self.latency_max * 1000:.2f} ms"]
+        for stats in (self.reader_stats, self.parser_stats, self.sink_stats):
+            lines.append(stats.summary())
+        for name, queue in (('packet queue', self.packets), ('frame queue', self.frames)):
+            lines.append(f"{name}: depth {queue.depth}, max {queue.max_depth}/{queue.maxsize}, "
+                         f"{queue.dropped} dropped ({queue.policy})")
+        return '\n'.join(lines)
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Replay of recorded mmWave radar data
+ReplayPort plays a Visualizer .dat capture or a raw dump of the UART data
+port back through the same interface as the serial data port, so the
+acquisition loop runs unchanged without a radar attached
+"""
+
+import time
+import numpy as np
+from dat_capture import DatCapture
+
+# timeCpuCycles counts R4F cycles, which run at 200 MHz on the xWR18xx
+DEFAULT_CPU_CLOCK_HZ = 200e6
+
+
+def frame_times(index, cpu_clock_hz=DEFAULT_CPU_CLOCK_HZ, frame_period=None, max_gap=1.0):
+    """Return the time in seconds of each frame of a capture index, relative to the first one
+
+    By default the times come from timeCpuCycles. With frame_period (seconds)
+    they come from frameNumber instead. Both counters are 32-bit and may wrap;
+    steps longer than max_gap seconds (sensor restarts, pauses in the
+    recording) are shortened to max_gap.
+    """
+    if len(index) == 0:
+        return np.zeros(0)
+    if frame_period is not None:
+        steps = (np.diff(index['frame_number'].astype(np.int64)) % 2**32) * frame_period
+    else:
+        steps = (np.diff(index['time_cpu_cycles'].astype(np.int64)) % 2**32) / cpu_clock_hz
+    np.minimum(steps, max_gap, out=steps)
+    return np.concatenate(([0.0], np.cumsum(steps)))
+
+
+class ReplayPort:
+    """Stands in for the serial data port, releasing recorded frames on schedule
+
+    speed scales the original timing: 1.0 is real time, 4.0 four times as
+    fast, 0 releases frames as fast as they are read. Only complete frames
+    found in the recording are replayed; bytes between them are dropped.
+
+    max_lag is the longest time a frame waited past its due time before it
+    was read, i.e. how far the consumer fell behind the recording.
+    """
+
+    def __init__(self, path, speed=1.0, loop=False, cpu_clock_hz=DEFAULT_CPU_CLOCK_HZ,
+                 frame_period=None, max_gap=1.0, max_pending_bytes=65536):
+        self.path = path
+        self.speed = speed
+        self.loop = loop
+        self.max_pending_bytes = max_pending_bytes
+        self.capture = DatCapture(path)
+        self._times = frame_times(self.capture.index, cpu_clock_hz, frame_period, max_gap)
+
+        # A looped recording starts over one typical frame step after its last frame
+        if len(self._times) > 1:
+            self._loop_length = self._times[-1] + float(np.median(np.diff(self._times)))
+        else:
+            self._loop_length = max_gap
+
+        self._buffer = bytearray()
+        self._next = 0
+        self._start = None
+        self._offset = 0.0
+        self.is_open = True
+
+        # Counters
+        self.frames_released = 0
+        self.bytes_released = 0
+        self.loops = 0
+        self.max_lag = 0.0
+
+    @property
+    def num_frames(self):
+        return len(self._times)
+
+    @property
+    def finished(self):
+        """True once every frame was released and read (never when looping)"""
+        return not self.loop and self._next >= len(self._times) and not self._buffer
+
+    def _release(self):
+        """Move every frame that is due into the read buffer"""
+        now = time.perf_counter()
+        if self._start is None:
+            self._start = now
+
+        while len(self._buffer) < self.max_pending_bytes:
+            if self._next >= len(self._times):
+                if not self.loop or len(self._times) == 0:
+                    break
+                self._next = 0
+                self._offset += self._loop_length
+                self.loops += 1
+
+            if self.speed:
+                due = self._start + (self._offset + self._times[self._next]) / self.speed
+                if due > now:
+                    break
+                self.max_lag = max(self.max_lag, now - due)
+
+            frame = self.capture.frame_bytes(self._next)
+            self._buffer += frame
+            self._next += 1
+            self.frames_released += 1
+            self.bytes_released += len(frame)
+
+    def wait(self, timeout):
+        """Sleep until the next frame is due, at most timeout seconds"""
+        self._release()
+        if self._buffer or not self.speed or len(self._times) == 0:
+            return
+        if self._next < len(self._times):
+            due = self._offset + self._times[self._next]
+        elif self.loop:
+            due = self._offset + self._loop_length + self._times[0]
+        else:
+            return
+        delay = self._start + due / self.speed - time.perf_counter()
+        time.sleep(min(max(delay, 0.0), timeout))
+
+    def inWaiting(self):
+        self._release()
+        return len(self._buffer)
+
+    @property
+    def in_waiting(self):
+        return self.inWaiting()
+
+    def read(self, size=1):
+        self._release()
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+    def reset_input_buffer(self):
+        self._buffer.clear()
+
+    def close(self):
+        self.capture.close()
+        self.is_open = False
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Supervisor for several mmWave radars on one host
+Runs one acquisition worker process per sensor, so parsing spreads over
+all cores, and merges their frames into one stream tagged with the sensor
+ID. The merged frames go out in the binary UDP format of frame_datagram.py
+
+    python3 radar_supervisor.py sensors.json
+    python3 radar_supervisor.py --discover
+
+sensors.json holds one entry per sensor with the keys of the web panel
+config (ID, X, Y, Z, yaw_psi, pitch_theta, roll_phi) plus cli_port,
+data_port and optionally cfg (the .cfg file) or replay (a capture to play
+back instead of a radar)
+"""
+
+import argparse
+import json
+import multiprocessing
+import queue
+import re
+import time
+import serial
+from frame_datagram import UdpFrameSender
+from parcer_XY_test import serverAddress
+from radar_acquisition import run_acquisition, AcquisitionStats, CLI_BAUD, DATA_BAUD
+from radar_replay import ReplayPort
+from radar_cli import configure_radar
+from sensor_pose import SensorPose
+from stream_parser import StreamParser
+
+CONFIG_FILE = 'xwr18xx_profile_2023_07_26T08_46_17_507.cfg'
+
+# USB IDs of the XDS110 debug probe on TI mmWave EVMs
+XDS110_VID = 0x0451
+XDS110_PID = 0xBEF3
+
+STATS_INTERVAL = 1.0
+
+
+def port_order(port):
+    """Sort key of one port of a probe: USB interface number, then the number ending the device name
+
+    location looks like '1-1.4:1.0' with the interface after the last dot.
+    Device names are compared by number so /dev/ttyACM9 comes before
+    /dev/ttyACM10.
+    """
+    location = port.location or ''
+    interface = location.rsplit('.', 1)[-1] if ':' in location else ''
+    number = re.search(r'(\d+)$', port.device)
+    return (int(interface) if interface.isdigit() else -1, int(number.group(1)) if number else -1, port.device)
+
+
+def discover_sensors():
+    """Return a sensor config for every XDS110 probe found, IDs from 1, poses zero
+
+    Each probe has two ports; the lower interface is the CLI port and the
+    higher one the data port.
+    """
+    from serial.tools import list_ports
+
+    probes = {}
+    for port in list_ports.comports():
+        if port.vid == XDS110_VID and port.pid == XDS110_PID:
+            # Without a serial number the USB path without the interface names the probe
+            key = port.serial_number or (port.location or port.device).split(':')[0]
+            probes.setdefault(key, []).append(port)
+
+    sensors = []
+    for sensor_id, key in enumerate(sorted(probes, key=str), start=1):
+        ports = sorted(probes[key], key=port_order)
+        if len(ports) < 2:
+            continue
+        sensors.append({'ID': sensor_id, 'cli_port': ports[0].device, 'data_port': ports[1].device})
+    return sensors
+
+
+def configure_sensor(sensor):
+    """Upload the .cfg of one sensor over its CLI port; returns True if the radar accepted it
+
+    The supervisor calls this for one sensor after the other before the
+    workers start, so the CLI state file is never written by two processes
+    at once.
+    """
+    sensor_id = sensor['ID']
+    try:
+        with serial.Serial(sensor['cli_port'], CLI_BAUD, timeout=1) as cli_port:
+            ok, results, _ = configure_radar(cli_port, sensor.get('cfg', CONFIG_FILE))
+    except (OSError, serial.SerialException) as e:
+        print(f"✗ Sensor {sensor_id}: cannot configure on {sensor['cli_port']}: {e}")
+        return False
+    for result in results:
+        if not result.ok:
+            print(f"✗ Sensor {sensor_id} line {result.line_number}: {result.command}: {result.message}")
+    return ok
+
+
+def sensor_worker(sensor, frames, stop_event):
+    """Acquisition process of one sensor, configured already by configure_sensor()
+
+    Puts ('frame', ID, frame_number, timestamp, world records) for every
+    frame and ('stats', ID, counters) every STATS_INTERVAL seconds on the
+    frames queue. Frames that do not fit in the queue are dropped and
+    counted instead of stalling the serial port.
+    """
+    sensor_id = sensor['ID']
+    pose = SensorPose.from_config(sensor)
+    counters = {'frames': 0, 'points': 0, 'dropped': 0, 'failed': 0, 'callback_errors': 0, 'bytes_read': 0}
+
+    if sensor.get('replay'):
+        data_port = ReplayPort(sensor['replay'], speed=sensor.get('speed', 1.0))
+    else:
+        data_port = serial.Serial(sensor['data_port'], DATA_BAUD, timeout=1)
+
+    stream = StreamParser(reuse_frame=True)
+    stats = AcquisitionStats()
+    next_stats = time.monotonic() + STATS_INTERVAL
+
+    def report(stats):
+        counters['bytes_read'] = stats.bytes_read
+        counters['failed'] = stream.frames_failed
+        counters['callback_errors'] = stats.callback_errors
+        try:
+            frames.put_nowait(('stats', sensor_id, dict(counters)))
+        except queue.Full:
+            pass
+
+    def on_frame(frame):
+        nonlocal next_stats
+        counters['frames'] += 1
+        counters['points'] += frame.num_points
+        try:
+            frames.put_nowait(('frame', sensor_id, frame.frame_number, frame.timestamp, frame.world_records(pose)))
+        except queue.Full:
+            counters['dropped'] += 1
+        if time.monotonic() >= next_stats:
+            next_stats += STATS_INTERVAL
+            report(stats)
+
+    def on_idle(idle_polls):
+        nonlocal next_stats
+        if time.monotonic() >= next_stats:
+            next_stats += STATS_INTERVAL
+            report(stats)
+
+    try:
+        run_acquisition(data_port, on_frame, stream=stream, on_idle=on_idle, stats=stats, stop_event=stop_event)
+    finally:
+        report(stats)
+        frames.put(('exit', sensor_id, dict(counters)))
+        data_port.close()
+
+
+class SensorStatus:
+    """Throughput of one worker as seen by the supervisor"""
+
+    def __init__(self, sensor_id):
+        self.sensor_id = sensor_id
+        self.counters = {}
+        self.frames_received = 0
+        self.points_received = 0
+        self.started = time.monotonic()
+        self.running = True
+
+    def line(self):
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        return (f"sensor {self.sensor_id}: {self.frames_received / elapsed:6.1f} fps "
+                f"{self.points_received / elapsed:8.1f} points/s, "
+                f"{self.counters.get('dropped', 0)} dropped, {self.counters.get('failed', 0)} failed, "
+                f"{self.counters.get('callback_errors', 0)} callback errors"
+                f"{'' if self.running else ' (stopped)'}")
+
+
+class RadarSupervisor:
+    """Starts one worker process per sensor and merges their frames
+
+    on_frame(sensor_id, frame_number, timestamp, records) is called in the
+    supervisor process for every frame of every sensor, records being the
+    POINT_DTYPE points in world coordinates.
+    """
+
+    def __init__(self, sensors, on_frame, queue_size=64):
+        ids = [sensor['ID'] for sensor in sensors]
+        if len(set(ids)) != len(ids):
+            raise ValueError(f"Sensor IDs must be unique, got {ids}")
+        self.sensors = sensors
+        self.on_frame = on_frame
+        self.frames = multiprocessing.Queue(queue_size)
+        self.stop_event = multiprocessing.Event()
+        self.status = {sensor['ID']: SensorStatus(sensor['ID']) for sensor in sensors}
+        self._processes = []
+
+    def start(self):
+        for sensor in self.sensors:
+            if not sensor.get('replay'):
+                configure_sensor(sensor)
+        for sensor in self.sensors:
+            process = multiprocessing.Process(target=sensor_worker, name=f"radar-{sensor['ID']}",
+                                              args=(sensor, self.frames, self.stop_event), daemon=True)
+            process.start()
+            self._processes.append(process)
+
+    def stop(self):
+        self.stop_event.set()
+
+    @property
+    def running(self):
+        return any(status.running for status in self.status.values())
+
+    def poll(self, timeout=0.1):
+        """Handle the messages of the workers for up to timeout seconds"""
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                message = self.frames.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                break
+            kind, sensor_id = message[0], message[1]
+            status = self.status[sensor_id]
+            if kind == 'frame':
+                status.frames_received += 1
+                status.points_received += len(message[4])
+                self.on_frame(*message[1:])
+            else:
+                status.counters = message[2]
+                if kind == 'exit':
+                    status.running = False
+            if time.monotonic() >= deadline:
+                break
+
+        # A worker that died without saying so, e.g. a serial port that could not be opened
+        for process, sensor in zip(self._processes, self.sensors):
+            if not process.is_alive() and self.status[sensor['ID']].running and self.frames.empty():
+                self.status[sensor['ID']].running = False
+
+    def run(self, report_interval=5.0):
+        """Run until Ctrl-C or every worker stopped, printing throughput every report_interval seconds"""
+        self.start()
+        next_report = time.monotonic() + report_interval
+        try:
+            while self.running:
+                self.poll()
+                if time.monotonic() >= next_report:
+                    next_report += report_interval
+                    self.report()
+        except KeyboardInterrupt:
+            self.stop()
+            # Let the workers finish and hand in their last counters
+            deadline = time.monotonic() + 2.0
+            while self.running and time.monotonic() < deadline:
+                self.poll()
+        for process in self._processes:
+            process.join(1.0)
+        self.report()
+
+    def report(self):
+        for status in self.status.values():
+            print(status.line())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run several mmWave radars in parallel")
+    parser.add_argument('sensors', nargs='?', help="JSON file with one entry per sensor")
+    parser.add_argument('--discover', action='store_true', help="Use every TI XDS110 probe found")
+    parser.add_argument('--udp-host', default=serverAddress[0], help="Binary frame datagram destination")
+    parser.add_argument('--udp-port', type=int, default=serverAddress[1], help="Binary frame datagram port")
+    parser.add_argument('--report-interval', type=float, default=5.0, help="Seconds between throughput reports")
+    args = parser.parse_args()
+
+    if args.sensors:
+        with open(args.sensors, 'r') as f:
+            sensors = json.load(f)
+    elif args.discover:
+        sensors = discover_sensors()
+        for sensor in sensors:
+            print(f"Found sensor {sensor['ID']}: CLI {sensor['cli_port']}, data {sensor['data_port']}")
+    else:
+        parser.error("give a sensors JSON file or --discover")
+    if not sensors:
+        print("✗ No sensors configured")
+        return
+
+    sender = UdpFrameSender((args.udp_host, args.udp_port))
+
+    def on_frame(sensor_id, frame_number, timestamp, records):
+        sender.send(sensor_id, frame_number, records, timestamp)
+
+    print(f"Starting {len(sensors)} sensors, sending frames to {args.udp_host}:{args.udp_port}")
+    RadarSupervisor(sensors, on_frame).run(args.report_interval)
+
+
+if __name__ == "__main__":
+    main()
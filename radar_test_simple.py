@@ -10,7 +10,12 @@ import serial
 import time
 import numpy as np
 from datetime import datetime
-from parcer_XY_test import parser_one_mmw_demo_output_packet
+from parcer_XY_test import sendFrameUdp
+from stream_parser import StreamParser
+from sensor_pose import SensorPose
+from radar_acquisition import run_acquisition, CLI_PORT, DATA_PORT, CLI_BAUD, DATA_BAUD
+from radar_cli import configure_radar
+from radar_cfg import load_profile
 
 # Default sensor parameters (can be modified as needed)
 DEFAULT_SENSOR_CONFIG = {
@@ -28,9 +33,9 @@ def setup_radar_ports():
     """Setup serial connections to radar"""
     try:
         # CLI port for configuration
-        cli_port = serial.Serial('/dev/ttyACM0', 115200, timeout=1)
+        cli_port = serial.Serial(CLI_PORT, CLI_BAUD, timeout=1)
         # Data port for radar data
-        data_port = serial.Serial('/dev/ttyACM1', 921600, timeout=1)
+        data_port = serial.Serial(DATA_PORT, DATA_BAUD, timeout=1)
         print("✓ Serial ports connected successfully")
         return cli_port, data_port
     except Exception as e:
@@ -39,46 +44,28 @@ def setup_radar_ports():
         return None, None
 
 def send_config_to_radar(cli_port, config_file):
-    """Send configuration commands to radar"""
+    """Send configuration commands to radar, each after the previous one was acknowledged"""
     try:
-        with open(config_file, 'r') as f:
-            config_lines = [line.rstrip('\r\n') for line in f]
+        def on_result(result):
+            mark = "✓" if result.ok else "✗"
+            print(f"  {result.line_number:2d}: {mark} {result.command} ({result.seconds * 1000:.0f} ms)")
+            if not result.ok:
+                print(f"      {result.message}")
         
-        print(f"Sending {len(config_lines)} configuration commands...")
-        for i, line in enumerate(config_lines):
-            if line.strip() and not line.startswith('%'):
-                cli_port.write((line + '\n').encode())
-                print(f"  {i+1:2d}: {line}")
-                time.sleep(0.01)
-        
-        print("✓ Configuration sent successfully")
-        return True
+        # Only restarts the sensor if the radar already runs this configuration
+        print("Configuring radar...")
+        ok, results, skipped = configure_radar(cli_port, config_file, on_result=on_result)
+        if skipped:
+            print("✓ Configuration unchanged, radar restarted without upload")
+        elif ok:
+            print("✓ Configuration sent successfully")
+        else:
+            print(f"✗ {sum(not result.ok for result in results)} configuration commands failed")
+        return ok
     except Exception as e:
         print(f"✗ Error sending configuration: {e}")
         return False
 
-def parse_radar_config(config_file):
-    """Parse configuration file to extract radar parameters"""
-    config_params = {}
-    
-    try:
-        with open(config_file, 'r') as f:
-            config_lines = [line.rstrip('\r\n') for line in f]
-        
-        for line in config_lines:
-            if line.strip() and not line.startswith('%'):
-                parts = line.split()
-                if len(parts) > 1:
-                    if "profileCfg" in parts[0]:
-                        config_params['numAdcSamples'] = int(parts[10])
-                    elif "frameCfg" in parts[0]:
-                        config_params['framePeriodicity'] = int(parts[5])
-        
-        return config_params
-    except Exception as e:
-        print(f"Warning: Could not parse config file: {e}")
-        return {}
-
 def main():
     """Main radar data processing loop"""
     config_file = 'xwr18xx_profile_2023_07_26T08_46_17_507.cfg'
@@ -102,8 +89,12 @@ def main():
         if not send_config_to_radar(cli_port, config_file):
             return
         
-        # Parse config parameters
-        config_params = parse_radar_config(config_file)
+        # Derived figures of the profile, and whether its frames fit through the UART
+        profile = load_profile(config_file)
+        if profile:
+            print(f"\n{profile.summary()}")
+            for problem in profile.check():
+                print(f"⚠ {problem}")
         
         # Get sensor configuration
         sensor_config = DEFAULT_SENSOR_CONFIG.copy()
@@ -118,84 +109,46 @@ def main():
         print(f"{'='*60}")
         print()
         
+        # Keeps partial frames between reads, buffers sized for the worst case frame of the profile
+        stream = StreamParser(reuse_frame=True, **(profile.stream_parser_options() if profile else {}))
+        pose = SensorPose.from_config(sensor_config)
         frame_count = 0
-        no_data_count = 0
-        data_buffer = bytearray()  # Buffer to accumulate data
         
-        while True:
-            # Read available data from radar
-            byte_count = data_port.inWaiting()
-            if byte_count > 0:
-                new_data = data_port.read(byte_count)
-                data_buffer.extend(new_data)  # Add to buffer
-                no_data_count = 0  # Reset counter when we get data
-                
-                # Only process if we have enough data for at least a header
-                if len(data_buffer) > 40:
-                    # Parse the radar data
-                    try:
-                        result = parser_one_mmw_demo_output_packet(
-                            data_buffer, 
-                            len(data_buffer),
-                            sensor_config['ID'],
-                            sensor_config['X'],
-                            sensor_config['Y'], 
-                            sensor_config['Z'],
-                            sensor_config['yaw_psi'],
-                            sensor_config['pitch_theta'],
-                            sensor_config['roll_phi']
-                        )
-                        
-                        (parser_result, header_start, total_bytes, num_objects, 
-                         num_tlv, subframe, x_array, y_array, z_array, v_array,
-                         range_array, azimuth_array, elevation_array, 
-                         snr_array, noise_array) = result
-                        
-                        if parser_result == 0:
-                            frame_count += 1
-                            timestamp = datetime.now().strftime("%H:%M:%S.%f")[:-3]
-                            
-                            # Remove processed data from buffer
-                            if header_start >= 0 and total_bytes > 0:
-                                bytes_to_remove = header_start + total_bytes
-                                data_buffer = data_buffer[bytes_to_remove:]
-                            
-                            if num_objects > 0:
-                                print(f"\n[{timestamp}] Frame #{frame_count} - {num_objects} objects detected:")
-                                print("-" * 80)
-                                print(f"{'Obj':<4} {'X(m)':<8} {'Y(m)':<8} {'Z(m)':<8} {'V(m/s)':<8} {'Range(m)':<8} {'Az(°)':<7} {'El(°)':<7}")
-                                print("-" * 80)
-                                
-                                for i in range(num_objects):
-                                    print(f"{i:<4} {x_array[i]:<8.3f} {y_array[i]:<8.3f} {z_array[i]:<8.3f} "
-                                          f"{v_array[i]:<8.3f} {range_array[i]:<8.3f} {azimuth_array[i]:<7.1f} "
-                                          f"{elevation_array[i]:<7.1f}")
-                            else:
-                                # Only show "no objects" message occasionally to avoid spam
-                                if frame_count % 50 == 0:  # Show every 50th frame
-                                    print(f"[{timestamp}] Frame #{frame_count} - No objects detected")
-                        else:
-                            # Parser failed - might be incomplete data, just continue
-                            # Keep buffer but limit its size to prevent memory issues
-                            if len(data_buffer) > 10000:  # 10KB limit
-                                data_buffer = data_buffer[-5000:]  # Keep last 5KB
-                    
-                    except Exception as e:
-                        print(f"Parser error: {e}")
-                        # Clear buffer on serious errors
-                        data_buffer = bytearray()
+        # Called for every frame completed by the data read from the radar
+        def on_frame(parsed):
+            nonlocal frame_count
+            frame_count += 1
+            timestamp = datetime.now().strftime("%H:%M:%S.%f")[:-3]
+            num_objects = parsed.num_points
             
-            else:
-                # No data available, increment counter
-                no_data_count += 1
-                if no_data_count % 100 == 0:  # Show status every 10 seconds (100 * 0.1s)
-                    print(".", end="", flush=True)  # Show we're still running
+            # Send the points in world coordinates over UDP
+            sendFrameUdp(parsed, sensor_config['ID'], pose)
             
-            # Small delay to prevent overwhelming the system
-            time.sleep(sensor_config['sensor_delay'])
-    
-    except KeyboardInterrupt:
+            if num_objects > 0:
+                print(f"\n[{timestamp}] Frame #{frame_count} - {num_objects} objects detected:")
+                print("-" * 80)
+                print(f"{'Obj':<4} {'X(m)':<8} {'Y(m)':<8} {'Z(m)':<8} {'V(m/s)':<8} {'Range(m)':<8} {'Az(°)':<7} {'El(°)':<7}")
+                print("-" * 80)
+                
+                for i, (x, y, z, v, rng, az, el, snr, noise) in enumerate(parsed.points.tolist()):
+                    print(f"{i:<4} {x:<8.3f} {y:<8.3f} {z:<8.3f} "
+                          f"{v:<8.3f} {rng:<8.3f} {az:<7.1f} "
+                          f"{el:<7.1f}")
+            else:
+                # Only show "no objects" message occasionally to avoid spam
+                if frame_count % 50 == 0:  # Show every 50th frame
+                    print(f"[{timestamp}] Frame #{frame_count} - No objects detected")
+        
+        def on_idle(idle_polls):
+            if idle_polls % 100 == 0:  # Show status every 10 seconds (100 * 0.1s without data)
+                print(".", end="", flush=True)  # Show we're still running
+        
+        # Wakes up as soon as the radar sends data; a failing frame is printed and skipped
+        stats = run_acquisition(data_port, on_frame, stream, on_idle=on_idle)
+        
         print(f"\n\nStopping radar... Processed {frame_count} frames")
+        print(f"Acquisition: {stats.summary()}")
+        print(f"Resync: skipped {stream.bytes_skipped} bytes in {stream.resync_count} resyncs, {stream.frames_failed} frames failed to parse")
     
     except Exception as e:
         print(f"Error during operation: {e}")
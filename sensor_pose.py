@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Sensor mounting pose for the mmWave radar
+Transforms detected points from the sensor frame into world coordinates
+"""
+
+import functools
+import math
+import numpy as np
+
+# The radar reports x across and y along its boresight. World points are
+# built from (Y, -X, Z) before the mounting rotation is applied.
+MOUNTING_AXIS_SWAP = np.array([[0.0, 1.0, 0.0],
+                               [-1.0, 0.0, 0.0],
+                               [0.0, 0.0, 1.0]])
+
+
+def rotation_matrix(yaw_psi, pitch_theta, roll_phi):
+    """Return Rz(yaw) @ Ry(pitch) @ Rx(roll) for angles given in degrees"""
+    phi = roll_phi / 180 * math.pi
+    theta = pitch_theta / 180 * math.pi
+    psi = yaw_psi / 180 * math.pi
+
+    Rx = np.array([[1, 0, 0],
+                   [0, np.cos(phi), -np.sin(phi)],
+                   [0, np.sin(phi), np.cos(phi)]])
+    Ry = np.array([[np.cos(theta), 0, np.sin(theta)],
+                   [0, 1, 0],
+                   [-np.sin(theta), 0, np.cos(theta)]])
+    Rz = np.array([[np.cos(psi), -np.sin(psi), 0],
+                   [np.sin(psi), np.cos(psi), 0],
+                   [0, 0, 1]])
+
+    return Rz @ Ry @ Rx
+
+
+class SensorPose:
+    """Position (meters) and orientation (degrees) of one mounted radar
+
+    The full sensor-to-world matrix, mounting axis swap included, is built
+    once when the pose is created. A pose is not meant to be changed
+    afterwards; create a new one when the configuration changes.
+    """
+
+    __slots__ = ('x', 'y', 'z', 'yaw_psi', 'pitch_theta', 'roll_phi',
+                 'matrix', 'translation', '_matrix_t')
+
+    def __init__(self, x=0.0, y=0.0, z=0.0, yaw_psi=0.0, pitch_theta=0.0, roll_phi=0.0):
+        self.x = float(x)
+        self.y = float(y)
+        self.z = float(z)
+        self.yaw_psi = float(yaw_psi)
+        self.pitch_theta = float(pitch_theta)
+        self.roll_phi = float(roll_phi)
+
+        self.matrix = rotation_matrix(self.yaw_psi, self.pitch_theta, self.roll_phi) @ MOUNTING_AXIS_SWAP
+        self.translation = np.array([self.x, self.y, self.z])
+        self._matrix_t = np.ascontiguousarray(self.matrix.T)
+
+    @classmethod
+    def from_config(cls, config):
+        """Create a pose from a sensor config dict (X, Y, Z, yaw_psi, pitch_theta, roll_phi)"""
+        return get_pose(config.get('X', 0.0), config.get('Y', 0.0), config.get('Z', 0.0),
+                        config.get('yaw_psi', 0.0), config.get('pitch_theta', 0.0),
+                        config.get('roll_phi', 0.0))
+
+    def transform(self, points, out=None):
+        """Transform an N x 3 array of sensor (x, y, z) points to world coordinates"""
+        out = np.matmul(points, self._matrix_t, out=out)
+        out += self.translation
+        return out
+
+    def transform_xyz(self, x, y, z):
+        """Transform separate x, y, z columns and return an N x 3 world array"""
+        return self.transform(np.column_stack((x, y, z)).astype(np.float64, copy=False))
+
+    def __repr__(self):
+        return (f"SensorPose(x={self.x}, y={self.y}, z={self.z}, yaw_psi={self.yaw_psi}, "
+                f"pitch_theta={self.pitch_theta}, roll_phi={self.roll_phi})")
+
+
+@functools.lru_cache(maxsize=16)
+def get_pose(x, y, z, yaw_psi, pitch_theta, roll_phi):
+    """Return the cached SensorPose for these values, building it on first use"""
+    return SensorPose(x, y, z, yaw_psi, pitch_theta, roll_phi)
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Push-style streaming parser for the mmWave demo output
+Feed it bytes as they arrive from the UART or a file and iterate the
+parsed frames
+"""
+
+import time
+from frame_assembler import FrameAssembler
+from parcer_XY_test import parser_frame, TC_PASS
+from radar_frame import Frame
+
+
+class StreamParser:
+    """Incremental parser: feed() bytes, get complete Frames back
+
+    Partial frames are kept in the FrameAssembler between calls, so each
+    byte is searched for a header once and each complete packet is parsed
+    once, however the input is split. Any number of back-to-back frames in
+    one feed() are handled without slicing the input.
+
+    With reuse_frame=True every frame is parsed into the same Frame object,
+    which is only valid until the next frame is requested (use
+    frame.copy() to keep one). frame.tlvs always points into the receive
+    buffer and is only valid until the next frame is requested.
+    """
+
+    def __init__(self, capacity=65536, max_frame_bytes=None, reuse_frame=False):
+        self.assembler = FrameAssembler(capacity, max_frame_bytes)
+        self.reuse_frame = reuse_frame
+        self._frame = Frame()
+        self.read_time = 0.0  # seconds the assembler took to cut the last packet out of the input
+        self.parse_time = 0.0  # seconds parser_frame() took for the last packet
+
+        # Counters
+        self.frames_parsed = 0
+        self.frames_failed = 0
+
+    @property
+    def bytes_received(self):
+        return self.assembler.bytes_received
+
+    @property
+    def bytes_skipped(self):
+        return self.assembler.bytes_skipped
+
+    @property
+    def resync_count(self):
+        return self.assembler.resync_count
+
+    def reset(self):
+        """Drop any partial frame, e.g. after the sensor was restarted"""
+        self.assembler.reset()
+
+    def feed(self, data):
+        """Add bytes and yield every Frame they complete
+
+        This is a generator, so it must be iterated for the data to be
+        consumed. Packets that fail to parse, whatever the error, are
+        counted in frames_failed and skipped. read_time and parse_time
+        only cover the work done for the frame just yielded, not the time
+        the caller spent between frames.
+        """
+        started = time.perf_counter()
+        for packet in self.assembler.feed(data):
+            parse_started = time.perf_counter()
+            self.read_time = parse_started - started
+            frame = self._frame if self.reuse_frame else Frame()
+            try:
+                result, frame = parser_frame(packet, len(packet), frame)
+            except Exception:
+                result = None  # a damaged packet must not stop the stream
+            self.parse_time = time.perf_counter() - parse_started
+            if result == TC_PASS:
+                self.frames_parsed += 1
+                yield frame
+            else:
+                self.frames_failed += 1
+            started = time.perf_counter()
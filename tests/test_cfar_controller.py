@@ -0,0 +1,61 @@
+import os
+import time
+from cfar_controller import CfarController
+from radar_cfg import RadarProfile
+from radar_cli import PROMPT
+
+PROFILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                       'xwr18xx_profile_2023_07_26T08_46_17_507.cfg')
+
+
+class SlowCli:
+    """CLI port that takes reply_delay seconds to acknowledge a command"""
+
+    name = '/dev/ttyACM0'
+
+    def __init__(self, reply_delay):
+        self.reply_delay = reply_delay
+        self.commands = []
+        self._ready = 0.0
+
+    @property
+    def in_waiting(self):
+        return 0
+
+    def write(self, data):
+        self.commands.append(data.decode().strip())
+        self._ready = time.monotonic() + self.reply_delay
+
+    def read(self, size):
+        time.sleep(max(self._ready - time.monotonic(), 0))
+        return b'Done\r\n' + PROMPT
+
+
+def test_changes_are_sent_without_stalling_the_caller(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # the controller drops radar_cli's stored hash
+    cli = SlowCli(0.3)
+    cfar = CfarController(cli, RadarProfile.from_file(PROFILE), target_points=50, window=5)
+
+    started = time.monotonic()
+    for frame_number in range(1, 11):
+        cfar.update(100, frame_number)
+    assert time.monotonic() - started < 0.1
+    # One change is in flight; the frames meanwhile do not start another
+    assert cfar.sending and cli.commands == ['cfarCfg -1 0 2 8 4 3 0 16 1']
+
+    cfar.restore()
+    assert [adjustment.new_offset for adjustment in cfar.adjustments] == [1.0, 0.0]
+    assert cli.commands[-1] == 'cfarCfg -1 0 2 8 4 3 0 15 1'
+    assert cfar.offset_db == 0.0
+
+
+def test_lowers_the_threshold_when_the_scene_empties(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    cfar = CfarController(SlowCli(0), RadarProfile.from_file(PROFILE), target_points=50, window=5, background=False)
+    for _ in range(10):
+        cfar.update(100)
+    assert cfar.offset_db == 2.0
+    for _ in range(5):
+        cfar.update(10)
+    assert cfar.offset_db == 1.0
+    assert cfar.threshold(0) == 16.0
@@ -0,0 +1,41 @@
+import numpy as np
+from dat_capture import DatCapture
+from mmw_frame_generator import make_stream
+from radar_frame import FRAME_POINT_DTYPE
+from stream_parser import StreamParser
+
+
+def write_capture(tmp_path, data):
+    path = tmp_path / 'capture.dat'
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_points_match_the_stream_parser(tmp_path):
+    # 13 garbage bytes put the frames at every alignment to the 16-byte point records
+    data = make_stream(60, lambda n: n % 11, garbage_bytes=13)
+    expected = [frame.copy() for frame in StreamParser().feed(data)]
+    with DatCapture(write_capture(tmp_path, data)) as capture:
+        assert len(capture) == 60
+        assert capture.bytes_skipped == 60 * 13
+        points = capture.points()
+
+    assert len(points) == sum(frame.num_points for frame in expected)
+    np.testing.assert_array_equal(points['frame'], np.repeat(np.arange(60), [frame.num_points for frame in expected]))
+    for name in FRAME_POINT_DTYPE.names:
+        np.testing.assert_array_equal(points[name], np.concatenate([frame.points[name] for frame in expected]))
+
+
+def test_chunks_join_to_the_whole_capture(tmp_path):
+    data = make_stream(40, 7, garbage_bytes=5)
+    with DatCapture(write_capture(tmp_path, data)) as capture:
+        whole = capture.points()
+        chunks = list(capture.iter_chunks(max_points=30))
+    assert all(len(chunk) <= 30 for chunk in chunks)
+    np.testing.assert_array_equal(np.concatenate(chunks), whole)
+
+
+def test_empty_capture(tmp_path):
+    with DatCapture(write_capture(tmp_path, b'')) as capture:
+        assert len(capture) == 0
+        assert len(capture.points()) == 0
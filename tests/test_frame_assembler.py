@@ -0,0 +1,43 @@
+from frame_assembler import FrameAssembler
+from mmw_frame_generator import make_frame, make_stream, split_chunks
+
+
+def assemble(assembler, data, **chunk_options):
+    return [bytes(packet) for chunk in split_chunks(data, **chunk_options) for packet in assembler.feed(chunk)]
+
+
+def test_packets_come_out_whole_across_compactions():
+    frames = [make_frame(n % 9, n) for n in range(1, 41)]
+    # A small buffer forces the in-flight bytes to be moved to the front many times
+    assembler = FrameAssembler(capacity=4096)
+    packets = assemble(assembler, b''.join(frames), max_size=700, seed=1)
+    assert packets == frames
+    assert assembler.frames_assembled == 40
+    assert assembler.pending == 0
+    assert assembler.bytes_skipped == 0
+
+
+def test_garbage_before_the_header_is_skipped():
+    frame = make_frame(3, 1)
+    assembler = FrameAssembler()
+    packets = assemble(assembler, b'\x55' * 100 + frame)
+    assert packets == [frame]
+    assert assembler.bytes_skipped == 100
+    assert assembler.resync_count == 1
+
+
+def test_oversized_length_is_treated_as_noise():
+    frames = make_stream(2, 4)
+    bogus = bytearray(frames[:len(frames) // 2])
+    bogus[12:16] = (10**6).to_bytes(4, 'little')
+    assembler = FrameAssembler()
+    packets = assemble(assembler, bytes(bogus) + frames)
+    assert packets == [frames[:len(frames) // 2], frames[len(frames) // 2:]]
+
+
+def test_partial_packet_waits_for_the_rest():
+    frame = make_frame(5, 1)
+    assembler = FrameAssembler()
+    assert list(assembler.feed(frame[:-1])) == []
+    assert assembler.pending == len(frame) - 1
+    assert [bytes(packet) for packet in assembler.feed(frame[-1:])] == [frame]
@@ -0,0 +1,99 @@
+import struct
+import numpy as np
+from frame_datagram import HEADER, POINT_DTYPE, FrameDecoder, pack_frame, unpack_datagram
+
+# Offsets of num_points and first_point in HEADER
+NUM_POINTS_OFFSET = 20
+FIRST_POINT_OFFSET = 26
+
+
+def make_records(num_points):
+    records = np.zeros(num_points, dtype=POINT_DTYPE)
+    for i, name in enumerate(POINT_DTYPE.names):
+        records[name] = np.arange(num_points) + i / 10
+    return records
+
+
+def test_single_datagram_round_trip():
+    records = make_records(5)
+    (datagram,) = pack_frame(3, 42, 1.5, records)
+    header, points = unpack_datagram(datagram)
+    assert (header.sensor_id, header.frame_number, header.timestamp, header.num_points) == (3, 42, 1.5, 5)
+    np.testing.assert_array_equal(points, records)
+
+
+def test_empty_frame_still_sends_a_datagram():
+    (datagram,) = pack_frame(1, 7, 0.0, make_records(0))
+    header, points = FrameDecoder().feed(datagram)
+    assert header.num_points == 0 and len(points) == 0
+
+
+def test_fragments_reassemble_in_any_order():
+    records = make_records(100)
+    datagrams = pack_frame(1, 9, 2.0, records, max_datagram_bytes=400)
+    assert len(datagrams) > 3
+    decoder = FrameDecoder()
+    results = [decoder.feed(datagram) for datagram in reversed(datagrams)]
+    assert results[:-1] == [None] * (len(datagrams) - 1)
+    header, points = results[-1]
+    assert header.frame_number == 9 and header.fragment_index == 0
+    np.testing.assert_array_equal(points, records)
+    assert decoder.frames_completed == 1
+
+
+def test_fragment_past_the_frame_is_invalid():
+    datagrams = pack_frame(1, 9, 2.0, make_records(100), max_datagram_bytes=400)
+    damaged = bytearray(datagrams[1])
+    struct.pack_into('<H', damaged, FIRST_POINT_OFFSET, 95)
+    decoder = FrameDecoder()
+    assert decoder.feed(bytes(damaged)) is None
+    assert decoder.datagrams_invalid == 1
+
+
+def test_fragment_disagreeing_with_its_frame_is_invalid():
+    first = pack_frame(1, 9, 2.0, make_records(100), max_datagram_bytes=400)
+    other = pack_frame(1, 9, 2.0, make_records(90), max_datagram_bytes=400)
+    decoder = FrameDecoder()
+    assert decoder.feed(first[0]) is None
+    assert decoder.feed(other[1]) is None
+    assert decoder.datagrams_invalid == 1
+
+
+def test_single_datagram_with_wrong_point_count_is_invalid():
+    damaged = bytearray(pack_frame(1, 1, 0.0, make_records(10))[0])
+    struct.pack_into('<H', damaged, NUM_POINTS_OFFSET, 4)
+    decoder = FrameDecoder()
+    assert decoder.feed(bytes(damaged)) is None
+    assert decoder.datagrams_invalid == 1
+
+
+def test_garbage_datagrams_are_counted():
+    decoder = FrameDecoder()
+    for datagram in (b'', b'MMWF', b'x' * HEADER.size, pack_frame(1, 1, 0.0, make_records(3))[0][:10]):
+        assert decoder.feed(datagram) is None
+    assert decoder.datagrams_invalid == 4
+
+
+def test_fragment_at_the_wrong_offset_is_invalid():
+    datagrams = pack_frame(1, 9, 2.0, make_records(100), max_datagram_bytes=400)
+    damaged = bytearray(datagrams[1])
+    struct.pack_into('<H', damaged, FIRST_POINT_OFFSET, 3)  # overlaps fragment 0
+    decoder = FrameDecoder()
+    results = [decoder.feed(datagram) for datagram in [datagrams[0], bytes(damaged)] + datagrams[2:]]
+    assert results == [None] * len(datagrams)
+    assert decoder.datagrams_invalid == 1
+    assert decoder.frames_completed == 0
+
+
+def test_fragments_leaving_a_gap_are_given_up():
+    # Fragments of 10 points, but the middle one claims 5 points at its own offset
+    records = make_records(25)
+    max_datagram_bytes = HEADER.size + 10 * POINT_DTYPE.itemsize
+    datagrams = [bytearray(datagram) for datagram in pack_frame(1, 4, 0.0, records, max_datagram_bytes)]
+    assert len(datagrams) == 3
+    datagrams[1] = datagrams[1][:HEADER.size + 5 * POINT_DTYPE.itemsize]
+    struct.pack_into('<H', datagrams[1], FIRST_POINT_OFFSET, 5)
+    decoder = FrameDecoder()
+    assert [decoder.feed(bytes(datagram)) for datagram in datagrams] == [None] * 3
+    assert decoder.frames_completed == 0
+    assert decoder.frames_incomplete == 1
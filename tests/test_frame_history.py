@@ -0,0 +1,76 @@
+import numpy as np
+from frame_history import FrameHistory
+
+RECORDS = np.zeros(0)
+
+
+def filled(capacity, count):
+    """History that saw frames 0..count-1 with timestamp == frame number"""
+    history = FrameHistory(capacity)
+    for n in range(count):
+        history.append(n, float(n), RECORDS)
+    return history
+
+
+def numbers(entries):
+    return [entry.frame_number for entry in entries]
+
+
+def test_between_before_the_ring_wraps():
+    history = filled(8, 5)
+    assert numbers(history.between()) == [0, 1, 2, 3, 4]
+    assert numbers(history.between(since=1, until=3)) == [2, 3]
+
+
+def test_between_across_the_wrap():
+    history = filled(8, 20)  # frames 12..19 kept, slot 4 holds the oldest
+    assert len(history) == 8
+    assert numbers(history.between()) == list(range(12, 20))
+    assert numbers(history.between(since=13.5)) == [14, 15, 16, 17, 18, 19]
+    assert numbers(history.between(since=14, until=17)) == [15, 16, 17]
+    assert numbers(history.between(until=15.5)) == [12, 13, 14, 15]
+    assert numbers(history.between(since=100)) == []
+    assert numbers(history.between(since=0)) == list(range(12, 20))
+
+
+def test_every_split_point_of_the_ring():
+    for count in range(1, 30):
+        history = filled(8, count)
+        oldest = max(count - 8, 0)
+        for since in range(-1, count + 1):
+            expected = [n for n in range(oldest, count) if n > since]
+            assert numbers(history.between(since=since)) == expected, (count, since)
+
+
+def test_after_frame_and_limit():
+    history = filled(8, 20)
+    assert numbers(history.between(after_frame=16)) == [17, 18, 19]
+    assert numbers(history.between(after_frame=3)) == list(range(12, 20))  # no longer stored
+    page = history.between(limit=3)
+    assert numbers(page) == [12, 13, 14]
+    assert numbers(history.between(after_frame=page[-1].frame_number, limit=3)) == [15, 16, 17]
+
+
+def test_paging_through_frames_that_share_a_timestamp():
+    history = FrameHistory(32)
+    for n, timestamp in enumerate([1.0, 2.0, 2.0, 2.0, 2.0, 1.5, 3.0, 3.0]):
+        history.append(n, timestamp, RECORDS)
+    pages = [history.between(since=1.0, limit=3)]
+    while len(pages[-1]) == 3:
+        pages.append(history.between(since=1.0, after_frame=pages[-1][-1].frame_number, limit=3))
+    assert [numbers(page) for page in pages] == [[1, 2, 3], [4, 5, 6], [7]]
+
+
+def test_clock_stepping_back_keeps_the_index_sorted():
+    history = FrameHistory(4)
+    for n, timestamp in enumerate([10.0, 11.0, 9.0, 12.0, 13.0]):
+        history.append(n, timestamp, RECORDS)
+    assert numbers(history.between(since=10.5)) == [1, 2, 3, 4]
+
+
+def test_find_and_latest():
+    history = filled(8, 20)
+    assert history.find(19).timestamp == 19.0
+    assert history.find(5) is None
+    assert numbers(history.latest(3)) == [17, 18, 19]
+    assert history.oldest().frame_number == 12
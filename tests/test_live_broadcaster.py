@@ -0,0 +1,43 @@
+import json
+import time
+from live_broadcaster import LiveBroadcaster, format_event
+
+
+def test_format_event():
+    assert format_event({'frame': 1}, 'frame') == 'event: frame\ndata: {"frame": 1}\n\n'
+    assert format_event('a\nb') == 'data: a\ndata: b\n\n'
+
+
+def test_every_subscriber_gets_every_message():
+    broadcaster = LiveBroadcaster()
+    first, second = broadcaster.subscribe('a'), broadcaster.subscribe('b')
+    for frame in range(3):
+        broadcaster.publish({'frame': frame})
+    for subscriber in (first, second):
+        messages = [subscriber.get(0) for _ in range(4)]
+        assert [json.loads(message[len('data: '):]) for message in messages[:3]] == [{'frame': n} for n in range(3)]
+        assert messages[3] is None
+
+
+def test_slow_subscriber_loses_its_oldest_messages_only():
+    broadcaster = LiveBroadcaster(maxsize=4)
+    slow, fast = broadcaster.subscribe('slow'), broadcaster.subscribe('fast')
+    received = []
+    for frame in range(10):
+        broadcaster.publish(frame)
+        received.append(fast.get(0))
+    assert received == [format_event(frame) for frame in range(10)] and fast.dropped == 0
+    assert slow.dropped == 6
+    assert [slow.get(0) for _ in range(4)] == [format_event(frame) for frame in range(6, 10)]
+
+
+def test_stalled_subscriber_is_disconnected():
+    broadcaster = LiveBroadcaster(stale_timeout=0.01)
+    stream = broadcaster.event_stream('stalled', keepalive=0)
+    assert next(stream) == ': connected\n\n'
+    broadcaster.publish(1)
+    time.sleep(0.02)  # the client reads nothing while the message waits
+    broadcaster.publish(2)
+    assert broadcaster.disconnected == 1
+    assert broadcaster.num_subscribers == 0
+    assert list(stream) == []
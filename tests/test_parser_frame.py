@@ -0,0 +1,42 @@
+import struct
+import numpy as np
+from mmw_frame_generator import make_frame, make_points, make_stream
+from parcer_XY_test import parser_frame, TC_PASS, MMWDEMO_OUTPUT_MSG_RANGE_PROFILE
+from radar_frame import Frame
+from stream_parser import StreamParser
+
+# Offset of numDetectedObj in a packet: magic word, then version, totalPacketLen, platform, frameNumber, timeCpuCycles
+NUM_DET_OBJ_OFFSET = 8 + 5 * 4
+
+
+def test_frame_object_is_reused():
+    rng = np.random.default_rng(8)
+    frame = Frame()
+    for frame_number, num_points in ((1, 9), (2, 3)):
+        points = make_points(num_points, rng)
+        packet = make_frame(num_points, frame_number, points=points)
+        result, parsed = parser_frame(packet, len(packet), frame)
+        assert result == TC_PASS and parsed is frame
+        assert frame.frame_number == frame_number and frame.num_points == num_points
+        np.testing.assert_array_equal(frame.points['y'], points['y'])
+
+
+def test_impossible_point_count_is_rejected():
+    data = bytearray(make_stream(3, 5))
+    frame_bytes = len(data) // 3
+    struct.pack_into('<I', data, frame_bytes + NUM_DET_OBJ_OFFSET, 0x7FFFFFFF)
+    stream = StreamParser()
+    frames = list(stream.feed(bytes(data)))
+    assert [frame.frame_number for frame in frames] == [1, 3]
+    assert stream.frames_failed == 1
+
+
+def test_cached_tlvs_do_not_pin_the_buffer():
+    buffer = bytearray(make_frame(6, 1))
+    frame = Frame()
+    result, frame = parser_frame(buffer, len(buffer), frame)
+    assert result == TC_PASS
+    assert frame.tlvs.decode(MMWDEMO_OUTPUT_MSG_RANGE_PROFILE) is not None
+    # Grows and trims the buffer the way a caller consuming a stream does
+    buffer.extend(make_frame(2, 2))
+    del buffer[:16]
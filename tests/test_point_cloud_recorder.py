@@ -0,0 +1,52 @@
+import glob
+import os
+import numpy as np
+from frame_datagram import POINT_DTYPE
+from point_cloud_recorder import COLUMNS, PointCloudArchive, PointCloudRecorder
+
+START = 1.7e9
+
+
+def make_records(frame_number):
+    records = np.zeros(frame_number % 6, dtype=POINT_DTYPE)
+    for i, name in enumerate(COLUMNS):
+        records[name] = frame_number + i / 10 + np.arange(len(records))
+    return records
+
+
+def record(directory, num_frames, **options):
+    with PointCloudRecorder(str(directory), **options) as recorder:
+        for n in range(num_frames):
+            recorder.write(n, START + n * 0.1, make_records(n))
+    return recorder
+
+
+def test_query_across_segments(tmp_path):
+    recorder = record(tmp_path, 100, max_segment_bytes=2000, index_every=4)
+    assert recorder.segments > 3
+    archive = PointCloudArchive(str(tmp_path))
+    try:
+        points = archive.query()
+        assert len(points) == sum(n % 6 for n in range(100))
+        for name in COLUMNS:
+            np.testing.assert_array_equal(points[name], np.concatenate([make_records(n)[name] for n in range(100)]))
+
+        # since is inclusive, until exclusive
+        frames = archive.frames(START + 2.5, START + 7.0)
+        assert [frame[0] for frame in frames] == list(range(25, 70))
+        points = archive.query(START + 2.5, START + 7.0, columns=('x',))
+        assert sorted(set(points['frame_number'])) == [n for n in range(25, 70) if n % 6]
+        assert not points['y'].any()
+    finally:
+        archive.close()
+
+
+def test_partly_written_frame_is_ignored(tmp_path):
+    record(tmp_path, 10)
+    (path,) = glob.glob(str(tmp_path / '*.pts'))
+    os.truncate(path, os.path.getsize(path) - 5)  # a crash in the middle of frame 9
+    archive = PointCloudArchive(str(tmp_path))
+    try:
+        assert [frame[0] for frame in archive.frames()] == list(range(9))
+    finally:
+        archive.close()
@@ -0,0 +1,43 @@
+import time
+from mmw_frame_generator import make_stream
+from radar_acquisition import run_acquisition
+from stream_parser import StreamParser
+
+
+class OneReadPort:
+    """Delivers all its bytes in one read, then reports finished"""
+
+    def __init__(self, data):
+        self.data = data
+        self.finished = False
+
+    def wait(self, timeout):
+        pass
+
+    def inWaiting(self):
+        return len(self.data)
+
+    def read(self, size):
+        data, self.data = self.data[:size], self.data[size:]
+        self.finished = not self.data
+        return data
+
+
+def test_callback_errors_are_not_parse_failures():
+    def on_frame(frame):
+        if frame.frame_number == 2:
+            raise RuntimeError("output failed")
+
+    stream = StreamParser()
+    stats = run_acquisition(OneReadPort(make_stream(4, 3)), on_frame, stream=stream)
+    assert stats.frames == 4
+    assert stats.callback_errors == 1
+    assert stream.frames_failed == 0
+
+
+def test_frames_of_one_read_are_timed_from_their_own_start():
+    stats = run_acquisition(OneReadPort(make_stream(5, 3)), lambda frame: time.sleep(0.02))
+    assert stats.frames == 5
+    # Waiting for the callbacks of the frames before does not count as parsing
+    assert stats.parse_latency_max < 0.015
+    assert stats.latency_max < 0.06
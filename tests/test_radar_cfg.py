@@ -0,0 +1,60 @@
+import os
+import pytest
+from mmw_frame_generator import make_frame
+from radar_cfg import RadarProfile
+from stream_parser import StreamParser
+
+PROFILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                       'xwr18xx_profile_2023_07_26T08_46_17_507.cfg')
+
+
+def edited_profile(tmp_path, command, replacement):
+    """The shipped profile with the line starting with command replaced"""
+    with open(PROFILE) as f:
+        lines = [replacement if line.startswith(command + ' ') else line.rstrip('\n') for line in f]
+    path = tmp_path / 'edited.cfg'
+    path.write_text('\n'.join(lines) + '\n')
+    return RadarProfile.from_file(str(path))
+
+
+def test_figures_of_the_shipped_profile():
+    profile = RadarProfile.from_file(PROFILE)
+    # The Visualizer's header of the file: 0.044 m range and 0.13 m/s velocity resolution, 1 m/s max velocity
+    assert profile.range_resolution == pytest.approx(0.044, abs=0.001)
+    assert profile.velocity_resolution == pytest.approx(0.13, abs=0.01)
+    assert profile.max_velocity == pytest.approx(1.0, abs=0.03)
+    assert (profile.chirps_per_frame, profile.num_range_bins, profile.frame_period) == (48, 256, 0.1)
+    assert profile.cfar_threshold(0) == 15.0
+
+
+def test_frame_bytes_and_uart_budget():
+    profile = RadarProfile.from_file(PROFILE)
+    # Header, TLVs 2 (range profile), 6 (stats) and 9 (temperature), padded to 32 bytes
+    assert profile.frame_bytes(0) == 640
+    assert profile.frame_bytes(10) == 640 + 32 * 7
+    budget = profile.uart_budget()
+    assert budget == 9216
+    points = profile.max_points()
+    assert profile.frame_bytes(points) <= budget < profile.frame_bytes(points + 1)
+    assert any('more than 428 points' in problem for problem in profile.check(max_points=500))
+    assert profile.check(max_points=400) == []
+
+
+def test_buffers_hold_the_worst_case_frame():
+    options = RadarProfile.from_file(PROFILE).stream_parser_options()
+    frame = make_frame(500, 1)
+    assert len(frame) <= options['max_frame_bytes'] <= options['capacity'] // 4
+    (parsed,) = StreamParser(**options).feed(frame)
+    assert parsed.num_points == 500
+
+
+def test_too_short_frame_period_is_a_problem(tmp_path):
+    profile = edited_profile(tmp_path, 'frameCfg', 'frameCfg 0 2 16 0 5 1 0')
+    assert profile.active_frame_time_ms > 5
+    problems = profile.check()
+    assert any('longer than the 5.0 ms frame period' in problem for problem in problems)
+
+
+def test_missing_command_is_reported(tmp_path):
+    with pytest.raises(ValueError, match='frameCfg'):
+        edited_profile(tmp_path, 'frameCfg', '% no frameCfg')
@@ -0,0 +1,93 @@
+import json
+import os
+from radar_cli import PROMPT, configure_radar, forget_config, load_state, update_state
+
+
+class FakeCli:
+    """CLI port that answers Done to everything except the commands in fail"""
+
+    name = '/dev/ttyACM0'
+
+    def __init__(self, fail=()):
+        self.fail = set(fail)
+        self.commands = []
+        self._reply = b''
+
+    @property
+    def in_waiting(self):
+        return len(self._reply)
+
+    def write(self, data):
+        command = data.decode().strip()
+        self.commands.append(command)
+        self._reply += (b'Error -1\r\n' if command in self.fail else b'Done\r\n') + PROMPT
+
+    def read(self, size):
+        data, self._reply = self._reply[:size], self._reply[size:]
+        return data
+
+
+def write_cfg(path, frame_period):
+    path.write_text("% profile\nsensorStop\nflushCfg\nchannelCfg 15 7 0\n"
+                    f"frameCfg 0 2 16 0 {frame_period} 1 0\nsensorStart\n")
+    return str(path)
+
+
+def test_unchanged_config_only_restarts_the_sensor(tmp_path):
+    state_file = str(tmp_path / 'state.json')
+    cfg = write_cfg(tmp_path / 'a.cfg', 100)
+
+    cli = FakeCli()
+    ok, results, skipped = configure_radar(cli, cfg, state_file=state_file)
+    assert ok and not skipped and len(results) == 5
+
+    cli = FakeCli()
+    ok, results, skipped = configure_radar(cli, cfg, state_file=state_file)
+    assert ok and skipped
+    assert cli.commands == ['sensorStop', 'sensorStart 0']
+
+    cli = FakeCli()
+    ok, _, skipped = configure_radar(cli, write_cfg(tmp_path / 'a.cfg', 50), state_file=state_file)
+    assert ok and not skipped and 'frameCfg 0 2 16 0 50 1 0' in cli.commands
+
+
+def test_failed_restart_uploads_everything(tmp_path):
+    state_file = str(tmp_path / 'state.json')
+    cfg = write_cfg(tmp_path / 'a.cfg', 100)
+    configure_radar(FakeCli(), cfg, state_file=state_file)
+
+    # Power cycled: the radar has no configuration to start with
+    cli = FakeCli(fail=['sensorStart 0'])
+    ok, _, skipped = configure_radar(cli, cfg, state_file=state_file)
+    assert ok and not skipped
+    assert cli.commands[:2] == ['sensorStop', 'sensorStart 0'] and 'flushCfg' in cli.commands
+
+
+def test_failed_upload_forgets_the_config(tmp_path):
+    state_file = str(tmp_path / 'state.json')
+    cfg = write_cfg(tmp_path / 'a.cfg', 100)
+    configure_radar(FakeCli(), cfg, state_file=state_file)
+    ok, _, _ = configure_radar(FakeCli(fail=['channelCfg 15 7 0']), cfg, force=True, state_file=state_file)
+    assert not ok
+    assert load_state(state_file) == {}
+
+
+def test_update_state_keeps_the_other_ports(tmp_path):
+    state_file = str(tmp_path / 'state.json')
+    update_state('/dev/ttyACM0', {'hash': 'a'}, state_file)
+    # Another process saves its port after this one read the file
+    update_state('/dev/ttyACM2', {'hash': 'b'}, state_file)
+    update_state('/dev/ttyACM0', {'hash': 'c'}, state_file)
+    assert load_state(state_file) == {'/dev/ttyACM0': {'hash': 'c'}, '/dev/ttyACM2': {'hash': 'b'}}
+    assert os.listdir(tmp_path) == ['state.json']
+
+
+def test_forget_config_removes_only_its_port(tmp_path):
+    state_file = tmp_path / 'state.json'
+    state_file.write_text(json.dumps({'/dev/ttyACM0': {'hash': 'a'}, '/dev/ttyACM2': {'hash': 'b'}}))
+
+    class Port:
+        name = '/dev/ttyACM0'
+
+    forget_config(Port(), str(state_file))
+    assert json.loads(state_file.read_text()) == {'/dev/ttyACM2': {'hash': 'b'}}
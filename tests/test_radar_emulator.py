@@ -0,0 +1,26 @@
+from radar_emulator import RadarEmulator
+
+
+def test_malformed_commands_get_an_error_reply():
+    emulator = RadarEmulator()
+    try:
+        for line in ('frameCfg 0 1 16 0', 'frameCfg 0 1 16 0 fast 1 0', 'frameCfg 0 1 16 0 0 1 0',
+                     'cfarCfg -1 0 2 8 4 3 0 x 0', 'cfarCfg -1 0 2'):
+            assert emulator.handle_command(line) == b'Error -1\r\n'
+        assert emulator.frame_period == 0.1
+        assert emulator.cfar_threshold is None
+        assert emulator.handle_command('frameCfg 0 1 16 0 50 1 0') == b'Done\r\n'
+        assert emulator.frame_period == 0.05
+    finally:
+        emulator.stop()
+
+
+def test_cfar_threshold_scales_the_points():
+    emulator = RadarEmulator(num_points=20)
+    try:
+        assert emulator.handle_command('cfarCfg -1 0 2 8 4 3 0 15 1') == b'Done\r\n'
+        assert emulator.detected_points() == 20
+        emulator.handle_command('cfarCfg -1 0 2 8 4 3 0 25 1')
+        assert emulator.detected_points() == 2
+    finally:
+        emulator.stop()
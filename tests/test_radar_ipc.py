@@ -0,0 +1,75 @@
+import threading
+import time
+import numpy as np
+from frame_datagram import POINT_DTYPE
+from radar_ipc import IpcReceiver, IpcSender
+
+
+def make_records(num_points, frame_number):
+    records = np.zeros(num_points, dtype=POINT_DTYPE)
+    records['x'] = np.arange(num_points)
+    records['y'] = frame_number
+    return records
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_frames_and_stats_arrive_intact(tmp_path):
+    path = str(tmp_path / 'ipc.sock')
+    frames, stats = [], []
+    receiver = IpcReceiver(path, lambda *frame: frames.append((frame[:3], frame[3].copy())), stats.append)
+    receiver.start()
+    sender = IpcSender(path, sensor_id=2)
+    try:
+        for frame_number in range(1, 21):
+            assert sender.send_frame(frame_number, frame_number / 10, make_records(frame_number % 5, frame_number))
+        sender.send_stats({'frames': 20})
+        sender.close()
+        assert wait_until(lambda: receiver.stats_received == 1)
+    finally:
+        receiver.stop()
+
+    assert [header for header, _ in frames] == [(2, n, n / 10) for n in range(1, 21)]
+    for (_, frame_number, _), records in frames:
+        np.testing.assert_array_equal(records, make_records(frame_number % 5, frame_number))
+    assert stats[0]['frames'] == 20 and stats[0]['ipc_frames_sent'] == 20 and stats[0]['ipc_frames_dropped'] == 0
+
+
+def test_slow_receiver_costs_frames_not_the_stream(tmp_path):
+    path = str(tmp_path / 'ipc.sock')
+    release = threading.Event()
+    frame_numbers = []
+
+    def on_frame(sensor_id, frame_number, timestamp, records):
+        release.wait(5)
+        assert (records['y'] == frame_number).all()
+        frame_numbers.append(frame_number)
+
+    receiver = IpcReceiver(path, on_frame)
+    receiver.start()
+    sender = IpcSender(path, max_pending_bytes=64 * 1024)
+    try:
+        started = time.monotonic()
+        for frame_number in range(1, 301):
+            sender.send_frame(frame_number, 0.0, make_records(200, frame_number))
+        assert time.monotonic() - started < 2.0  # never waited for the receiver
+        assert sender.frames_dropped > 0
+        release.set()
+        sender.close()
+        assert wait_until(lambda: receiver.frames_received == sender.frames_sent)
+    finally:
+        receiver.stop()
+    assert sender.frames_sent + sender.frames_dropped == 300
+    assert frame_numbers == sorted(frame_numbers)
+
+
+def test_sender_without_receiver_drops_frames(tmp_path):
+    sender = IpcSender(str(tmp_path / 'missing.sock'))
+    assert not sender.send_frame(1, 0.0, make_records(3, 1))
+    assert not sender.connected and sender.frames_dropped == 1
+    sender.close()
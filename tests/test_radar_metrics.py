@@ -0,0 +1,47 @@
+import math
+from radar_metrics import (EMIT, PARSE, FrameNumberTracker, Histogram, MetricsWriter, RadarMetrics,
+                           write_acquisition_metrics)
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram((0.001, 0.01, 0.1))
+    for value in (0.0005, 0.001, 0.005, 0.05, 2.0):
+        histogram.observe(value)
+    assert histogram.cumulative() == [(0.001, 2), (0.01, 3), (0.1, 4), (math.inf, 5)]
+    assert histogram.count == 5 and math.isclose(histogram.sum, 2.0565)
+    assert Histogram.from_dict(histogram.to_dict()).cumulative() == histogram.cumulative()
+
+
+def test_frame_number_gaps_and_restarts():
+    tracker = FrameNumberTracker()
+    for frame_number in (1, 2, 5, 6, 1, 2, 4):
+        tracker.update(frame_number)
+    assert (tracker.dropped, tracker.restarts) == (3, 1)
+
+
+def test_exposition_of_the_ipc_counters():
+    metrics = RadarMetrics()
+    for frame_number in (1, 2, 4):
+        metrics.frame(frame_number)
+        metrics.observe(PARSE, 0.0003)
+    metrics.observe(EMIT, 0.02)
+    stats = dict(metrics.snapshot(), frames=3, queues={'packets': {'depth': 1, 'maxsize': 8, 'dropped': 2}})
+
+    writer = MetricsWriter()
+    write_acquisition_metrics(writer, stats)
+    lines = writer.text().splitlines()
+    assert 'mmwave_frames_total 3' in lines
+    assert 'mmwave_frames_dropped_total 1' in lines
+    assert 'mmwave_queue_dropped_total{queue="packets"} 2' in lines
+    assert 'mmwave_stage_latency_seconds_bucket{stage="parse",le="0.0005"} 3' in lines
+    assert 'mmwave_stage_latency_seconds_count{stage="emit"} 1' in lines
+    # HELP and TYPE once per metric, before its first sample
+    assert lines.count('# TYPE mmwave_stage_latency_seconds histogram') == 1
+    assert lines.index('# TYPE mmwave_stage_latency_seconds histogram') < lines.index(
+        'mmwave_stage_latency_seconds_count{stage="emit"} 1')
+
+
+def test_label_values_are_escaped():
+    writer = MetricsWriter()
+    writer.gauge('queue_depth', "Items", 1, {'queue': 'a"b\\c'})
+    assert 'mmwave_queue_depth{queue="a\\"b\\\\c"} 1' in writer.text().splitlines()
@@ -0,0 +1,65 @@
+import threading
+from mmw_frame_generator import make_stream
+from radar_pipeline import BLOCK, DROP_OLDEST, RadarPipeline, StageQueue
+
+
+class OneReadPort:
+    """Delivers all its bytes in one read, then reports finished"""
+
+    def __init__(self, data):
+        self.data = data
+        self.finished = False
+
+    def wait(self, timeout):
+        pass
+
+    def inWaiting(self):
+        return len(self.data)
+
+    def read(self, size):
+        data, self.data = self.data[:size], self.data[size:]
+        self.finished = not self.data
+        return data
+
+
+def test_drop_oldest_keeps_the_newest_items():
+    queue = StageQueue(3, DROP_OLDEST)
+    for item in range(10):
+        queue.put(item)
+    assert queue.dropped == 7 and queue.put_count == 10 and queue.max_depth == 3
+    assert [queue.get(0) for _ in range(4)] == [7, 8, 9, None]
+
+
+def test_every_packet_is_parsed_handled_or_counted_as_dropped():
+    release = threading.Event()
+    frame_numbers = []
+
+    def on_frame(frame):
+        release.wait(1)  # hold the sink until both queues have filled up
+        frame_numbers.append(frame.frame_number)
+
+    pipeline = RadarPipeline(OneReadPort(make_stream(100, 5)), on_frame, queue_size=4, policy=DROP_OLDEST)
+    pipeline.start()
+    pipeline._threads[0].join()
+    release.set()
+    pipeline.join()
+
+    dropped = pipeline.packets.dropped + pipeline.frames.dropped
+    assert pipeline.assembler.frames_assembled == 100
+    assert dropped > 0
+    assert len(frame_numbers) + dropped == 100
+    assert frame_numbers == sorted(frame_numbers) and frame_numbers[-1] == 100
+
+
+def test_block_delivers_every_frame():
+    frame_numbers = []
+    pipeline = RadarPipeline(OneReadPort(make_stream(100, 5)), lambda frame: frame_numbers.append(frame.frame_number),
+                             queue_size=2, policy=BLOCK)
+    pipeline.run()
+    assert frame_numbers == list(range(1, 101))
+    assert pipeline.packets.dropped == pipeline.frames.dropped == 0
+
+
+def test_assembler_takes_the_profile_sizes():
+    pipeline = RadarPipeline(OneReadPort(b''), print, capacity=1 << 18, max_frame_bytes=20000)
+    assert (pipeline.assembler.capacity, pipeline.assembler.max_frame_bytes) == (1 << 18, 20000)
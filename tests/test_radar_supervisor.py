@@ -0,0 +1,29 @@
+from radar_supervisor import XDS110_PID, XDS110_VID, discover_sensors
+
+
+class Port:
+    vid = XDS110_VID
+    pid = XDS110_PID
+
+    def __init__(self, device, serial_number, location):
+        self.device = device
+        self.serial_number = serial_number
+        self.location = location
+
+
+def test_cli_port_is_the_lower_interface(monkeypatch):
+    from serial.tools import list_ports
+    ports = [Port('/dev/ttyACM10', 'R0091', '1-2:1.3'), Port('/dev/ttyACM9', 'R0091', '1-2:1.0'),
+             Port('/dev/ttyACM1', None, '1-3:1.3'), Port('/dev/ttyACM0', None, '1-3:1.0')]
+    monkeypatch.setattr(list_ports, 'comports', lambda: ports)
+    sensors = discover_sensors()
+    assert [(sensor['cli_port'], sensor['data_port']) for sensor in sensors] == [
+        ('/dev/ttyACM0', '/dev/ttyACM1'), ('/dev/ttyACM9', '/dev/ttyACM10')]
+
+
+def test_device_numbers_decide_without_a_location(monkeypatch):
+    from serial.tools import list_ports
+    ports = [Port('/dev/ttyACM10', 'R0091', None), Port('/dev/ttyACM9', 'R0091', None)]
+    monkeypatch.setattr(list_ports, 'comports', lambda: ports)
+    (sensor,) = discover_sensors()
+    assert (sensor['cli_port'], sensor['data_port']) == ('/dev/ttyACM9', '/dev/ttyACM10')
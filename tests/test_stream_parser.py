@@ -0,0 +1,46 @@
+import numpy as np
+from mmw_frame_generator import make_frame, make_points, make_stream, flip_bytes, split_chunks
+from stream_parser import StreamParser
+
+
+def parse_all(data, **chunk_options):
+    stream = StreamParser()
+    frames = [frame for chunk in split_chunks(data, **chunk_options) for frame in stream.feed(chunk)]
+    return stream, frames
+
+
+def test_frames_survive_any_read_split():
+    data = make_stream(50, lambda n: n % 7)
+    for seed in range(5):
+        stream, frames = parse_all(data, max_size=300, seed=seed)
+        assert [frame.frame_number for frame in frames] == list(range(1, 51))
+        assert [frame.num_points for frame in frames] == [n % 7 for n in range(1, 51)]
+        assert stream.frames_failed == 0
+        assert stream.bytes_skipped == 0
+
+
+def test_points_match_generator():
+    rng = np.random.default_rng(3)
+    points = make_points(12, rng)
+    stream = StreamParser()
+    (frame,) = stream.feed(make_frame(12, 5, points=points))
+    np.testing.assert_array_equal(frame.points['x'], points['x'])
+    np.testing.assert_array_equal(frame.points['v'], points['v'])
+
+
+def test_resync_after_garbage():
+    data = make_stream(30, 4, garbage_bytes=37)
+    stream, frames = parse_all(data, max_size=500)
+    assert [frame.frame_number for frame in frames] == list(range(1, 31))
+    assert stream.bytes_skipped == 30 * 37
+    assert stream.resync_count > 0
+
+
+def test_corrupted_stream_never_raises():
+    clean = make_stream(40, 10)
+    for seed in range(50):
+        stream, frames = parse_all(flip_bytes(clean, 10, seed), max_size=1000, seed=seed)
+        # At most 10 frames are damaged; the others still come out, and in order
+        intact = [frame.frame_number for frame in frames if 1 <= frame.frame_number <= 40]
+        assert len(intact) >= 30
+        assert intact == sorted(intact)
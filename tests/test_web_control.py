@@ -0,0 +1,22 @@
+import numpy as np
+import pytest
+
+web_control = pytest.importorskip('web_control')
+from frame_datagram import POINT_DTYPE
+
+
+def test_history_pages_by_frame_number(monkeypatch):
+    history = web_control.FrameHistory(100)
+    for n in range(10):
+        history.append(n, 5.0, np.zeros(2, dtype=POINT_DTYPE))  # one timestamp for all
+    monkeypatch.setattr(web_control, 'frame_history', history)
+    client = web_control.app.test_client()
+
+    frame_numbers = []
+    reply = client.get('/api/history?since=4&limit=4').get_json()
+    while True:
+        frame_numbers += [frame['frame'] for frame in reply['frames']]
+        if reply['complete']:
+            break
+        reply = client.get(f"/api/history?since=4&limit=4&after_frame={reply['next_after_frame']}").get_json()
+    assert frame_numbers == list(range(10))
@@ -7,20 +7,28 @@ Allows remote start/stop and configuration of radar parameters
 import os
 import sys
 import json
+import base64
 import subprocess
 import signal
 import time
+import numpy as np
 from datetime import datetime
-from flask import Flask, render_template, request, jsonify, redirect, url_for
+from flask import Flask, Response, render_template, request, jsonify, redirect, url_for
 import threading
-import queue
+from radar_cfg import load_profile
+from radar_ipc import IpcReceiver, DEFAULT_SOCKET_PATH
+from live_broadcaster import LiveBroadcaster
+from frame_history import FrameHistory
+from radar_metrics import MetricsWriter, write_acquisition_metrics, CONTENT_TYPE as METRICS_CONTENT_TYPE
 
 app = Flask(__name__)
 
 # Global variables
 radar_process = None
-radar_data_queue = queue.Queue()
-recent_detections = []  # Store recent detection data
+live_broadcaster = LiveBroadcaster()  # Pushes radar output to every /api/live client
+frame_history = FrameHistory(3000)  # Last 5 minutes of frames at 10 fps
+ipc_receiver = None
+stats_lock = threading.Lock()  # radar_stats is updated by the IPC thread and read by requests
 radar_stats = {
     'total_frames': 0,
     'objects_detected': 0,
@@ -40,6 +48,8 @@ current_config = {
 }
 
 CONFIG_FILE = 'radar_config.json'
+RADAR_PROFILE_FILE = 'xwr18xx_profile_2023_07_26T08_46_17_507.cfg'
+RADAR_IPC_SOCKET = DEFAULT_SOCKET_PATH
 
 def load_config():
     """Load configuration from JSON file"""
@@ -66,6 +76,53 @@ def is_radar_running():
     global radar_process
     return radar_process is not None and radar_process.poll() is None
 
+def frame_event(sensor_id, frame_number, timestamp, records):
+    """Frame pushed to the dashboard: x, y, z, v of every point as base64 little-endian float32"""
+    xyzv = np.empty((len(records), 4), dtype='<f4')
+    for column, name in enumerate(('x', 'y', 'z', 'v')):
+        xyzv[:, column] = records[name]
+    return {
+        'sensor': sensor_id,
+        'frame': frame_number,
+        'timestamp': timestamp,
+        'num_points': len(records),
+        'points': base64.b64encode(xyzv.tobytes()).decode('ascii'),
+    }
+
+def frame_points(records):
+    """x, y, z, v of every point as lists, for JSON"""
+    return np.stack([records['x'], records['y'], records['z'], records['v']], axis=1).astype(float).round(3).tolist()
+
+def get_radar_stats():
+    """Copy of radar_stats that is safe to serialize while frames arrive"""
+    with stats_lock:
+        return dict(radar_stats)
+
+def on_ipc_frame(sensor_id, frame_number, timestamp, records):
+    """Frame from the radar process, with its points in world coordinates"""
+    num_points = len(records)
+    frame_history.append(frame_number, timestamp, records, sensor_id)
+    with stats_lock:
+        radar_stats['total_frames'] += 1
+        if num_points > 0:
+            radar_stats['objects_detected'] += num_points
+            radar_stats['last_detection'] = datetime.now().isoformat()
+    if live_broadcaster.num_subscribers:
+        live_broadcaster.publish(frame_event(sensor_id, frame_number, timestamp, records), event='frame')
+
+def on_ipc_stats(stats):
+    """Counters the radar process sends once a second"""
+    with stats_lock:
+        radar_stats['acquisition'] = stats
+    live_broadcaster.publish(get_radar_stats(), event='stats')
+
+def start_ipc_receiver():
+    """Listen for frames from the radar process, once"""
+    global ipc_receiver
+    if ipc_receiver is None:
+        ipc_receiver = IpcReceiver(RADAR_IPC_SOCKET, on_ipc_frame, on_ipc_stats)
+        ipc_receiver.start()
+
 def start_radar():
     """Start the radar process"""
     global radar_process
@@ -76,9 +133,12 @@ def start_radar():
         # Create a modified radar script with current config
         create_radar_script_with_config()
         
-        # Start the radar process and capture output
+        # Frames and counters come over the IPC socket, stdout only carries log messages
+        start_ipc_receiver()
+        with stats_lock:
+            radar_stats['total_frames'] = 0
         radar_process = subprocess.Popen(
-            ['python3', 'radar_configured.py'],
+            ['python3', 'radar_configured.py', '--ipc', RADAR_IPC_SOCKET, '--quiet'],
             stdout=subprocess.PIPE,  # Capture output for web interface
             stderr=subprocess.STDOUT,  # Combine stderr with stdout
             text=True,
@@ -100,8 +160,8 @@ def start_radar():
         return False, f"Error starting radar: {str(e)}"
 
 def read_radar_output():
-    """Read radar output and store for web interface"""
-    global radar_process, recent_detections, radar_stats
+    """Read the radar process's log messages and store them for the web interface"""
+    global radar_process
     
     if not radar_process:
         return
@@ -115,53 +175,11 @@ def read_radar_output():
             if not line:
                 continue
                 
-            # Parse detection data
-            if "objects detected:" in line:
-                try:
-                    # Extract frame and object count
-                    parts = line.split()
-                    frame_idx = -1
-                    obj_count = 0
-                    
-                    for i, part in enumerate(parts):
-                        if part.startswith('#'):
-                            frame_idx = int(part[1:])
-                        elif part.isdigit() and i > 0 and parts[i-1] == '-':
-                            obj_count = int(part)
-                    
-                    radar_stats['total_frames'] = frame_idx
-                    if obj_count > 0:
-                        radar_stats['objects_detected'] += obj_count
-                        radar_stats['last_detection'] = datetime.now().isoformat()
-                        
-                        # Store recent detection
-                        detection = {
-                            'timestamp': datetime.now().isoformat(),
-                            'frame': frame_idx,
-                            'objects': obj_count,
-                            'message': line
-                        }
-                        recent_detections.append(detection)
-                        
-                        # Keep only last 50 detections
-                        if len(recent_detections) > 50:
-                            recent_detections.pop(0)
-                            
-                except Exception as e:
-                    pass  # Continue if parsing fails
-                    
-            # Also store general radar output
-            radar_data_queue.put({
+            # Detections arrive over the IPC socket, this is only log output
+            live_broadcaster.publish({
                 'timestamp': datetime.now().isoformat(),
                 'message': line
             })
-            
-            # Keep queue size manageable
-            if radar_data_queue.qsize() > 100:
-                try:
-                    radar_data_queue.get_nowait()
-                except queue.Empty:
-                    pass
                     
     except Exception as e:
         print(f"Error reading radar output: {e}")
@@ -173,10 +191,11 @@ def stop_radar():
         if not is_radar_running():
             return False, "Radar is not running"
         
+        # SIGTERM lets it restore the CFAR thresholds and close the IPC socket and recording
         radar_process.terminate()
-        time.sleep(2)
-        
-        if radar_process.poll() is None:
+        try:
+            radar_process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
             radar_process.kill()
             
         radar_process = None
@@ -193,48 +212,88 @@ def create_radar_script_with_config():
 
 import os
 import sys
+import argparse
+import signal
 import serial
 import time
 import numpy as np
 from datetime import datetime
-from parcer_XY_test import parser_one_mmw_demo_output_packet
+from parcer_XY_test import sendFrameUdp, UDP_OUTPUT_TEXT, UDP_OUTPUT_BINARY
+from stream_parser import StreamParser
+from sensor_pose import SensorPose
+from radar_acquisition import run_acquisition, CLI_PORT, DATA_PORT, CLI_BAUD, DATA_BAUD
+from radar_replay import ReplayPort
+from radar_cli import configure_radar
+from radar_pipeline import RadarPipeline, OVERLOAD_POLICIES, DROP_OLDEST, BLOCK
+from radar_cfg import load_profile
+from cfar_controller import CfarController
+from radar_ipc import IpcSender
+from point_cloud_recorder import PointCloudRecorder
+from radar_metrics import RadarMetrics, TRANSFORM, EMIT
+
+CFAR_LOG_FILE = 'cfar_adjustments.log'
 
 # Current sensor configuration
 SENSOR_CONFIG = {current_config}
 
-def setup_radar_ports():
+def setup_radar_ports(cli_path=CLI_PORT, data_path=DATA_PORT):
     """Setup serial connections to radar"""
     try:
-        cli_port = serial.Serial('/dev/ttyACM0', 115200, timeout=1)
-        data_port = serial.Serial('/dev/ttyACM1', 921600, timeout=1)
+        cli_port = serial.Serial(cli_path, CLI_BAUD, timeout=1)
+        data_port = serial.Serial(data_path, DATA_BAUD, timeout=1)
         print("✓ Serial ports connected successfully")
         return cli_port, data_port
     except Exception as e:
         print(f"✗ Error connecting to serial ports: {{e}}")
         return None, None
 
-def send_config_to_radar(cli_port, config_file):
-    """Send configuration commands to radar"""
+def send_config_to_radar(cli_port, config_file, force=False):
+    """Send configuration commands to radar, each after the previous one was acknowledged"""
     try:
-        with open(config_file, 'r') as f:
-            config_lines = [line.rstrip('\\r\\n') for line in f]
-        
-        print(f"Sending {{len(config_lines)}} configuration commands...")
-        for i, line in enumerate(config_lines):
-            if line.strip() and not line.startswith('%'):
-                cli_port.write((line + '\\n').encode())
-                print(f"  {{i+1:2d}}: {{line}}")
-                time.sleep(0.01)
+        def on_result(result):
+            mark = "✓" if result.ok else "✗"
+            print(f"  {{result.line_number:2d}}: {{mark}} {{result.command}} ({{result.seconds * 1000:.0f}} ms)")
+            if not result.ok:
+                print(f"      {{result.message}}")
         
-        print("✓ Configuration sent successfully")
-        return True
+        print("Configuring radar...")
+        ok, results, skipped = configure_radar(cli_port, config_file, force, on_result)
+        if skipped:
+            print("✓ Configuration unchanged, radar restarted without upload")
+        elif ok:
+            print("✓ Configuration sent successfully")
+        else:
+            print(f"✗ {{sum(not result.ok for result in results)}} configuration commands failed")
+        return ok
     except Exception as e:
         print(f"✗ Error sending configuration: {{e}}")
         return False
 
+def parse_args():
+    """Command line options, only needed for replay or other serial ports"""
+    parser = argparse.ArgumentParser(description="mmWave radar acquisition")
+    parser.add_argument('--cli-port', default=CLI_PORT, help="Radar CLI serial port")
+    parser.add_argument('--data-port', default=DATA_PORT, help="Radar data serial port")
+    parser.add_argument('--replay', help="Play back a recorded .dat capture or raw UART dump instead of the radar")
+    parser.add_argument('--speed', type=float, default=1.0, help="Replay speed factor, 0 for as fast as possible")
+    parser.add_argument('--loop', action='store_true', help="Start the replay over when it ends")
+    parser.add_argument('--poll', action='store_true', help="Poll the data port every sensor_delay seconds instead of waiting for data")
+    parser.add_argument('--pipeline', action='store_true', help="Read, parse and output on separate threads")
+    parser.add_argument('--overload', choices=OVERLOAD_POLICIES, help="What the pipeline does when a stage falls behind, block for a replay (nothing to lose there), else drop_oldest")
+    parser.add_argument('--force-config', action='store_true', help="Upload the whole .cfg even if the radar already has it")
+    parser.add_argument('--quiet', action='store_true', help="Don't print the detected objects")
+    parser.add_argument('--udp', choices=('text', 'binary', 'off'), help="UDP output format, binary by default with --quiet or --ipc, else text")
+    parser.add_argument('--record', help="Record every frame's points to segment files in this directory")
+    parser.add_argument('--ipc', help="Send frames and counters to the web panel over this Unix socket")
+    parser.add_argument('--cfar-target', type=int, help="Raise the CFAR threshold while frames average more points than this, 0 for what fits through the UART")
+    return parser.parse_args()
+
 def main():
     """Main radar processing loop"""
+    args = parse_args()
     config_file = 'xwr18xx_profile_2023_07_26T08_46_17_507.cfg'
+    # The web panel stops us with SIGTERM; handle it like Ctrl-C so the cleanup below runs
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
     
     print("=" * 60)
     print("mmWave Radar - Web Controlled")
@@ -244,92 +303,152 @@ def main():
     print(f"Orientation: Yaw={{SENSOR_CONFIG['yaw_psi']}}°, Pitch={{SENSOR_CONFIG['pitch_theta']}}°, Roll={{SENSOR_CONFIG['roll_phi']}}°")
     print("=" * 60)
     
-    if not os.path.exists(config_file):
-        print(f"✗ Configuration file '{{config_file}}' not found!")
-        return
-    
-    cli_port, data_port = setup_radar_ports()
-    if not cli_port or not data_port:
-        return
+    # Without --poll the loop wakes up as soon as bytes arrive
+    poll_delay = SENSOR_CONFIG['sensor_delay'] if args.poll else None
+    profile = None
+    cfar = None
+    ipc = None
+    recorder = None
+    if args.replay:
+        cli_port = None
+        data_port = ReplayPort(args.replay, speed=args.speed, loop=args.loop)
+        print(f"✓ Replaying {{data_port.num_frames}} frames from {{args.replay}} at speed {{args.speed or 'max'}}")
+        if args.poll and not args.speed:
+            poll_delay = 0
+    else:
+        if not os.path.exists(config_file):
+            print(f"✗ Configuration file '{{config_file}}' not found!")
+            return
+        
+        # Warn about a profile whose frames will not fit through the UART
+        profile = load_profile(config_file)
+        if profile:
+            for problem in profile.check():
+                print(f"⚠ {{problem}}")
+        
+        cli_port, data_port = setup_radar_ports(args.cli_port, args.data_port)
+        if not cli_port or not data_port:
+            return
     
     try:
-        if not send_config_to_radar(cli_port, config_file):
+        if cli_port and not send_config_to_radar(cli_port, config_file, args.force_config):
             return
         
         print("\\nStarting radar data acquisition...")
         print("Use web interface to stop")
         print("=" * 60)
         
+        # Buffers sized for the worst case frame of the profile; a replay may come from another one
+        parser_options = profile.stream_parser_options() if profile else {{}}
+        stream = StreamParser(reuse_frame=True, **parser_options)
+        pose = SensorPose.from_config(SENSOR_CONFIG)
+        metrics = RadarMetrics()
+        # The text format prints every point, keep it off the hot loop of a quiet or IPC run
+        udp_output = {{'text': UDP_OUTPUT_TEXT, 'binary': UDP_OUTPUT_BINARY, 'off': None}}.get(
+            args.udp, UDP_OUTPUT_BINARY if args.quiet or args.ipc else UDP_OUTPUT_TEXT)
+        pipeline = None
         frame_count = 0
-        no_data_count = 0
-        data_buffer = bytearray()
+        point_count = 0
+        
+        if args.ipc:
+            ipc = IpcSender(args.ipc, int(SENSOR_CONFIG['ID']))
+        if args.record:
+            recorder = PointCloudRecorder(args.record)
+            print(f"Recording point clouds to {{args.record}}")
         
-        while True:
-            byte_count = data_port.inWaiting()
-            if byte_count > 0:
-                new_data = data_port.read(byte_count)
-                data_buffer.extend(new_data)
-                no_data_count = 0
+        if args.cfar_target is not None and cli_port and profile:
+            cfar = CfarController(cli_port, profile, args.cfar_target or None, log_file=CFAR_LOG_FILE)
+            print(f"CFAR control: target {{cfar.target_points}} points per frame, adjustments logged to {{CFAR_LOG_FILE}}")
+        
+        def ipc_stats():
+            assembler = pipeline.assembler if pipeline else stream.assembler
+            stats = {{'frames': frame_count, 'points': point_count,
+                     'bytes_received': assembler.bytes_received, 'bytes_skipped': assembler.bytes_skipped,
+                     'resync_count': assembler.resync_count, 'assembler_pending': assembler.pending,
+                     'frames_failed': pipeline.parser_stats.failed if pipeline else stream.frames_failed,
+                     'cfar_offset_db': cfar.offset_db if cfar else 0.0}}
+            if pipeline:
+                stats['queues'] = {{name: {{'depth': queue.depth, 'maxsize': queue.maxsize, 'dropped': queue.dropped}}
+                                   for name, queue in (('packets', pipeline.packets), ('frames', pipeline.frames))}}
+            stats.update(metrics.snapshot())
+            return stats
+        
+        def on_frame(parsed):
+            nonlocal frame_count, point_count
+            frame_count += 1
+            timestamp = datetime.now().strftime("%H:%M:%S.%f")[:-3]
+            num_objects = parsed.num_points
+            point_count += num_objects
+            metrics.frame(parsed.frame_number)
+            if cfar:
+                cfar.update(num_objects, parsed.frame_number)
+            # Transformed once for every output, so emit only covers sending
+            transformed = time.perf_counter()
+            records = None
+            if udp_output or ipc or recorder:
+                records = parsed.world_records(pose)
+                started, transformed = transformed, time.perf_counter()
+                metrics.observe(TRANSFORM, transformed - started)
+            sendFrameUdp(parsed, SENSOR_CONFIG['ID'], pose, udp_output, printPoints=not args.quiet, worldRecords=records)
+            if recorder:
+                recorder.write(parsed.frame_number, parsed.timestamp, records)
+            if ipc:
+                ipc.send_frame(parsed.frame_number, parsed.timestamp, records)
+            metrics.observe(EMIT, time.perf_counter() - transformed)
+            if ipc and ipc.stats_due():
+                ipc.send_stats(ipc_stats())
+            if args.quiet:
+                return
+            
+            if num_objects > 0:
+                print(f"\\n[{{timestamp}}] Frame #{{frame_count}} - {{num_objects}} objects detected:")
+                print("-" * 80)
+                print(f"{{'Obj':<4}} {{'X(m)':<8}} {{'Y(m)':<8}} {{'Z(m)':<8}} {{'V(m/s)':<8}} {{'Range(m)':<8}} {{'Az(°)':<7}} {{'El(°)':<7}}")
+                print("-" * 80)
                 
-                if len(data_buffer) > 40:
-                    try:
-                        result = parser_one_mmw_demo_output_packet(
-                            data_buffer, 
-                            len(data_buffer),
-                            SENSOR_CONFIG['ID'],
-                            SENSOR_CONFIG['X'],
-                            SENSOR_CONFIG['Y'], 
-                            SENSOR_CONFIG['Z'],
-                            SENSOR_CONFIG['yaw_psi'],
-                            SENSOR_CONFIG['pitch_theta'],
-                            SENSOR_CONFIG['roll_phi']
-                        )
-                        
-                        (parser_result, header_start, total_bytes, num_objects, 
-                         num_tlv, subframe, x_array, y_array, z_array, v_array,
-                         range_array, azimuth_array, elevation_array, 
-                         snr_array, noise_array) = result
-                        
-                        if parser_result == 0:
-                            frame_count += 1
-                            timestamp = datetime.now().strftime("%H:%M:%S.%f")[:-3]
-                            
-                            if header_start >= 0 and total_bytes > 0:
-                                bytes_to_remove = header_start + total_bytes
-                                data_buffer = data_buffer[bytes_to_remove:]
-                            
-                            if num_objects > 0:
-                                print(f"\\n[{{timestamp}}] Frame #{{frame_count}} - {{num_objects}} objects detected:")
-                                print("-" * 80)
-                                print(f"{{'Obj':<4}} {{'X(m)':<8}} {{'Y(m)':<8}} {{'Z(m)':<8}} {{'V(m/s)':<8}} {{'Range(m)':<8}} {{'Az(°)':<7}} {{'El(°)':<7}}")
-                                print("-" * 80)
-                                
-                                for i in range(num_objects):
-                                    print(f"{{i:<4}} {{x_array[i]:<8.3f}} {{y_array[i]:<8.3f}} {{z_array[i]:<8.3f}} "
-                                          f"{{v_array[i]:<8.3f}} {{range_array[i]:<8.3f}} {{azimuth_array[i]:<7.1f}} "
-                                          f"{{elevation_array[i]:<7.1f}}")
-                            else:
-                                if frame_count % 50 == 0:
-                                    print(f"[{{timestamp}}] Frame #{{frame_count}} - No objects detected")
-                        else:
-                            if len(data_buffer) > 10000:
-                                data_buffer = data_buffer[-5000:]
-                    
-                    except Exception as e:
-                        print(f"Parser error: {{e}}")
-                        data_buffer = bytearray()
+                for i, (x, y, z, v, rng, az, el, snr, noise) in enumerate(parsed.points.tolist()):
+                    print(f"{{i:<4}} {{x:<8.3f}} {{y:<8.3f}} {{z:<8.3f}} "
+                          f"{{v:<8.3f}} {{rng:<8.3f}} {{az:<7.1f}} "
+                          f"{{el:<7.1f}}")
             else:
-                no_data_count += 1
-                if no_data_count % 100 == 0:
-                    print(".", end="", flush=True)
+                if frame_count % 50 == 0:
+                    print(f"[{{timestamp}}] Frame #{{frame_count}} - No objects detected")
+        
+        def on_idle(idle_polls):
+            if ipc and ipc.stats_due():
+                ipc.send_stats(ipc_stats())
+            if idle_polls % 100 == 0:
+                print(".", end="", flush=True)
+        
+        if args.pipeline:
+            # The UART keeps being drained while the table is printed or UDP is sent
+            # A replay waits for a slow stage instead of dropping; only a live UART can overflow
+            policy = args.overload or (BLOCK if args.replay else DROP_OLDEST)
+            pipeline = RadarPipeline(data_port, on_frame, policy=policy, on_idle=on_idle, metrics=metrics, **parser_options)
+            pipeline.run()
             
-            time.sleep(SENSOR_CONFIG['sensor_delay'])
-    
-    except KeyboardInterrupt:
-        print(f"\\n\\nStopping radar... Processed {{frame_count}} frames")
+            print(f"\\n\\nStopping radar... Processed {{frame_count}} frames")
+            print(f"Pipeline: {{pipeline.summary()}}")
+            print(f"Resync: skipped {{pipeline.assembler.bytes_skipped}} bytes in {{pipeline.assembler.resync_count}} resyncs")
+        else:
+            stats = run_acquisition(data_port, on_frame, stream, poll_delay, on_idle, metrics=metrics)
+            
+            print(f"\\n\\nStopping radar... Processed {{frame_count}} frames")
+            print(f"Acquisition: {{stats.summary()}}")
+            print(f"Resync: skipped {{stream.bytes_skipped}} bytes in {{stream.resync_count}} resyncs, {{stream.frames_failed}} frames failed to parse")
+        if args.replay:
+            print(f"Replay: {{data_port.frames_released}} frames released, max lag {{data_port.max_lag * 1000:.1f}} ms")
+        if cfar:
+            print(cfar.summary())
     except Exception as e:
         print(f"Error during operation: {{e}}")
     finally:
+        if cfar:
+            cfar.restore()  # the hash in radar_cli's state file is for the profile's thresholds
+        if ipc:
+            ipc.close()
+        if recorder:
+            recorder.close()
         if cli_port:
             cli_port.close()
         if data_port:
@@ -360,7 +479,8 @@ def api_status():
     return jsonify({
         'running': is_radar_running(),
         'config': current_config,
-        'stats': radar_stats,
+        'stats': get_radar_stats(),
+        'live': live_broadcaster.status(),
         'timestamp': datetime.now().isoformat()
     })
 
@@ -407,27 +527,88 @@ def api_config():
         except Exception as e:
             return jsonify({'success': False, 'message': f'Error updating configuration: {str(e)}'})
 
+@app.route('/api/profile')
+def api_profile():
+    """Get the derived figures and UART throughput plan of the radar .cfg profile"""
+    profile = load_profile(RADAR_PROFILE_FILE)
+    if profile is None:
+        return jsonify({'success': False, 'message': f'Could not parse {RADAR_PROFILE_FILE}'})
+    return jsonify(profile.to_dict())
+
+@app.route('/api/frame')
+def api_frame():
+    """Get the last frame with all its points (x, y, z, v in world coordinates)"""
+    frame = None
+    for entry in frame_history.latest(1):
+        frame = {'sensor': entry.sensor_id, 'frame': entry.frame_number,
+                 'timestamp': entry.timestamp, 'points': frame_points(entry.records)}
+    return jsonify({'frame': frame, 'timestamp': datetime.now().isoformat()})
+
 @app.route('/api/data')
 def api_data():
     """Get recent radar detection data"""
+    detections = [{
+        'timestamp': datetime.fromtimestamp(entry.timestamp).isoformat(),
+        'frame': entry.frame_number,
+        'objects': entry.num_points,
+        'points': frame_points(entry.records),
+    } for entry in frame_history.latest(50) if entry.num_points > 0]
     return jsonify({
-        'detections': recent_detections[-20:],  # Last 20 detections
-        'stats': radar_stats,
+        'detections': detections[-20:],  # Last 20 detections
+        'stats': get_radar_stats(),
         'timestamp': datetime.now().isoformat()
     })
 
+@app.route('/api/history')
+def api_history():
+    """Get the stored frames with since < timestamp <= until, or those after frame number after_frame
+
+    Points are encoded like the live 'frame' events. At most limit frames
+    are returned; to resume, ask again with after_frame set to
+    next_after_frame (frames can share a timestamp, so since cannot page).
+    """
+    try:
+        since = request.args.get('since', type=float)
+        until = request.args.get('until', type=float)
+        after_frame = request.args.get('after_frame', type=int)
+        limit = min(request.args.get('limit', 100, type=int), 1000)
+        entries = frame_history.between(since, until, after_frame, limit)
+        oldest = frame_history.oldest()
+        return jsonify({
+            'frames': [frame_event(entry.sensor_id, entry.frame_number, entry.timestamp, entry.records)
+                       for entry in entries],
+            'next_after_frame': entries[-1].frame_number if entries else after_frame,
+            'complete': len(entries) < limit,
+            'oldest': oldest.timestamp if oldest else None,
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'Error reading history: {str(e)}'})
+
 @app.route('/api/live')
 def api_live():
-    """Get live radar output stream"""
-    def generate():
-        while True:
-            try:
-                data = radar_data_queue.get(timeout=1)
-                yield f"data: {json.dumps(data)}\n\n"
-            except queue.Empty:
-                yield f"data: {json.dumps({'ping': datetime.now().isoformat()})}\n\n"
-    
-    return Response(generate(), mimetype='text/plain')
+    """Get live radar output stream (Server-Sent Events), every client gets every message"""
+    return Response(live_broadcaster.event_stream(request.remote_addr), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/metrics')
+def metrics():
+    """Get the acquisition and web panel metrics in the Prometheus text format"""
+    writer = MetricsWriter()
+    writer.gauge('radar_running', "Whether the radar process is running", is_radar_running())
+    stats = get_radar_stats()
+    if 'acquisition' in stats:
+        write_acquisition_metrics(writer, stats['acquisition'])
+    if ipc_receiver is not None:
+        writer.counter('ipc_frames_received_total', "Frames the web panel received from the radar process",
+                       ipc_receiver.frames_received)
+    writer.gauge('history_frames', "Frames kept for /api/history", len(frame_history))
+    live = live_broadcaster.status()
+    writer.gauge('live_clients', "Connected /api/live clients", live['subscribers'])
+    writer.gauge('live_queue_depth', "Messages waiting for /api/live clients, all clients together",
+                 sum(client['queued'] for client in live['clients']))
+    writer.counter('live_messages_published_total', "Messages published to /api/live", live['published'])
+    writer.counter('live_clients_disconnected_total', "/api/live clients closed for not reading", live['disconnected'])
+    return Response(writer.text(), content_type=METRICS_CONTENT_TYPE)
 
 @app.route('/config')
 def config_page():